@@ -0,0 +1,175 @@
+"""
+Exportación columnar de los items de APU (CSV, JSON Lines o Parquet).
+
+Aplana cada rubro en una fila por item (equipo, mano de obra, materiales y
+transporte) con los datos del rubro repetidos en cada fila, y la escribe en
+lotes directamente desde los rubros parseados, sin construir el libro de
+openpyxl. Sirve para cargar los APU en herramientas de análisis de costos.
+
+Parquet requiere pyarrow (pip install pyarrow); CSV y JSONL solo usan la
+biblioteca estándar.
+
+Uso:
+    python apu_export.py APU_CON_VAE.pdf items.parquet
+    python apu_export.py APU_CON_VAE.pdf items.csv --lote 5000
+"""
+
+import csv
+import json
+import os
+from contextlib import nullcontext
+
+
+SECTIONS = ('equipos', 'mano_obra', 'materiales', 'transporte')
+
+# Datos del rubro que se repiten en cada fila de sus items
+RUBRO_FIELDS = [
+    ('numero_rubro', 'int'), ('numero_pagina', 'int'), ('detalle', 'str'), ('unidad_rubro', 'str'),
+    ('cantidad_rubro', 'float'), ('total_costo_directo', 'float'), ('indirectos_pct', 'float'),
+    ('indirectos_valor', 'float'), ('utilidad_pct', 'float'), ('utilidad_valor', 'float'),
+    ('costo_total', 'float'), ('valor_unitario', 'float'), ('vae_total', 'float'),
+]
+ITEM_FIELDS = [
+    ('seccion', 'str'), ('orden', 'int'), ('descripcion', 'str'), ('cpc', 'str'), ('categoria', 'str'),
+    ('unidad', 'str'), ('cantidad', 'float'), ('tarifa', 'float'), ('costo_hora', 'float'),
+    ('rendimiento', 'float'), ('costo', 'float'), ('peso_relativo', 'float'), ('np_ep_nd', 'str'),
+    ('vae_pct', 'float'), ('vae_elemento', 'float'),
+]
+FIELDS = RUBRO_FIELDS + ITEM_FIELDS
+COLUMNS = [name for name, _ in FIELDS]
+
+# Los campos del rubro que chocan con los del item llevan sufijo
+_RUBRO_KEYS = {'unidad_rubro': 'unidad', 'cantidad_rubro': 'cantidad'}
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+
+
+def iter_item_rows(rubros):
+    """Una fila (dict con COLUMNS) por item de cada rubro, en orden de rubro y sección."""
+    for rubro in rubros:
+        base = {name: rubro.get(_RUBRO_KEYS.get(name, name)) for name, _ in RUBRO_FIELDS}
+        for section in SECTIONS:
+            for orden, item in enumerate(rubro.get(section) or [], 1):
+                row = dict(base)
+                row['seccion'] = section
+                row['orden'] = orden
+                for name, _ in ITEM_FIELDS[2:]:
+                    row[name] = item.get(name)
+                yield row
+
+
+def iter_batches(rows, batch_size=1000):
+    """Agrupa las filas en listas de como mucho batch_size."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class CsvWriter:
+    """CSV con encabezado; los valores vacíos quedan como celdas vacías."""
+    
+    def __init__(self, output_path):
+        self._file = open(output_path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        self._writer.writeheader()
+    
+    def write_batch(self, batch):
+        self._writer.writerows(batch)
+    
+    def close(self):
+        self._file.close()
+
+
+class JsonlWriter:
+    """Un objeto JSON por línea."""
+    
+    def __init__(self, output_path):
+        self._file = open(output_path, 'w', encoding='utf-8')
+    
+    def write_batch(self, batch):
+        self._file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in batch))
+    
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Parquet con esquema fijo; cada lote se escribe como un row group."""
+    
+    def __init__(self, output_path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("La exportación a Parquet requiere pyarrow: pip install pyarrow")
+        types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string()}
+        self._pa = pa
+        self._schema = pa.schema([(name, types[kind]) for name, kind in FIELDS])
+        self._writer = pq.ParquetWriter(output_path, self._schema)
+    
+    def write_batch(self, batch):
+        columns = {name: [row[name] for row in batch] for name in COLUMNS}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+    
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {'csv': CsvWriter, 'jsonl': JsonlWriter, 'parquet': ParquetWriter}
+
+
+def export_items(rubros, output_path, fmt=None, batch_size=1000, timer=None):
+    """
+    Escribe los items de los rubros como tabla plana.
+    
+    Args:
+        rubros: Iterable de rubros (lista, RubroStore o APUConverter.iter_rubros())
+        output_path: Archivo de salida
+        fmt: 'csv', 'jsonl' o 'parquet' (por defecto según la extensión)
+        batch_size: Filas por lote escrito
+        timer: StageTimer opcional; la escritura se mide como etapa 'export'
+    
+    Returns:
+        Cantidad de filas escritas
+    """
+    fmt = fmt or FORMATS.get(os.path.splitext(output_path)[1].lower())
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato de exportación no soportado: {output_path} (use .csv, .jsonl o .parquet)")
+    
+    writer = WRITERS[fmt](output_path)
+    count = 0
+    try:
+        for batch in iter_batches(iter_item_rows(rubros), batch_size):
+            with timer.stage('export') if timer is not None else nullcontext():
+                writer.write_batch(batch)
+            count += len(batch)
+    finally:
+        writer.close()
+    return count
+
+
+def main():
+    import argparse
+    
+    from pdf_to_excel_apu import APUConverter
+    
+    parser = argparse.ArgumentParser(description="Exporta los items de un PDF de APU a CSV, JSONL o Parquet.")
+    parser.add_argument('pdf', help="PDF de APU")
+    parser.add_argument('output', help="Archivo de salida (.csv, .jsonl o .parquet)")
+    parser.add_argument('--formato', choices=sorted(WRITERS), help="Formato (por defecto según la extensión)")
+    parser.add_argument('--lote', type=int, default=1000, help="Filas por lote escrito")
+    args = parser.parse_args()
+    
+    try:
+        APUConverter(args.pdf).export_items(args.output, args.formato, args.lote)
+    except (ImportError, ValueError) as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
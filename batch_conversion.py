@@ -0,0 +1,321 @@
+"""
+Conversión por lotes con un único pool de procesos a nivel de página.
+
+Con un pool por archivo, los núcleos quedan ociosos mientras un PDF de 800
+páginas termina después de que los de 5 páginas ya acabaron. Aquí cada PDF del
+lote se expande en tareas de página que alimentan un solo pool, empezando por
+los archivos más grandes: cada proceso libre toma la próxima tarea pendiente,
+sea del archivo que sea, así que nadie espera mientras quede trabajo. Cuando
+todas las páginas de un documento están listas, su escritura entra al mismo
+pool sin esperar al resto del lote.
+
+Uso:
+    python batch_conversion.py PROYECTO1.pdf PROYECTO2.pdf carpeta_con_pdfs/
+    python batch_conversion.py *.pdf --salida convertidos --procesos 8
+"""
+
+import contextlib
+import io
+import os
+import queue
+import time
+from collections import OrderedDict, deque
+from multiprocessing import Pool, SimpleQueue
+
+import pdfplumber
+
+from pdf_to_excel_apu import APUConverter, assemble_document, convert_to_shared_strings, parse_apu_page
+
+
+MAX_OPEN_PDFS = 4  # PDFs abiertos a la vez en cada proceso
+TASK_TIMEOUT = 600  # Segundos máximos de una tarea antes de matar su proceso
+WATCH_INTERVAL = 0.5  # Segundos entre revisiones de los procesos del pool
+LOST_GRACE = 1.0  # Espera antes de dar por perdida la tarea de un proceso muerto
+
+# PDFs abiertos en cada proceso del pool (ruta -> documento pdfplumber)
+_open_pdfs = OrderedDict()
+
+# Cola donde cada proceso avisa qué tarea empieza (la fija _init_worker)
+_started = None
+
+
+def _init_worker(started):
+    global _started
+    _started = started
+
+
+def _announce(key):
+    """Avisa al coordinador del lote que este proceso empieza la tarea key."""
+    if _started is not None:
+        _started.put((key, os.getpid()))
+
+
+def _worker_pdf(pdf_path):
+    """Documento abierto en este proceso; cierra el usado hace más tiempo si hay demasiados."""
+    pdf = _open_pdfs.pop(pdf_path, None)
+    if pdf is None:
+        pdf = pdfplumber.open(pdf_path)
+        if len(_open_pdfs) >= MAX_OPEN_PDFS:
+            _, oldest = _open_pdfs.popitem(last=False)
+            oldest.close()
+    _open_pdfs[pdf_path] = pdf
+    return pdf
+
+
+def _parse_page_task(doc_index, pdf_path, page_index):
+    """Tarea de página: ('pagina', documento, página, (rubro, encabezado) o None, segundos de CPU, error)."""
+    _announce((doc_index, page_index))
+    start = time.process_time()
+    try:
+        page = _worker_pdf(pdf_path).pages[page_index]
+        result = parse_apu_page(page)
+        page.close()
+        error = None
+    except Exception as e:
+        result, error = None, f"página {page_index + 1}: {type(e).__name__}: {e}"
+    return 'pagina', doc_index, page_index, result, time.process_time() - start, error
+
+
+def _write_task(doc_index, pdf_path, output_path, page_results):
+    """Tarea de escritura: ('documento', documento, rubros, segundos de CPU, error)."""
+    _announce((doc_index, None))
+    start = time.process_time()
+    try:
+        converter = APUConverter(pdf_path)
+        converter.header_info, converter.rubros = assemble_document(page_results)
+        # Los mensajes de cada escritura se mezclarían con el progreso del lote
+        with contextlib.redirect_stdout(io.StringIO()):
+            converter.create_excel(output_path)
+            convert_to_shared_strings(output_path)
+        return 'documento', doc_index, len(converter.rubros), time.process_time() - start, None
+    except Exception as e:
+        return 'documento', doc_index, 0, time.process_time() - start, f"{type(e).__name__}: {e}"
+
+
+def _lost_event(key, error):
+    """Evento de fallo de una tarea cuyo resultado nunca va a llegar."""
+    doc_index, page_index = key
+    if page_index is None:
+        return 'documento', doc_index, 0, 0.0, error
+    return 'pagina', doc_index, page_index, None, 0.0, f"página {page_index + 1}: {error}"
+
+
+class BatchDocument:
+    """Estado de un PDF del lote."""
+    
+    def __init__(self, pdf_path, output_path, total_pages):
+        self.pdf_path = pdf_path
+        self.output_path = output_path
+        self.total_pages = total_pages
+        self.page_results = [None] * total_pages
+        self.pages_done = 0
+        self.rubros = 0
+        self.error = None
+        self.written = False
+
+
+def default_output_path(pdf_path, output_dir=None):
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(output_dir or os.path.dirname(pdf_path), f"{base_name}_CONVERTIDO.xlsx")
+
+
+def unique_output_path(pdf_path, output_dir=None, taken=None):
+    """
+    Ruta de salida que no choca con las ya asignadas en taken.
+    
+    Con una carpeta de salida común, dos PDFs con el mismo nombre en carpetas
+    distintas irían al mismo Excel y uno pisaría al otro: el segundo recibe el
+    sufijo _2, el tercero _3, etc. La ruta elegida se agrega a taken.
+    """
+    output_path = default_output_path(pdf_path, output_dir)
+    if taken is None:
+        return output_path
+    root, extension = os.path.splitext(output_path)
+    suffix = 1
+    while os.path.normcase(os.path.abspath(output_path)) in taken:
+        suffix += 1
+        output_path = f"{root}_{suffix}{extension}"
+    taken.add(os.path.normcase(os.path.abspath(output_path)))
+    return output_path
+
+
+def expand_inputs(paths):
+    """PDFs de la lista; las carpetas se expanden a sus *.pdf."""
+    pdf_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdf_paths.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                    if name.lower().endswith('.pdf')))
+        else:
+            pdf_paths.append(path)
+    return pdf_paths
+
+
+def convert_batch(pdf_paths, output_dir=None, workers=None, max_pending=None, task_timeout=TASK_TIMEOUT):
+    """
+    Convierte un lote de PDFs repartiendo sus páginas en un solo pool.
+    
+    Args:
+        pdf_paths: PDFs a convertir
+        output_dir: Carpeta de salida (por defecto la del PDF)
+        workers: Número de procesos (por defecto, núcleos disponibles)
+        max_pending: Tareas en vuelo como máximo; las escrituras de documentos
+                     terminados se adelantan a las páginas que aún no se enviaron
+        task_timeout: Segundos máximos de una tarea; si se superan, o si el
+                      proceso que la ejecuta muere, falla solo su documento
+    
+    Returns:
+        Lista de BatchDocument en el orden de pdf_paths
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    documents = []
+    taken = set()
+    for pdf_path in pdf_paths:
+        try:
+            with pdfplumber.open(pdf_path) as pdf:
+                total_pages = len(pdf.pages)
+            error = None
+        except Exception as e:
+            # PDF dañado, inexistente o que no es PDF: falla solo ese documento
+            total_pages, error = 0, f"{type(e).__name__}: {e}"
+        document = BatchDocument(pdf_path, unique_output_path(pdf_path, output_dir, taken), total_pages)
+        document.error = error
+        documents.append(document)
+    
+    # Archivos más grandes primero: los chicos rellenan los huecos al final
+    order = sorted(range(len(documents)), key=lambda i: -documents[i].total_pages)
+    tasks = deque((doc_index, page_index) for doc_index in order
+                  for page_index in range(documents[doc_index].total_pages))
+    total_pages = len(tasks)
+    pages_done = 0
+    written = 0
+    work_seconds = 0.0
+    
+    print(f"Procesando {len(documents)} PDFs ({total_pages} páginas) con {workers} procesos...")
+    start = time.perf_counter()
+    events = queue.Queue()
+    started = SimpleQueue()
+    pending = set()  # Tareas enviadas cuyo resultado no llegó: (documento, página o None)
+    running = {}  # Tarea -> (pid, inicio) de las que ya empezaron en algún proceso
+    lost = {}  # Tarea -> momento en que se vio muerto su proceso
+    with Pool(workers, initializer=_init_worker, initargs=(started,)) as pool:
+        
+        def submit(task, args, key):
+            pending.add(key)
+            # error_callback: la tarea no llegó a ejecutarse (p. ej. argumentos que no se pueden enviar)
+            pool.apply_async(task, args, callback=events.put,
+                             error_callback=lambda e: events.put(_lost_event(key, f"{type(e).__name__}: {e}")))
+        
+        def watch():
+            # Si un proceso muere (segfault, OOM) el pool pierde su tarea sin avisar:
+            # se detecta por el pid que la tarea anunció al empezar
+            while not started.empty():
+                key, pid = started.get()
+                if key in pending:
+                    running[key] = (pid, time.monotonic())
+            # Pool no expone sus procesos: _pool es la lista interna de multiprocessing
+            processes = {process.pid: process for process in pool._pool if process.exitcode is None}
+            now = time.monotonic()
+            for key, (pid, started_at) in list(running.items()):
+                if pid not in processes:
+                    # El resultado pudo haberse enviado justo antes de morir: se espera un momento
+                    if now - lost.setdefault(key, now) >= LOST_GRACE:
+                        del running[key]
+                        events.put(_lost_event(key, f"el proceso {pid} terminó inesperadamente"))
+                elif now - started_at > task_timeout:
+                    processes[pid].kill()
+                    del running[key]
+                    events.put(_lost_event(key, f"superó el límite de {task_timeout:g} s"))
+        
+        def finish(document, doc_index):
+            # Documento completo (o fallido): se escribe en el pool o se descarta
+            if document.error:
+                document.page_results = None
+                return 1
+            submit(_write_task, (doc_index, document.pdf_path, document.output_path, document.page_results),
+                   (doc_index, None))
+            document.page_results = None
+            return 0
+        
+        for doc_index, document in enumerate(documents):
+            if document.total_pages == 0:
+                written += finish(document, doc_index)
+        
+        while tasks or pending:
+            while tasks and len(pending) < max_pending:
+                doc_index, page_index = tasks.popleft()
+                submit(_parse_page_task, (doc_index, documents[doc_index].pdf_path, page_index),
+                       (doc_index, page_index))
+            
+            watch()
+            try:
+                event = events.get(timeout=WATCH_INTERVAL)
+            except queue.Empty:
+                continue
+            key = (event[1], event[2] if event[0] == 'pagina' else None)
+            if key not in pending:
+                continue  # Resultado tardío de una tarea ya dada por perdida
+            pending.discard(key)
+            running.pop(key, None)
+            lost.pop(key, None)
+            document = documents[event[1]]
+            if event[0] == 'pagina':
+                _, doc_index, page_index, result, seconds, error = event
+                work_seconds += seconds
+                pages_done += 1
+                document.pages_done += 1
+                if error and not document.error:
+                    document.error = error
+                if not document.error:
+                    document.page_results[page_index] = result
+                if document.pages_done == document.total_pages:
+                    written += finish(document, doc_index)
+            else:
+                _, doc_index, rubros, seconds, error = event
+                work_seconds += seconds
+                document.rubros = rubros
+                document.error = document.error or error
+                document.written = error is None
+                written += 1
+            print(f"  Páginas {pages_done}/{total_pages}, documentos {written}/{len(documents)}...", end='\r')
+    
+    elapsed = time.perf_counter() - start
+    # Tiempo de CPU de las tareas (no de reloj: con más procesos que núcleos el
+    # de reloj crece con la contención y el aprovechamiento parecería completo)
+    print(f"\n  Lote terminado en {elapsed:.1f} s; CPU total {work_seconds:.1f} s "
+          f"(aprovechamiento {work_seconds / (elapsed * workers) if elapsed else 0:.0%} de {workers} procesos)")
+    return documents
+
+
+def main():
+    import argparse
+    import sys
+    
+    parser = argparse.ArgumentParser(description="Convierte un lote de PDFs de APU repartiendo sus páginas en un solo pool.")
+    parser.add_argument('pdfs', nargs='+', help="PDFs o carpetas con PDFs")
+    parser.add_argument('--salida', metavar='CARPETA', help="Carpeta de salida (por defecto la de cada PDF)")
+    parser.add_argument('--procesos', type=int, metavar='N', help="Número de procesos (por defecto, núcleos disponibles)")
+    parser.add_argument('--timeout-tarea', type=float, default=TASK_TIMEOUT, metavar='SEG',
+                        help=f"Segundos máximos por página o escritura antes de dar por fallido su PDF "
+                             f"(por defecto {TASK_TIMEOUT})")
+    args = parser.parse_args()
+    
+    pdf_paths = expand_inputs(args.pdfs)
+    if not pdf_paths:
+        parser.error("No se encontraron PDFs")
+    documents = convert_batch(pdf_paths, args.salida, args.procesos, task_timeout=args.timeout_tarea)
+    for document in documents:
+        if document.written:
+            print(f"  ✓ {document.pdf_path}: {document.rubros} rubros -> {document.output_path}")
+        else:
+            print(f"  ✗ {document.pdf_path}: {document.error}")
+    if not all(document.written for document in documents):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
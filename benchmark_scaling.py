@@ -0,0 +1,189 @@
+"""
+Benchmark de escalado de la conversión completa con PDFs sintéticos.
+
+Genera (o reutiliza) PDFs sintéticos de 10, 100, 1.000 y 5.000 páginas con
+synthetic_apu.py, convierte cada uno con convert_pdf_to_excel en un proceso
+nuevo (para que el pico de RSS sea el de esa corrida) y guarda un JSON con
+páginas/segundo, tiempo por etapa y pico de RSS. Si hay un baseline guardado,
+compara cada tamaño contra él y termina con código 1 ante una regresión mayor
+que la tolerancia.
+
+El baseline (benchmark_baseline.json) mide una máquina concreta y no se
+incluye en el repositorio: la primera corrida en cada máquina lo crea con
+--guardar-baseline, usando los mismos tamaños que luego se comparan. Por lo
+mismo, los resultados (benchmark_resultados.json) tampoco se versionan.
+
+Uso:
+    python benchmark_scaling.py [--paginas 10,100,1000,5000] [--salida bench.json]
+    python benchmark_scaling.py --paginas 10,100 --guardar-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_resultados.json')
+DEFAULT_CACHE = os.path.join(tempfile.gettempdir(), 'apu_benchmark_pdfs')
+
+
+def _convert_once(pdf_path, pipeline=False, workers=None):
+    """Convierte un PDF en el proceso actual y devuelve sus métricas (se ejecuta en un proceso nuevo)."""
+    from memory_tracking import MB, peak_rss
+    from pdf_to_excel_apu import convert_pdf_to_excel
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, 'salida.xlsx')
+        timings_path = os.path.join(tmp, 'tiempos.json')
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_pdf_to_excel(pdf_path, output_path, pipeline=pipeline, workers=workers,
+                                 timings_path=timings_path)
+        seconds = time.perf_counter() - start
+        with open(timings_path, encoding='utf-8') as f:
+            timings = json.load(f)
+        output_bytes = os.path.getsize(output_path)
+    
+    rss = peak_rss()
+    return {
+        'seconds': round(seconds, 3),
+        'stages': {name: round(stage['seconds'], 3) for name, stage in timings['stages'].items()},
+        'rubros': sum(1 for page in timings['pages'] if page.get('numero_rubro')),
+        'peak_rss_mb': round(rss / MB, 1) if rss else None,
+        'output_bytes': output_bytes,
+    }
+
+
+def synthetic_pdf(pages, rows_per_section, seed, cache_dir=DEFAULT_CACHE):
+    """Ruta de un PDF sintético con esos parámetros, generándolo si no está en la caché."""
+    from synthetic_apu import generate_pdf
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'apu_sintetico_{pages}p_{rows_per_section}f_s{seed}.pdf')
+    if not os.path.exists(path):
+        generate_pdf(path + '.tmp', pages, rows_per_section, seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def run_benchmark(sizes, rows_per_section=4, seed=0, pipeline=False, workers=None, cache_dir=DEFAULT_CACHE):
+    """
+    Convierte un PDF sintético por cada tamaño y devuelve los resultados.
+    
+    Args:
+        sizes: Cantidades de páginas a medir
+        rows_per_section: Filas por sección de cada rubro sintético
+        seed: Semilla de los PDFs sintéticos
+        pipeline: Si es True, mide la conversión en tubería
+        workers: Procesos de parseo para la tubería
+        cache_dir: Carpeta donde se guardan los PDFs generados
+    
+    Returns:
+        Diccionario serializable con el entorno y una corrida por tamaño
+    """
+    result = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'rows_per_section': rows_per_section,
+        'seed': seed,
+        'pipeline': pipeline,
+        'runs': [],
+    }
+    # Un proceso nuevo por corrida: el pico de RSS no arrastra corridas anteriores
+    context = multiprocessing.get_context('spawn')
+    for pages in sizes:
+        pdf_path = synthetic_pdf(pages, rows_per_section, seed, cache_dir)
+        print(f"  {pages} páginas...", end=' ', flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            run = executor.submit(_convert_once, pdf_path, pipeline, workers).result()
+        run = {'pages': pages, 'pages_per_sec': round(pages / run['seconds'], 2), **run}
+        result['runs'].append(run)
+        print(f"{run['seconds']:.1f} s, {run['pages_per_sec']:.2f} pág/s, pico RSS {run['peak_rss_mb']} MB")
+    return result
+
+
+def compare_to_baseline(result, baseline, tolerance=0.15):
+    """
+    Compara páginas/segundo y pico de RSS de cada tamaño contra el baseline.
+    
+    Returns:
+        Tupla (líneas del reporte, cantidad de regresiones mayores que la tolerancia)
+    """
+    baseline_runs = {run['pages']: run for run in baseline.get('runs', [])}
+    lines = [f"Comparación con el baseline del {baseline.get('date', '?')} (tolerancia {tolerance:.0%}):"]
+    regressions = 0
+    for run in result['runs']:
+        base = baseline_runs.get(run['pages'])
+        if base is None:
+            lines.append(f"  {run['pages']:>6} páginas: sin baseline")
+            continue
+        speed = run['pages_per_sec'] / base['pages_per_sec'] - 1
+        status = 'OK'
+        if speed < -tolerance:
+            status = 'REGRESIÓN'
+            regressions += 1
+        line = f"  {run['pages']:>6} páginas: {run['pages_per_sec']:8.2f} pág/s ({speed:+.1%})"
+        if run.get('peak_rss_mb') and base.get('peak_rss_mb'):
+            memory = run['peak_rss_mb'] / base['peak_rss_mb'] - 1
+            if memory > tolerance:
+                status = 'REGRESIÓN'
+                regressions += 1
+            line += f"  RSS {run['peak_rss_mb']:8.1f} MB ({memory:+.1%})"
+        lines.append(f"{line}  {status}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escalado de la conversión con PDFs sintéticos.")
+    parser.add_argument('--paginas', type=lambda v: [int(n) for n in v.split(',')], default=DEFAULT_SIZES,
+                        help="Tamaños a medir, separados por coma (por defecto 10,100,1000,5000)")
+    parser.add_argument('--filas', type=int, default=4, help="Filas por sección de cada rubro")
+    parser.add_argument('--semilla', type=int, default=0, help="Semilla de los PDFs sintéticos")
+    parser.add_argument('--tuberia', action='store_true', help="Mide la conversión en tubería")
+    parser.add_argument('--procesos', type=int, help="Procesos de parseo para --tuberia")
+    parser.add_argument('--salida', default=DEFAULT_RESULTS,
+                        help="JSON con los resultados (por defecto benchmark_resultados.json, ignorado por git)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="JSON del baseline a comparar")
+    parser.add_argument('--guardar-baseline', action='store_true',
+                        help="Guarda esta corrida como nuevo baseline")
+    parser.add_argument('--tolerancia', type=float, default=0.15,
+                        help="Regresión relativa tolerada antes de fallar (0.15 = 15%%)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help="Carpeta de los PDFs sintéticos generados")
+    args = parser.parse_args()
+    
+    print(f"Benchmark de escalado ({args.filas} filas por sección):")
+    result = run_benchmark(args.paginas, args.filas, args.semilla, args.tuberia, args.procesos, args.cache)
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en: {args.salida}")
+    
+    if args.guardar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"Baseline guardado en: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        lines, regressions = compare_to_baseline(result, baseline, args.tolerancia)
+        print('\n'.join(lines))
+        if regressions:
+            sys.exit(1)
+    else:
+        print(f"Sin baseline en {args.baseline}: créalo con --guardar-baseline para comparar las próximas corridas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Diferencias entre dos versiones de un presupuesto (APU) a nivel de rubro e item.
+
+Trabaja sobre rubros parseados, vengan de un PDF (parse_document) o de un
+libro PUNIS (punis_reader), así que no depende de la posición de las filas:
+los rubros se emparejan por (número, detalle) y los items por (sección,
+descripción normalizada, CPC) con un hash join en una sola pasada. El costo
+es lineal en la cantidad de rubros e items.
+
+Uso:
+    python budget_diff.py APU_PUNIS_V7.xlsx APU_PUNIS_V8.xlsx
+    python budget_diff.py APU_CON_VAE.pdf APU_REVISADO.pdf --json cambios.json
+"""
+
+import math
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from price_index import normalize_description
+
+
+SECTIONS = ('equipos', 'mano_obra', 'materiales', 'transporte')
+SECTION_LABELS = {'equipos': 'equipo', 'mano_obra': 'mano de obra',
+                  'materiales': 'materiales', 'transporte': 'transporte'}
+
+RUBRO_FIELDS = ('unidad', 'cantidad', 'subtotal_m', 'subtotal_n', 'subtotal_o', 'subtotal_p',
+                'total_costo_directo', 'vae_total', 'indirectos_pct', 'indirectos_valor',
+                'utilidad_pct', 'utilidad_valor', 'costo_total', 'valor_unitario')
+ITEM_FIELDS = ('categoria', 'unidad', 'cantidad', 'tarifa', 'costo_hora', 'rendimiento', 'costo',
+               'peso_relativo', 'np_ep_nd', 'vae_pct', 'vae_elemento')
+
+ADDED, REMOVED, CHANGED = 'agregado', 'eliminado', 'modificado'
+
+# delta = nuevo - anterior para campos numéricos, None para texto
+FieldChange = namedtuple('FieldChange', 'field old new delta')
+ItemChange = namedtuple('ItemChange', 'status section descripcion cpc fields')
+RubroChange = namedtuple('RubroChange', 'status numero_rubro detalle fields items')
+
+# Las mismas descripciones se repiten en cientos de rubros: normalizarlas una vez
+_normalized = lru_cache(maxsize=16384)(normalize_description)
+
+
+def rubro_key(rubro):
+    return rubro.get('numero_rubro'), _normalized(rubro.get('detalle'))
+
+
+def item_key(section, item):
+    return section, _normalized(item.get('descripcion')), (item.get('cpc') or '').strip()
+
+
+def _keyed(pairs):
+    """
+    Dict clave -> valor conservando el orden; una clave repetida recibe el
+    número de aparición para que cada registro tenga su pareja en el join.
+    """
+    keyed = {}
+    seen = {}
+    for key, value in pairs:
+        count = seen.get(key, 0)
+        seen[key] = count + 1
+        keyed[key + (count,)] = value
+    return keyed
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _same(a, b, tolerance):
+    if _is_number(a) and _is_number(b):
+        return math.isclose(a, b, rel_tol=tolerance, abs_tol=tolerance)
+    # Vacío y None son lo mismo en ambos orígenes (PDF o XLSX)
+    return (a if a != '' else None) == (b if b != '' else None)
+
+
+def field_changes(old, new, fields, tolerance=1e-9):
+    """Campos que difieren entre dos registros, como FieldChange."""
+    changes = []
+    for field in fields:
+        a, b = old.get(field), new.get(field)
+        if not _same(a, b, tolerance):
+            delta = b - a if _is_number(a) and _is_number(b) else None
+            changes.append(FieldChange(field, a, b, delta))
+    return changes
+
+
+def _item_records(rubro):
+    return _keyed((item_key(section, item), item)
+                  for section in SECTIONS for item in rubro.get(section) or [])
+
+
+def diff_items(old_rubro, new_rubro, tolerance=1e-9):
+    """Items agregados, eliminados y modificados entre dos versiones de un rubro."""
+    old_items = _item_records(old_rubro)
+    changes = []
+    for key, item in _item_records(new_rubro).items():
+        previous = old_items.pop(key, None)
+        if previous is None:
+            changes.append(ItemChange(ADDED, key[0], item.get('descripcion'), item.get('cpc'), []))
+            continue
+        fields = field_changes(previous, item, ITEM_FIELDS, tolerance)
+        if fields:
+            changes.append(ItemChange(CHANGED, key[0], item.get('descripcion'), item.get('cpc'), fields))
+    for key, item in old_items.items():
+        changes.append(ItemChange(REMOVED, key[0], item.get('descripcion'), item.get('cpc'), []))
+    return changes
+
+
+def diff_rubros(old_rubros, new_rubros, tolerance=1e-9):
+    """
+    Compara dos versiones de un presupuesto.
+    
+    Args:
+        old_rubros: Rubros de la versión anterior (lista o iterable)
+        new_rubros: Rubros de la versión nueva
+        tolerance: Tolerancia relativa y absoluta para campos numéricos
+    
+    Returns:
+        Lista de RubroChange en el orden de la versión nueva (los eliminados
+        al final), solo con los rubros que cambiaron
+    """
+    old_by_key = _keyed((rubro_key(rubro), rubro) for rubro in old_rubros)
+    changes = []
+    for key, rubro in _keyed((rubro_key(rubro), rubro) for rubro in new_rubros).items():
+        previous = old_by_key.pop(key, None)
+        if previous is None:
+            changes.append(RubroChange(ADDED, rubro.get('numero_rubro'), rubro.get('detalle'), [], []))
+            continue
+        fields = field_changes(previous, rubro, RUBRO_FIELDS, tolerance)
+        items = diff_items(previous, rubro, tolerance)
+        if fields or items:
+            changes.append(RubroChange(CHANGED, rubro.get('numero_rubro'), rubro.get('detalle'), fields, items))
+    for rubro in old_by_key.values():
+        changes.append(RubroChange(REMOVED, rubro.get('numero_rubro'), rubro.get('detalle'), [], []))
+    return changes
+
+
+def load_rubros(path):
+    """(header_info, rubros) de un PDF de APU o de un libro PUNIS (.xlsx)."""
+    if os.path.splitext(path)[1].lower() == '.xlsx':
+        from punis_reader import read_workbook
+        return read_workbook(path)
+    from pdf_to_excel_apu import parse_document
+    return parse_document(path)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return repr(value)
+
+
+def _format_fields(fields, indent):
+    lines = []
+    for change in fields:
+        delta = f" (Δ {change.delta:+.6g})" if change.delta is not None else ''
+        lines.append(f"{indent}{change.field}: {_format_value(change.old)} → {_format_value(change.new)}{delta}")
+    return lines
+
+
+def format_report(changes):
+    """Reporte legible de diff_rubros."""
+    if not changes:
+        return "Sin cambios."
+    counts = {status: sum(1 for change in changes if change.status == status) for status in (ADDED, REMOVED, CHANGED)}
+    lines = [f"Rubros: {counts[ADDED]} agregados, {counts[REMOVED]} eliminados, {counts[CHANGED]} modificados"]
+    for change in changes:
+        lines.append(f"  Rubro {change.numero_rubro} ({change.status}): {change.detalle}")
+        lines.extend(_format_fields(change.fields, '      '))
+        for item in change.items:
+            cpc = f" [CPC {item.cpc}]" if item.cpc else ''
+            lines.append(f"    {SECTION_LABELS[item.section]} {item.status}: {item.descripcion}{cpc}")
+            lines.extend(_format_fields(item.fields, '        '))
+    return '\n'.join(lines)
+
+
+def changes_as_dicts(changes):
+    """Cambios como listas y dicts simples (para JSON)."""
+    def fields(items):
+        return [change._asdict() for change in items]
+    return [{'status': change.status, 'numero_rubro': change.numero_rubro, 'detalle': change.detalle,
+             'fields': fields(change.fields),
+             'items': [dict(item._asdict(), fields=fields(item.fields)) for item in change.items]}
+            for change in changes]
+
+
+def main():
+    import argparse
+    import json
+    import sys
+    import time
+    
+    parser = argparse.ArgumentParser(description="Compara dos versiones de un presupuesto de APU (PDF o XLSX).")
+    parser.add_argument('anterior', help="Versión anterior (.pdf o .xlsx)")
+    parser.add_argument('nueva', help="Versión nueva (.pdf o .xlsx)")
+    parser.add_argument('--tolerancia', type=float, default=1e-9,
+                        help="Tolerancia para comparar valores numéricos (por defecto 1e-9)")
+    parser.add_argument('--json', metavar='JSON', help="Guarda los cambios en un JSON")
+    args = parser.parse_args()
+    
+    _, old_rubros = load_rubros(args.anterior)
+    _, new_rubros = load_rubros(args.nueva)
+    start = time.perf_counter()
+    changes = diff_rubros(old_rubros, new_rubros, args.tolerancia)
+    elapsed = time.perf_counter() - start
+    print(format_report(changes))
+    print(f"\n  {len(old_rubros)} → {len(new_rubros)} rubros comparados en {elapsed * 1000:.1f} ms")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(changes_as_dicts(changes), f, ensure_ascii=False, indent=1)
+        print(f"  Guardado en: {args.json}")
+    sys.exit(1 if changes else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Verifica que la escritura del Excel no supere un presupuesto de memoria.
+
+Genera rubros sintéticos (sin PDF), los escribe con create_excel y
+convert_to_shared_strings bajo MemoryTracker y termina con código 1 si el pico
+de memoria de Python supera el presupuesto. Sirve como prueba de regresión de
+memoria: un cambio que haga crecer el uso por rubro la hace fallar.
+
+Con --exportar-paginas N además genera PDFs sintéticos de N/8 y N páginas,
+exporta sus items a CSV con apu_export.export_items (vía
+APUConverter.export_items, que parsea y escribe sin acumular rubros) en
+procesos nuevos y falla si el pico de RSS crece más de --crecimiento-kb por
+página: la exportación debe usar memoria casi constante. Requiere el módulo
+resource (no disponible en Windows).
+
+Uso:
+    python check_memory_budget.py [--rubros 500] [--presupuesto-mb 250]
+    python check_memory_budget.py --exportar-paginas 400
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from memory_tracking import MB, MemoryTracker
+from pdf_to_excel_apu import APUConverter, convert_to_shared_strings
+from synthetic_apu import HEADER_INFO, generate_pdf, synthetic_rubro
+
+
+def measure_write(rubros_count, items_per_section=4):
+    """Escribe rubros sintéticos a un Excel temporal y devuelve el MemoryTracker."""
+    converter = APUConverter(None)
+    converter.header_info = dict(HEADER_INFO)
+    converter.rubros = [synthetic_rubro(n, items_per_section, total=rubros_count)
+                        for n in range(1, rubros_count + 1)]
+    
+    tracker = MemoryTracker()
+    converter.timer.memory = tracker
+    fd, output_path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    tracker.start()
+    try:
+        converter.create_excel(output_path)
+        with converter.timer.stage('shared_strings'):
+            convert_to_shared_strings(output_path)
+    finally:
+        tracker.stop()
+        os.remove(output_path)
+    return tracker
+
+
+def _export_peak_rss(pdf_path, output_path, conn):
+    """Proceso de medición: exporta los items y devuelve el pico de RSS en KB."""
+    import resource
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        APUConverter(pdf_path).export_items(output_path)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send(peak_kb if sys.platform != 'darwin' else peak_kb // 1024)  # macOS informa bytes
+
+
+def measure_export(pages, rows_per_section=4):
+    """Pico de RSS (KB) de exportar un PDF sintético de pages páginas, en un proceso nuevo."""
+    with tempfile.TemporaryDirectory() as folder:
+        pdf_path = os.path.join(folder, 'sintetico.pdf')
+        generate_pdf(pdf_path, pages=pages, rows_per_section=rows_per_section)
+        context = multiprocessing.get_context('spawn')
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(target=_export_peak_rss,
+                                  args=(pdf_path, os.path.join(folder, 'items.csv'), child_conn))
+        process.start()
+        peak_kb = parent_conn.recv()
+        process.join()
+    return peak_kb
+
+
+def check_export(pages, max_growth_kb):
+    """Compara el pico de RSS de exportar pages/8 y pages páginas; False si crece demasiado."""
+    small = max(1, pages // 8)
+    print(f"Exportando PDFs sintéticos de {small} y {pages} páginas...")
+    small_kb = measure_export(small)
+    large_kb = measure_export(pages)
+    growth_kb = (large_kb - small_kb) / (pages - small) if pages > small else 0.0
+    print(f"  Pico de RSS: {small_kb / 1024:.1f} MB ({small} páginas), {large_kb / 1024:.1f} MB ({pages} páginas); "
+          f"{growth_kb:.0f} KB por página")
+    if growth_kb > max_growth_kb:
+        print(f"\nERROR: la exportación crece {growth_kb:.0f} KB por página (máximo {max_growth_kb:.0f} KB)")
+        return False
+    print(f"\nOK: la exportación crece {growth_kb:.0f} KB por página (máximo {max_growth_kb:.0f} KB)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de presupuesto de memoria de la escritura del Excel")
+    parser.add_argument('--rubros', type=int, default=500, help="Cantidad de rubros sintéticos")
+    parser.add_argument('--items', type=int, default=4, help="Items por sección de cada rubro")
+    parser.add_argument('--presupuesto-mb', type=float, default=250.0,
+                        help="Pico máximo de memoria de Python permitido (MB)")
+    parser.add_argument('--exportar-paginas', type=int, metavar='N',
+                        help="Verifica además que exportar items de un PDF sintético de N páginas no crezca por página")
+    parser.add_argument('--crecimiento-kb', type=float, default=200.0,
+                        help="Con --exportar-paginas: crecimiento máximo del pico de RSS por página (KB)")
+    args = parser.parse_args()
+    
+    if args.exportar_paginas and not check_export(args.exportar_paginas, args.crecimiento_kb):
+        sys.exit(1)
+    
+    print(f"Escribiendo {args.rubros} rubros sintéticos ({args.items} items por sección)...")
+    tracker = measure_write(args.rubros, args.items)
+    print(tracker.summary())
+    
+    peak_mb = tracker.traced_peak() / MB
+    if peak_mb > args.presupuesto_mb:
+        print(f"\nERROR: pico de {peak_mb:.1f} MB supera el presupuesto de {args.presupuesto_mb:.1f} MB")
+        sys.exit(1)
+    print(f"\nOK: pico de {peak_mb:.1f} MB dentro del presupuesto de {args.presupuesto_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Conversión en tubería (productor/consumidor) de PDFs de APU.
+
+Los procesos de parseo entregan los rubros terminados a una cola acotada y el
+escritor los consume en orden de página, escribiendo sus filas mientras las
+páginas siguientes todavía se están parseando. El tiempo total tiende a
+max(parseo, escritura) en lugar de la suma de ambas fases.
+"""
+
+import os
+from collections import deque
+from multiprocessing import Pool
+
+import pdfplumber
+
+from pdf_to_excel_apu import APUConverter, convert_to_shared_strings, parse_apu_page
+from stage_timing import StageTimer
+
+
+# Estado de cada proceso de parseo (se abre el PDF una sola vez por proceso)
+_worker_pdf = None
+_worker_timer = None
+
+
+def _init_worker(pdf_path):
+    """Inicializa un proceso de parseo abriendo el PDF."""
+    global _worker_pdf, _worker_timer
+    _worker_pdf = pdfplumber.open(pdf_path)
+    _worker_timer = StageTimer()
+
+
+def _parse_page(page_index):
+    """
+    Parsea una página en el proceso de parseo.
+    
+    Returns:
+        Tupla (rubro, header_info encontrado en la página, tiempos de la página)
+    """
+    # Encabezado por página: el escritor toma el primero en orden de página,
+    # igual que extract_all_rubros
+    _worker_timer.start_page(page_index + 1)
+    page = _worker_pdf.pages[page_index]
+    rubro, header = parse_apu_page(page, _worker_timer)
+    page.close()
+    page_timing = _worker_timer.end_page()
+    return rubro, header, page_timing
+
+
+def convert_pipelined(pdf_path, output_path, workers=None, max_pending=None, memory=None, max_memory_mb=None):
+    """
+    Convierte un PDF a Excel solapando el parseo de páginas con la escritura.
+    
+    Args:
+        pdf_path: Ruta al archivo PDF
+        output_path: Ruta de salida para el Excel
+        workers: Número de procesos de parseo (por defecto, núcleos disponibles)
+        max_pending: Páginas en vuelo como máximo (tamaño de la cola acotada)
+        memory: MemoryTracker opcional; mide solo el proceso escritor
+        max_memory_mb: Si se indica, los rubros que superen estos MB se guardan
+                       en disco (ver rubro_store.py)
+    
+    Returns:
+        APUConverter con los rubros y el encabezado del documento
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    
+    converter = APUConverter(pdf_path)
+    timer = converter.timer
+    timer.memory = memory
+    if max_memory_mb is not None:
+        from rubro_store import MB, RubroStore
+        converter.rubros = RubroStore(int(max_memory_mb * MB))
+    with timer.stage('pdf_open'):
+        with pdfplumber.open(pdf_path) as pdf:
+            total_pages = len(pdf.pages)
+    
+    with timer.stage('workbook_build'):
+        wb, ws, estilos, dv = converter._start_workbook()
+    current_row = 0
+    block_starts = []
+    headerless_blocks = []  # Bloques escritos antes de encontrar el encabezado
+    
+    print(f"Procesando {total_pages} páginas en tubería con {workers} procesos...")
+    with Pool(workers, initializer=_init_worker, initargs=(pdf_path,)) as pool:
+        pending = deque()
+        next_page = 0
+        while next_page < total_pages or pending:
+            while next_page < total_pages and len(pending) < max_pending:
+                pending.append(pool.apply_async(_parse_page, (next_page,)))
+                next_page += 1
+            
+            # Consumir siempre la página más antigua para escribir en orden
+            page_number = next_page - len(pending) + 1
+            print(f"  Procesando página {page_number}/{total_pages}...", end='\r')
+            with timer.stage('pipeline_wait'):
+                rubro, page_header, page_timing = pending.popleft().get()
+            timer.merge_page(page_timing)
+            if not converter.header_info and page_header:
+                converter.header_info = page_header
+            
+            if rubro and rubro['numero_rubro']:
+                converter.rubros.append(rubro)
+                block_starts.append(current_row + 1)
+                if not converter.header_info:
+                    headerless_blocks.append(current_row + 1)
+                # El total de hojas se corrige al final, cuando se conoce
+                with timer.stage('workbook_build'):
+                    current_row = converter._write_rubro(ws, current_row, rubro, len(converter.rubros),
+                                                         total_pages, estilos, dv)
+    print(f"\n  Encontrados {len(converter.rubros)} rubros.")
+    
+    # === FILA 7 de cada bloque: HOJA n DE total ===
+    total_rubros = len(block_starts)
+    for rubro_idx, start_row in enumerate(block_starts, 1):
+        ws.cell(row=start_row + 6, column=7).value = f'HOJA {rubro_idx} DE {total_rubros}'
+    
+    # === FILAS 3 y 5 de los bloques escritos sin encabezado ===
+    header_info = converter.header_info
+    for start_row in headerless_blocks:
+        ws.cell(row=start_row + 2, column=1).value = header_info.get('profesional', '') + '\n'
+        ws.cell(row=start_row + 4, column=1).value = (header_info.get('proyecto', '') + '\n'
+                                                      + header_info.get('ubicacion', ''))
+    
+    converter._finish_workbook(wb, ws)
+    with timer.stage('wb_save'):
+        wb.save(output_path)
+    print(f"Archivo guardado: {output_path}")
+    
+    # Post-procesar para asegurar compatibilidad con PUNIS (Shared Strings)
+    with timer.stage('shared_strings'):
+        convert_to_shared_strings(output_path)
+    return converter
@@ -0,0 +1,157 @@
+"""
+Pool de procesos persistente para convertir desde la interfaz gráfica.
+
+Los procesos se crean una sola vez al abrir la ventana e importan el
+convertidor (pdfplumber, pdfminer, openpyxl) mientras el usuario elige el
+archivo, así que a partir de la primera conversión solo se paga el parseo y la
+escritura. Como el parseo corre en otro proceso, no compite por el GIL con el
+bucle de Tk.
+
+El avance de cada conversión llega por una cola compartida (WarmPool.events)
+como tuplas (id del trabajo, etapa, hechos, total, rubros), y cada trabajo
+tiene su propio evento de cancelación que el convertidor consulta entre
+páginas.
+"""
+
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+
+
+PROGRESS_INTERVAL = 0.1  # Segundos mínimos entre avisos de avance de un trabajo
+
+# Cola de avance del pool en cada proceso (la fija _warm_up)
+_events = None
+
+
+def _warm_up(events=None):
+    """Inicializa un proceso del pool: importa el convertidor y guarda un libro vacío."""
+    global _events
+    import io
+    
+    from openpyxl import Workbook
+    
+    import pdf_to_excel_apu  # Solo para dejarlo importado en este proceso
+    
+    # La primera escritura importa los módulos de serialización de openpyxl
+    Workbook().save(io.BytesIO())
+    _events = events
+
+
+def run_conversion(pdf_path, output_path=None, job_id=None, cancel=None):
+    """
+    Convierte un PDF en el proceso actual.
+    
+    Args:
+        job_id: Identificador con el que se publican los avisos de avance en
+                la cola del pool (si el proceso es del pool)
+        cancel: Evento de cancelación (opcional, ver APUConverter)
+    
+    Returns:
+        Dict con output, rubros, parse_seconds y write_seconds
+    
+    Raises:
+        ConversionCancelled: Si se activó cancel
+    """
+    from batch_conversion import default_output_path
+    from pdf_to_excel_apu import APUConverter, convert_to_shared_strings
+    
+    events = _events
+    progress = None
+    if events is not None:
+        last_sent = 0.0
+        
+        def progress(stage, done, total, rubros):
+            # Una página o un rubro por aviso sería demasiado tráfico entre procesos
+            nonlocal last_sent
+            now = time.perf_counter()
+            if done == total or now - last_sent >= PROGRESS_INTERVAL:
+                last_sent = now
+                events.put((job_id, stage, done, total, rubros))
+    
+    output_path = output_path or default_output_path(pdf_path)
+    start = time.perf_counter()
+    converter = APUConverter(pdf_path, progress, cancel)
+    converter.extract_all_rubros()
+    parsed = time.perf_counter()
+    converter.create_excel(output_path)
+    convert_to_shared_strings(output_path)
+    return {'output': output_path, 'rubros': len(converter.rubros),
+            'parse_seconds': parsed - start, 'write_seconds': time.perf_counter() - parsed}
+
+
+class ConversionJob:
+    """Conversión enviada al pool: resultado (AsyncResult) y evento de cancelación."""
+    
+    def __init__(self, job_id, pdf_path, result, cancel_event):
+        self.id = job_id
+        self.pdf_path = pdf_path
+        self.result = result
+        self._cancel_event = cancel_event
+    
+    def cancel(self):
+        """Pide la cancelación; el proceso se detiene en la próxima página o rubro."""
+        self._cancel_event.set()
+
+
+class WarmPool:
+    """
+    Pool de procesos que se mantiene vivo entre conversiones.
+    
+    Usa el método spawn: hacer fork de un proceso con Tk y varios hilos no es
+    seguro, y así el comportamiento es el mismo en Windows.
+    """
+    
+    def __init__(self, workers=None):
+        self.workers = workers or min(2, os.cpu_count() or 1)
+        context = multiprocessing.get_context('spawn')
+        self._context = context
+        self.events = context.Queue()
+        self._pool = context.Pool(self.workers, initializer=_warm_up, initargs=(self.events,))
+        self._ids = itertools.count(1)
+        # Eventos de cancelación de los trabajos en curso (id -> proxy): el pool los
+        # retiene hasta que el trabajo termina; si el llamador descarta el
+        # ConversionJob, liberar el proxy borraría el evento del Manager y el
+        # proceso que lo usa fallaría sin que el resultado llegue nunca
+        self._cancel_events = {}
+        # Los eventos de cancelación de cada trabajo vienen de un Manager (se
+        # pueden pasar como argumento de la tarea); arrancarlo demora, así que
+        # se hace en segundo plano para no retrasar la ventana
+        self._manager = None
+        self._manager_thread = threading.Thread(target=self._start_manager, args=(context,), daemon=True)
+        self._manager_thread.start()
+    
+    def _start_manager(self, context):
+        self._manager = context.Manager()
+    
+    def resize(self, workers):
+        """Recrea el pool con otra cantidad de procesos; solo si no hay trabajos en curso."""
+        if workers == self.workers:
+            return
+        self._pool.terminate()
+        self._pool.join()
+        self._cancel_events.clear()
+        self.workers = workers
+        self._pool = self._context.Pool(workers, initializer=_warm_up, initargs=(self.events,))
+    
+    def submit(self, pdf_path, output_path=None):
+        """Encola una conversión; el resultado del ConversionJob es el dict de run_conversion."""
+        job_id = next(self._ids)
+        self._manager_thread.join()
+        cancel = self._manager.Event()
+        self._cancel_events[job_id] = cancel
+        
+        def release(_):
+            self._cancel_events.pop(job_id, None)
+        
+        result = self._pool.apply_async(run_conversion, (pdf_path, output_path, job_id, cancel),
+                                        callback=release, error_callback=release)
+        return ConversionJob(job_id, pdf_path, result, cancel)
+    
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+        self._manager_thread.join()
+        self._manager.shutdown()
@@ -1,23 +1,34 @@
 """
 Interfaz gráfica para el Convertidor de APU (PDF a Excel)
-Permite seleccionar archivos PDF y convertirlos al formato Excel estandarizado.
+Permite seleccionar archivos PDF (o carpetas enteras) y convertirlos al formato
+Excel estandarizado, varios a la vez.
 """
 
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import os
+import queue
 import sys
-import threading
+import time
 
 # Importar el convertidor
-from pdf_to_excel_apu import convert_pdf_to_excel, APUConverter
+from batch_conversion import expand_inputs, unique_output_path
+from conversion_service import WarmPool
+from pdf_to_excel_apu import ConversionCancelled
+
+
+POLL_MS = 100  # Intervalo de consulta de la cola de avance
+PARSE_WEIGHT = 0.9  # Fracción del avance de un trabajo que corresponde al parseo (el resto, escritura)
+
+# Estados de los trabajos de la tabla
+PENDING, RUNNING, DONE, FAILED, CANCELLED = 'Pendiente', 'Convirtiendo', 'Terminado', 'Error', 'Cancelado'
 
 
 class APUConverterGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Convertidor APU - PDF a Excel")
-        self.root.geometry("600x400")
+        self.root.geometry("820x560")
         self.root.resizable(True, True)
         
         # Configurar estilo
@@ -30,55 +41,89 @@ class APUConverterGUI:
         main_frame.pack(fill=tk.BOTH, expand=True)
         
         # Título
-        title_label = ttk.Label(main_frame, text="Convertidor de Análisis de Precios Unitarios", 
+        title_label = ttk.Label(main_frame, text="Convertidor de Análisis de Precios Unitarios",
                                 font=('Arial', 14, 'bold'))
         title_label.pack(pady=10)
         
         subtitle_label = ttk.Label(main_frame, text="PDF con VAE → Excel Estandarizado")
         subtitle_label.pack()
         
-        # Frame de selección de archivo
-        file_frame = ttk.LabelFrame(main_frame, text="Archivo de entrada", padding="10")
+        # Frame de archivos de entrada
+        file_frame = ttk.LabelFrame(main_frame, text="Archivos de entrada", padding="10")
         file_frame.pack(fill=tk.X, pady=10)
         
-        self.file_path = tk.StringVar()
-        file_entry = ttk.Entry(file_frame, textvariable=self.file_path, width=50)
-        file_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(file_frame, text="Agregar PDFs...", command=self.browse_files).pack(side=tk.LEFT)
+        ttk.Button(file_frame, text="Agregar carpeta...", command=self.browse_folder).pack(side=tk.LEFT, padx=5)
+        ttk.Button(file_frame, text="Quitar terminados", command=self.remove_finished).pack(side=tk.LEFT)
         
-        browse_btn = ttk.Button(file_frame, text="Examinar...", command=self.browse_file)
-        browse_btn.pack(side=tk.RIGHT, padx=(5, 0))
+        # Conversiones simultáneas (procesos del pool)
+        self.max_jobs = tk.IntVar(value=min(2, os.cpu_count() or 1))
+        ttk.Spinbox(file_frame, from_=1, to=os.cpu_count() or 1, width=4,
+                    textvariable=self.max_jobs).pack(side=tk.RIGHT)
+        ttk.Label(file_frame, text="Conversiones simultáneas:").pack(side=tk.RIGHT)
         
         # Frame de salida
-        output_frame = ttk.LabelFrame(main_frame, text="Archivo de salida (opcional)", padding="10")
+        output_frame = ttk.LabelFrame(main_frame, text="Carpeta de salida (opcional, por defecto la del PDF)",
+                                      padding="10")
         output_frame.pack(fill=tk.X, pady=10)
         
-        self.output_path = tk.StringVar()
-        output_entry = ttk.Entry(output_frame, textvariable=self.output_path, width=50)
+        self.output_dir = tk.StringVar()
+        output_entry = ttk.Entry(output_frame, textvariable=self.output_dir, width=50)
         output_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
         output_btn = ttk.Button(output_frame, text="Examinar...", command=self.browse_output)
         output_btn.pack(side=tk.RIGHT, padx=(5, 0))
         
-        # Barra de progreso
-        self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
-        self.progress.pack(fill=tk.X, pady=10)
+        # Tabla de trabajos
+        table_frame = ttk.Frame(main_frame)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        columns = ('archivo', 'estado', 'paginas', 'tiempo', 'salida')
+        self.table = ttk.Treeview(table_frame, columns=columns, show='headings', height=8)
+        for column, heading, width in (('archivo', "Archivo", 180), ('estado', "Estado", 200),
+                                       ('paginas', "Páginas", 60), ('tiempo', "Tiempo", 60),
+                                       ('salida', "Salida", 260)):
+            self.table.heading(column, text=heading)
+            self.table.column(column, width=width, stretch=column in ('archivo', 'salida'))
+        table_scroll = ttk.Scrollbar(table_frame, command=self.table.yview)
+        self.table.configure(yscrollcommand=table_scroll.set)
+        table_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.table.pack(fill=tk.BOTH, expand=True)
+        
+        # Barra de progreso del lote y avance (archivos, tiempo restante)
+        self.progress = ttk.Progressbar(main_frame, mode='determinate', maximum=100)
+        self.progress.pack(fill=tk.X, pady=(10, 0))
+        self.status = tk.StringVar()
+        ttk.Label(main_frame, textvariable=self.status).pack(anchor=tk.W)
         
         # Área de log
         log_frame = ttk.LabelFrame(main_frame, text="Estado", padding="5")
-        log_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        log_frame.pack(fill=tk.BOTH, pady=10)
         
-        self.log_text = tk.Text(log_frame, height=8, state='disabled', wrap=tk.WORD)
+        self.log_text = tk.Text(log_frame, height=4, state='disabled', wrap=tk.WORD)
         scrollbar = ttk.Scrollbar(log_frame, command=self.log_text.yview)
         self.log_text.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
-        # Botón de convertir
-        convert_btn = ttk.Button(main_frame, text="Convertir PDF a Excel", 
-                                 command=self.start_conversion, style='TButton')
-        convert_btn.pack(pady=10)
+        # Botones de convertir, cancelar y reintentar
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack()
+        self.convert_btn = ttk.Button(button_frame, text="Convertir PDF a Excel",
+                                      command=self.start_conversion, style='TButton')
+        self.convert_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn = ttk.Button(button_frame, text="Cancelar", command=self.cancel_conversion,
+                                     state='disabled')
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Reintentar fallidos", command=self.retry_failed).pack(side=tk.LEFT, padx=5)
         
-        self.log("Listo. Selecciona un archivo PDF para convertir.")
+        # Pool de procesos persistente: se calienta mientras se eligen los archivos
+        self.pool = WarmPool(self.job_limit())
+        self.jobs = {}  # Fila de la tabla -> estado del trabajo
+        self.batch_start = None
+        self.polling = False
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.log("Listo. Agrega archivos PDF o una carpeta para convertir.")
     
     def log(self, message):
         """Agrega un mensaje al área de log."""
@@ -86,77 +131,226 @@ class APUConverterGUI:
         self.log_text.insert(tk.END, message + "\n")
         self.log_text.see(tk.END)
         self.log_text.configure(state='disabled')
-        self.root.update()
     
-    def browse_file(self):
-        """Abre diálogo para seleccionar archivo PDF."""
-        filepath = filedialog.askopenfilename(
-            title="Seleccionar archivo PDF",
+    def job_limit(self):
+        """Conversiones simultáneas elegidas (1 si el campo no tiene un número válido)."""
+        try:
+            return max(1, self.max_jobs.get())
+        except tk.TclError:
+            return 1
+    
+    def add_files(self, paths):
+        """Agrega a la tabla los PDFs de paths (archivos o carpetas) que no estén ya."""
+        known = {job['pdf'] for job in self.jobs.values()}
+        added = 0
+        for pdf_path in expand_inputs(paths):
+            pdf_path = os.path.abspath(pdf_path)
+            if pdf_path in known:
+                continue
+            known.add(pdf_path)
+            item = self.table.insert('', tk.END)
+            self.jobs[item] = {'pdf': pdf_path, 'status': PENDING, 'job': None, 'start': None,
+                               'pages': '', 'fraction': 0.0, 'detail': '', 'elapsed': None, 'output': ''}
+            self.update_row(item)
+            added += 1
+        self.log(f"{added} archivos agregados." if added else "No se encontraron PDFs nuevos.")
+    
+    def browse_files(self):
+        """Abre diálogo para seleccionar uno o varios archivos PDF."""
+        filepaths = filedialog.askopenfilenames(
+            title="Seleccionar archivos PDF",
             filetypes=[("Archivos PDF", "*.pdf"), ("Todos los archivos", "*.*")]
         )
-        if filepath:
-            self.file_path.set(filepath)
-            # Auto-generar nombre de salida
-            base_name = os.path.splitext(os.path.basename(filepath))[0]
-            output_name = f"{base_name}_CONVERTIDO.xlsx"
-            output_full = os.path.join(os.path.dirname(filepath), output_name)
-            self.output_path.set(output_full)
-            self.log(f"Archivo seleccionado: {os.path.basename(filepath)}")
+        if filepaths:
+            self.add_files(filepaths)
+    
+    def browse_folder(self):
+        """Abre diálogo para seleccionar una carpeta con PDFs."""
+        folder = filedialog.askdirectory(title="Seleccionar carpeta con PDFs")
+        if folder:
+            self.add_files([folder])
     
     def browse_output(self):
-        """Abre diálogo para seleccionar archivo de salida."""
-        filepath = filedialog.asksaveasfilename(
-            title="Guardar archivo Excel como",
-            defaultextension=".xlsx",
-            filetypes=[("Archivos Excel", "*.xlsx"), ("Todos los archivos", "*.*")]
-        )
-        if filepath:
-            self.output_path.set(filepath)
+        """Abre diálogo para seleccionar la carpeta de salida."""
+        folder = filedialog.askdirectory(title="Guardar los archivos Excel en")
+        if folder:
+            self.output_dir.set(folder)
+    
+    def remove_finished(self):
+        """Quita de la tabla los trabajos terminados."""
+        for item in [item for item, job in self.jobs.items() if job['status'] == DONE]:
+            self.table.delete(item)
+            del self.jobs[item]
+    
+    def update_row(self, item):
+        job = self.jobs[item]
+        elapsed = job['elapsed']
+        if elapsed is None and job['start'] is not None:
+            elapsed = time.perf_counter() - job['start']
+        status = f"{job['status']} {job['detail']}".strip()
+        self.table.item(item, values=(os.path.basename(job['pdf']), status, job['pages'],
+                                      f"{elapsed:.1f} s" if elapsed is not None else '', job['output']))
     
     def start_conversion(self):
-        """Inicia la conversión en un hilo separado."""
-        pdf_path = self.file_path.get()
-        output_path = self.output_path.get() or None
-        
-        if not pdf_path:
-            messagebox.showerror("Error", "Por favor selecciona un archivo PDF")
+        """Envía al pool los trabajos pendientes y empieza a consultar su avance."""
+        if not any(job['status'] == PENDING for job in self.jobs.values()):
+            messagebox.showerror("Error", "Por favor agrega archivos PDF para convertir")
             return
         
-        if not os.path.exists(pdf_path):
-            messagebox.showerror("Error", f"El archivo no existe: {pdf_path}")
-            return
+        if not any(job['status'] == RUNNING for job in self.jobs.values()):
+            # Sin trabajos en curso se puede ajustar la cantidad de procesos del pool
+            self.pool.resize(self.job_limit())
+            self.batch_start = time.perf_counter()
+            self.log("Iniciando conversión...")
+        self.cancel_btn.configure(state='normal')
+        self.schedule()
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_MS, self.poll_conversion)
+    
+    def schedule(self):
+        """Envía trabajos pendientes hasta llegar al máximo de conversiones simultáneas."""
+        limit = min(self.job_limit(), self.pool.workers)
+        running = sum(1 for job in self.jobs.values() if job['status'] == RUNNING)
+        # Salidas ya usadas por otros trabajos: dos PDFs con el mismo nombre no deben pisarse
+        taken = {os.path.normcase(os.path.abspath(job['output'])) for job in self.jobs.values() if job['output']}
+        for item, job in self.jobs.items():
+            if running >= limit:
+                break
+            if job['status'] != PENDING:
+                continue
+            if not os.path.exists(job['pdf']):
+                job.update(status=FAILED, detail="(no existe el archivo)")
+                self.update_row(item)
+                continue
+            output_path = unique_output_path(job['pdf'], self.output_dir.get() or None, taken)
+            job.update(status=RUNNING, detail="(esperando)", start=time.perf_counter(), elapsed=None,
+                       fraction=0.0, output=output_path, job=self.pool.submit(job['pdf'], output_path))
+            self.update_row(item)
+            running += 1
+    
+    def cancel_conversion(self):
+        """Cancela los trabajos en curso y los pendientes."""
+        for item, job in self.jobs.items():
+            if job['status'] == RUNNING:
+                job['job'].cancel()
+                job['detail'] = "(cancelando)"
+            elif job['status'] == PENDING:
+                job.update(status=CANCELLED, detail='')
+            self.update_row(item)
+        self.cancel_btn.configure(state='disabled')
+    
+    def retry_failed(self):
+        """Vuelve a encolar los trabajos con error o cancelados."""
+        retried = 0
+        for item, job in self.jobs.items():
+            if job['status'] in (FAILED, CANCELLED):
+                job.update(status=PENDING, detail='', start=None, elapsed=None, fraction=0.0)
+                self.update_row(item)
+                retried += 1
+        if retried:
+            self.start_conversion()
+    
+    def poll_conversion(self):
+        """Vacía la cola de avance y consulta los resultados sin bloquear el bucle de Tk."""
+        by_id = {job['job'].id: item for item, job in self.jobs.items() if job['status'] == RUNNING}
+        while True:
+            try:
+                job_id, stage, done, total, rubros = self.pool.events.get_nowait()
+            except queue.Empty:
+                break
+            item = by_id.get(job_id)
+            if item is not None:
+                self.show_progress(item, stage, done, total, rubros)
+        
+        for item in by_id.values():
+            if self.jobs[item]['job'].result.ready():
+                self.finish_job(item)
+            else:
+                self.update_row(item)
+        self.schedule()
+        self.show_batch_progress()
         
-        # Iniciar conversión en hilo separado
-        self.progress.start()
-        thread = threading.Thread(target=self.convert, args=(pdf_path, output_path))
-        thread.start()
+        if any(job['status'] == RUNNING for job in self.jobs.values()):
+            self.root.after(POLL_MS, self.poll_conversion)
+        else:
+            self.polling = False
+            self.cancel_btn.configure(state='disabled')
+            self.finish_batch()
     
-    def convert(self, pdf_path, output_path):
-        """Ejecuta la conversión."""
+    def show_progress(self, item, stage, done, total, rubros):
+        """Actualiza el avance de un trabajo con una estimación de su tiempo restante."""
+        job = self.jobs[item]
+        if stage == 'parseo':
+            job['pages'] = total
+            fraction = PARSE_WEIGHT * done / total if total else PARSE_WEIGHT
+            detail = f"página {done}/{total} · {rubros} rubros"
+        else:
+            fraction = PARSE_WEIGHT + (1 - PARSE_WEIGHT) * done / total if total else 1
+            detail = f"escribiendo {done}/{total}"
+        job['fraction'] = fraction
+        elapsed = time.perf_counter() - job['start']
+        if 0 < fraction < 1:
+            detail += f" · ~{elapsed * (1 - fraction) / fraction:.0f} s"
+        job['detail'] = f"({detail})"
+        self.update_row(item)
+    
+    def show_batch_progress(self):
+        """Barra del lote: archivos terminados más la fracción de los que están en curso."""
+        active = [job for job in self.jobs.values() if job['status'] != CANCELLED]
+        if not active:
+            return
+        finished = sum(1 for job in active if job['status'] in (DONE, FAILED))
+        running = [job for job in active if job['status'] == RUNNING]
+        fraction = (finished + sum(job['fraction'] for job in running)) / len(active)
+        self.progress['value'] = fraction * 100
+        text = f"{finished}/{len(active)} archivos"
+        elapsed = time.perf_counter() - self.batch_start
+        if running and 0 < fraction < 1:
+            text += f" · quedan ~{elapsed * (1 - fraction) / fraction:.0f} s"
+        self.status.set(text)
+    
+    def finish_job(self, item):
+        """Registra el resultado de un trabajo terminado."""
+        job = self.jobs[item]
+        job['elapsed'] = time.perf_counter() - job['start']
         try:
-            self.log("Iniciando conversión...")
-            result = convert_pdf_to_excel(pdf_path, output_path)
-            self.progress.stop()
-            self.log(f"✓ Conversión completada!")
-            self.log(f"  Archivo generado: {result}")
-            messagebox.showinfo("Éxito", f"Conversión completada!\n\nArchivo: {os.path.basename(result)}")
+            summary = job['job'].result.get()
+        except ConversionCancelled:
+            job.update(status=CANCELLED, detail='', output='')
         except Exception as e:
-            self.progress.stop()
-            self.log(f"✗ Error: {str(e)}")
-            messagebox.showerror("Error", f"Error durante la conversión:\n{str(e)}")
+            job.update(status=FAILED, detail='', output='')
+            self.log(f"✗ {os.path.basename(job['pdf'])}: {str(e)}")
+        else:
+            job.update(status=DONE, detail=f"({summary['rubros']} rubros)", fraction=1.0, output=summary['output'])
+            self.log(f"✓ {os.path.basename(job['pdf'])}: parseo {summary['parse_seconds']:.1f} s, "
+                     f"escritura {summary['write_seconds']:.1f} s")
+        self.update_row(item)
+    
+    def finish_batch(self):
+        """Resumen al terminar todos los trabajos en curso."""
+        counts = {status: sum(1 for job in self.jobs.values() if job['status'] == status)
+                  for status in (DONE, FAILED, CANCELLED)}
+        self.status.set(f"Terminado en {time.perf_counter() - self.batch_start:.1f} s")
+        self.log(f"Lote terminado: {counts[DONE]} convertidos, {counts[FAILED]} con error, "
+                 f"{counts[CANCELLED]} cancelados.")
+        if counts[FAILED]:
+            messagebox.showerror("Error", f"{counts[FAILED]} archivos no se pudieron convertir.\n\n"
+                                          "Puedes reintentarlos con \"Reintentar fallidos\".")
+    
+    def close(self):
+        """Cierra el pool de procesos y la ventana."""
+        self.pool.close()
+        self.root.destroy()
 
 
 def main():
     root = tk.Tk()
     app = APUConverterGUI(root)
     
-    # Si se pasó un archivo como argumento, cargarlo
+    # Archivos o carpetas pasados como argumento (p. ej. arrastrados sobre el .bat)
     if len(sys.argv) > 1:
-        app.file_path.set(sys.argv[1])
-        base_name = os.path.splitext(os.path.basename(sys.argv[1]))[0]
-        output_name = f"{base_name}_CONVERTIDO.xlsx"
-        output_full = os.path.join(os.path.dirname(sys.argv[1]), output_name)
-        app.output_path.set(output_full)
+        app.add_files(sys.argv[1:])
     
     root.mainloop()
 
@@ -0,0 +1,354 @@
+"""
+Comparación en streaming de un Excel generado contra un libro de referencia.
+
+Lee ambas hojas en paralelo con xlsx_inspect (sin extraer los zips), divide
+cada una en bloques de rubro y empareja las filas por (rubro, sección, fila
+dentro de la sección), así que un rubro con una fila de más no desalinea el
+resto del libro. Compara valores, tipos (s, inlineStr, n, ...), estilos,
+celdas combinadas y rangos de validación, se detiene en las primeras N
+diferencias y las reporta como "Rubro 5, mano de obra fila 2, columna F".
+
+Uso:
+    python golden_compare.py REFERENCIA.xlsx GENERADO.xlsx [--max 50] [--ignorar estilos,validaciones]
+"""
+
+import bisect
+import re
+import sys
+from collections import namedtuple
+
+from xlsx_inspect import XlsxWorkbook, column_index, split_ref
+
+
+CHECKS = ('values', 'types', 'styles', 'merges', 'validations')
+CHECK_NAMES = {'valores': 'values', 'tipos': 'types', 'estilos': 'styles',
+               'combinadas': 'merges', 'validaciones': 'validations'}
+
+RUBRO_PATTERN = re.compile(r'RUBRO\s*:\s*(\d+)')
+RUBRO_ROW_OFFSET = 7  # La fila "RUBRO :" es la 8.ª de cada bloque
+SECTION_TITLES = [('EQUIPO', 'equipo'), ('MANO DE OBRA', 'mano_obra'),
+                  ('MATERIALES', 'materiales'), ('TRANSPORTE', 'transporte')]
+SECTION_LABELS = {'encabezado': 'encabezado', 'equipo': 'equipo', 'mano_obra': 'mano de obra',
+                  'materiales': 'materiales', 'transporte': 'transporte', 'totales': 'totales'}
+
+STYLE_PARTS = ('formato', 'fuente', 'relleno', 'bordes', 'alineación')
+
+# Posición de una fila en términos del APU: bloque (orden), número de rubro,
+# sección y fila dentro de la sección (0 = título de la sección)
+Position = namedtuple('Position', 'block rubro section offset')
+Difference = namedtuple('Difference', 'kind position column ref_cell gen_cell expected actual')
+
+
+class _LimitReached(Exception):
+    pass
+
+
+def _a_text(cells):
+    for cell in cells:
+        if cell.column == 'A':
+            return cell.value if isinstance(cell.value, str) else ''
+    return ''
+
+
+def iter_blocks(book):
+    """
+    Recorre la hoja como bloques de rubro (número de rubro, fila inicial, [(fila, celdas)]).
+    
+    El bloque empieza 7 filas antes de su fila "RUBRO :". Solo se retienen las
+    filas del bloque en curso y las 7 siguientes, así que la memoria no depende
+    del tamaño de la hoja. Las filas previas al primer rubro forman un bloque
+    con número None.
+    """
+    numero, start, rows = None, 1, []
+    pending = []  # Filas que todavía pueden pertenecer al bloque siguiente
+    for row, cells in book.iter_rows():
+        match = RUBRO_PATTERN.match(_a_text(cells))
+        if match:
+            next_start = row - RUBRO_ROW_OFFSET
+            rows.extend(item for item in pending if item[0] < next_start)
+            if rows or numero is not None:
+                yield numero, start, rows
+            numero, start = int(match.group(1)), next_start
+            rows = [item for item in pending if item[0] >= next_start] + [(row, cells)]
+            pending = []
+        else:
+            pending.append((row, cells))
+            while pending and pending[0][0] <= row - RUBRO_ROW_OFFSET:
+                rows.append(pending.pop(0))
+    rows.extend(pending)
+    if rows:
+        yield numero, start, rows
+
+
+def section_rows(start, rows):
+    """Asigna a cada fila del bloque su sección y su fila dentro de la sección."""
+    section, section_start = 'encabezado', start
+    sections = [(start, 'encabezado')]
+    positioned = []
+    for row, cells in rows:
+        text = _a_text(cells).upper()
+        for title, key in SECTION_TITLES:
+            if text.startswith(title) and 'DESCRIPCION' in text:
+                section, section_start = key, row
+                sections.append((row, key))
+        positioned.append((section, row - section_start, row, cells))
+        if text.startswith('SUBTOTAL P'):
+            section, section_start = 'totales', row + 1
+            sections.append((row + 1, 'totales'))
+    return positioned, sections
+
+
+class _Layout:
+    """Ubicación de los bloques y secciones de un libro para traducir filas a posiciones."""
+    
+    def __init__(self):
+        self.starts = []  # fila inicial de cada sección, ordenadas
+        self.entries = []  # (bloque, rubro, sección, fila inicial de la sección)
+    
+    def add(self, block, rubro, sections):
+        for row, section in sections:
+            self.starts.append(row)
+            self.entries.append((block, rubro, section, row))
+    
+    def position(self, row):
+        index = bisect.bisect_right(self.starts, row) - 1
+        if index < 0:
+            return Position(0, None, 'encabezado', row - 1)
+        block, rubro, section, section_start = self.entries[index]
+        return Position(block, rubro, section, row - section_start)
+
+
+def _same_value(a, b, tolerance=1e-9):
+    if a in (None, '') and b in (None, ''):
+        return True
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= tolerance * max(1.0, abs(a), abs(b))
+    return a == b
+
+
+class GoldenComparator:
+    """
+    Compara un libro generado contra uno de referencia.
+    
+    Args:
+        reference_path: Libro de referencia (p. ej. el exportado por PUNIS)
+        generated_path: Libro generado por el convertidor
+        max_differences: Se detiene al llegar a esta cantidad de diferencias
+        checks: Comparaciones a realizar (subconjunto de CHECKS)
+    """
+    
+    def __init__(self, reference_path, generated_path, max_differences=50, checks=CHECKS):
+        self.reference_path = reference_path
+        self.generated_path = generated_path
+        self.max_differences = max_differences
+        self.checks = set(checks)
+        self.differences = []
+        self.blocks_compared = 0
+    
+    def _add(self, kind, position, column=None, ref_cell=None, gen_cell=None, expected=None, actual=None):
+        self.differences.append(Difference(kind, position, column, ref_cell, gen_cell, expected, actual))
+        if len(self.differences) >= self.max_differences:
+            raise _LimitReached()
+    
+    def compare(self):
+        """Ejecuta la comparación y devuelve la lista de diferencias (como mucho max_differences)."""
+        self.differences = []
+        with XlsxWorkbook(self.reference_path) as ref_book, XlsxWorkbook(self.generated_path) as gen_book:
+            ref_styles = ref_book.style_signatures() if 'styles' in self.checks else []
+            gen_styles = gen_book.style_signatures() if 'styles' in self.checks else []
+            ref_layout, gen_layout = _Layout(), _Layout()
+            try:
+                self._compare_cells(ref_book, gen_book, ref_styles, gen_styles, ref_layout, gen_layout)
+                if 'merges' in self.checks:
+                    self._compare_merges(ref_book, gen_book, ref_layout, gen_layout)
+                if 'validations' in self.checks:
+                    self._compare_validations(ref_book, gen_book, ref_layout, gen_layout)
+            except _LimitReached:
+                pass
+        return self.differences
+    
+    def _compare_cells(self, ref_book, gen_book, ref_styles, gen_styles, ref_layout, gen_layout):
+        ref_blocks = iter_blocks(ref_book)
+        gen_blocks = iter_blocks(gen_book)
+        block = 0
+        while True:
+            ref_block = next(ref_blocks, None)
+            gen_block = next(gen_blocks, None)
+            if ref_block is None and gen_block is None:
+                return
+            if ref_block is None or gen_block is None:
+                present = ref_block or gen_block
+                kind = 'rubro_solo_en_referencia' if gen_block is None else 'rubro_solo_en_generado'
+                self._add(kind, Position(block, present[0], 'encabezado', 0))
+                block += 1
+                continue
+            
+            ref_rows, ref_sections = section_rows(ref_block[1], ref_block[2])
+            gen_rows, gen_sections = section_rows(gen_block[1], gen_block[2])
+            ref_layout.add(block, ref_block[0], ref_sections)
+            gen_layout.add(block, gen_block[0], gen_sections)
+            if ref_block[0] != gen_block[0]:
+                self._add('numero_rubro', Position(block, ref_block[0], 'encabezado', 0),
+                          expected=ref_block[0], actual=gen_block[0])
+            self._compare_block(block, ref_block[0], ref_rows, gen_rows, ref_styles, gen_styles)
+            self.blocks_compared += 1
+            block += 1
+    
+    def _compare_block(self, block, rubro, ref_rows, gen_rows, ref_styles, gen_styles):
+        ref_index = {(section, offset): (row, cells) for section, offset, row, cells in ref_rows}
+        gen_index = {(section, offset): (row, cells) for section, offset, row, cells in gen_rows}
+        keys = sorted(set(ref_index) | set(gen_index),
+                      key=lambda key: (list(SECTION_LABELS).index(key[0]), key[1]))
+        for section, offset in keys:
+            position = Position(block, rubro, section, offset)
+            ref_row = ref_index.get((section, offset))
+            gen_row = gen_index.get((section, offset))
+            ref_cells = {cell.column: cell for cell in ref_row[1]} if ref_row else {}
+            gen_cells = {cell.column: cell for cell in gen_row[1]} if gen_row else {}
+            has_values = lambda cells: any(c.value not in (None, '') for c in cells.values())
+            if ref_row is None or gen_row is None:
+                # Una fila vacía de un lado equivale a una fila sin celdas del otro
+                if has_values(ref_cells) or has_values(gen_cells):
+                    kind = 'fila_solo_en_referencia' if gen_row is None else 'fila_solo_en_generado'
+                    self._add(kind, position, ref_cell=ref_row and ref_row[0], gen_cell=gen_row and gen_row[0])
+                    continue
+            for column in sorted(set(ref_cells) | set(gen_cells), key=column_index):
+                self._compare_cell(position, column, ref_cells.get(column), gen_cells.get(column),
+                                   ref_styles, gen_styles)
+    
+    def _compare_cell(self, position, column, ref, gen, ref_styles, gen_styles):
+        ref_value = ref.value if ref else None
+        gen_value = gen.value if gen else None
+        ref_ref = ref.ref if ref else None
+        gen_ref = gen.ref if gen else None
+        empty = ref_value in (None, '') and gen_value in (None, '')
+        if 'values' in self.checks and not _same_value(ref_value, gen_value):
+            self._add('valor', position, column, ref_ref, gen_ref, ref_value, gen_value)
+        elif 'types' in self.checks and not empty and (ref and ref.type) != (gen and gen.type):
+            self._add('tipo', position, column, ref_ref, gen_ref, ref and ref.type, gen and gen.type)
+        if 'styles' in self.checks and not empty:
+            # Las celdas vacías con formato (bordes de relleno del libro de
+            # PUNIS) no se comparan: el convertidor no las escribe
+            ref_style = ref.style if ref else 0
+            gen_style = gen.style if gen else 0
+            ref_signature = ref_styles[ref_style] if ref_style < len(ref_styles) else None
+            gen_signature = gen_styles[gen_style] if gen_style < len(gen_styles) else None
+            if ref_signature != gen_signature:
+                self._add('estilo', position, column, ref_ref, gen_ref,
+                          (ref_style, ref_signature), (gen_style, gen_signature))
+    
+    def _merge_key(self, layout, merge):
+        first, _, last = merge.partition(':')
+        first_col, first_row = split_ref(first)
+        last_col, last_row = split_ref(last or first)
+        top = layout.position(first_row)
+        bottom = layout.position(last_row)
+        return (top, first_col, bottom.section, bottom.offset, last_col)
+    
+    def _compare_merges(self, ref_book, gen_book, ref_layout, gen_layout):
+        ref_merges = {self._merge_key(ref_layout, m): m for m in ref_book.iter_merges()}
+        gen_merges = {self._merge_key(gen_layout, m): m for m in gen_book.iter_merges()}
+        for key in sorted(set(ref_merges) ^ set(gen_merges), key=lambda k: (k[0].block, k[0].section, k[0].offset)):
+            if key in ref_merges:
+                self._add('combinada_solo_en_referencia', key[0], key[1], ref_cell=ref_merges[key])
+            else:
+                self._add('combinada_solo_en_generado', key[0], key[1], gen_cell=gen_merges[key])
+    
+    def _validation_cells(self, book, layout):
+        cells = {}
+        for validation in book.iter_validations():
+            rule = (validation['type'], validation['formula1'])
+            for sqref in validation['sqref']:
+                first, _, last = sqref.partition(':')
+                first_col, first_row = split_ref(first)
+                last_col, last_row = split_ref(last or first)
+                for row in range(first_row, last_row + 1):
+                    for col in range(column_index(first_col), column_index(last_col) + 1):
+                        letters = ''
+                        while col:
+                            col, rem = divmod(col - 1, 26)
+                            letters = chr(65 + rem) + letters
+                        cells[(layout.position(row), letters, rule)] = f'{letters}{row}'
+        return cells
+    
+    def _compare_validations(self, ref_book, gen_book, ref_layout, gen_layout):
+        ref_cells = self._validation_cells(ref_book, ref_layout)
+        gen_cells = self._validation_cells(gen_book, gen_layout)
+        for key in sorted(set(ref_cells) ^ set(gen_cells), key=lambda k: (k[0].block, k[0].section, k[0].offset, k[1])):
+            position, column, rule = key
+            if key in ref_cells:
+                self._add('validacion_solo_en_referencia', position, column, ref_cell=ref_cells[key], expected=rule)
+            else:
+                self._add('validacion_solo_en_generado', position, column, gen_cell=gen_cells[key], actual=rule)
+
+
+def compare_workbooks(reference_path, generated_path, max_differences=50, checks=CHECKS):
+    """Compara dos libros y devuelve como mucho max_differences diferencias."""
+    return GoldenComparator(reference_path, generated_path, max_differences, checks).compare()
+
+
+def describe_position(position):
+    """'Rubro 5, mano de obra fila 2' a partir de una Position."""
+    rubro = f"Rubro {position.rubro}" if position.rubro is not None else f"Bloque {position.block + 1}"
+    section = SECTION_LABELS.get(position.section, position.section)
+    row = 'título' if position.offset == 0 and position.section not in ('encabezado', 'totales') \
+        else f'fila {position.offset}'
+    return f"{rubro}, {section} {row}"
+
+
+def format_differences(differences, limit_reached=False):
+    """Reporte legible de las diferencias."""
+    if not differences:
+        return "Sin diferencias."
+    lines = [f"{len(differences)} diferencias{' (se alcanzó el máximo)' if limit_reached else ''}:"]
+    for diff in differences:
+        where = describe_position(diff.position)
+        if diff.column:
+            where += f", columna {diff.column}"
+        refs = f" (ref {diff.ref_cell or '-'} / gen {diff.gen_cell or '-'})"
+        kind = diff.kind.replace('_', ' ')
+        if diff.kind == 'estilo':
+            parts = [f"{name} {a!r} ≠ {b!r}" for name, a, b in zip(STYLE_PARTS, diff.expected[1] or (), diff.actual[1] or ())
+                     if a != b]
+            detail = f": estilo {diff.expected[0]} ≠ {diff.actual[0]} ({'; '.join(parts)})"
+        elif diff.expected is not None or diff.actual is not None:
+            detail = f": {diff.expected!r} ≠ {diff.actual!r}"
+        else:
+            detail = ''
+        lines.append(f"  {where}{refs}: {kind}{detail}")
+    return '\n'.join(lines)
+
+
+def parse_checks(ignored):
+    """Comparaciones a realizar a partir de la lista de nombres ignorados ('estilos,validaciones')."""
+    ignored = {CHECK_NAMES.get(name.strip(), name.strip()) for name in (ignored or '').split(',') if name.strip()}
+    unknown = ignored - set(CHECKS)
+    if unknown:
+        raise ValueError(f"Comparaciones desconocidas: {', '.join(sorted(unknown))} "
+                         f"(válidas: {', '.join(CHECK_NAMES)})")
+    return tuple(check for check in CHECKS if check not in ignored)
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Compara un Excel generado contra el libro de referencia de PUNIS.")
+    parser.add_argument('referencia', help="Libro de referencia")
+    parser.add_argument('generado', help="Libro generado")
+    parser.add_argument('--max', type=int, default=50, help="Se detiene en las primeras N diferencias")
+    parser.add_argument('--ignorar', default='',
+                        help="Comparaciones a omitir: valores, tipos, estilos, combinadas, validaciones")
+    args = parser.parse_args()
+    
+    try:
+        checks = parse_checks(args.ignorar)
+    except ValueError as e:
+        parser.error(str(e))
+    comparator = GoldenComparator(args.referencia, args.generado, args.max, checks)
+    differences = comparator.compare()
+    print(format_differences(differences, len(differences) >= args.max))
+    sys.exit(1 if differences else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Medición de memoria por etapa de la conversión de APU (opcional).
+
+Combina tracemalloc (memoria reservada por Python, con los sitios de
+asignación) y muestreo del RSS del proceso en un hilo de fondo. tracemalloc
+intercepta cada asignación y vuelve la conversión unas 5-6 veces más lenta
+(APU_CON_VAE.pdf: 8 s sin medir, 47 s con --memoria), por eso solo se activa a
+pedido, a diferencia de los temporizadores de StageTimer.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+
+MB = 1024 * 1024
+
+
+def current_rss():
+    """RSS actual del proceso en bytes, o None si no se puede medir."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform != 'win32':
+        import resource
+        # ru_maxrss es el máximo histórico (KB en Linux, bytes en macOS)
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+    return None
+
+
+def peak_rss():
+    """Pico de RSS del proceso desde su inicio en bytes, o None si no se puede medir."""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        # En Windows psutil expone el pico del working set
+        return getattr(info, 'peak_wset', None) or getattr(info, 'peak_rss', None) or info.rss
+    except ImportError:
+        pass
+    if sys.platform != 'win32':
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+    return None
+
+
+class MemoryTracker:
+    """Pico de memoria por etapa (tracemalloc + RSS) y principales sitios de asignación."""
+    
+    def __init__(self, frames=1, top=10, sample_interval=0.02):
+        self.frames = frames
+        self.top = top
+        self.sample_interval = sample_interval
+        self.stages = {}  # nombre -> {'traced_peak': bytes, 'rss_peak': bytes, 'count': int}
+        self.top_allocations = {}  # nombre -> [(sitio, bytes), ...] del mayor snapshot
+        self.rss_peak = 0
+        self._stack = []  # [nombre, pico traced, pico rss] de las etapas abiertas
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._running = False
+    
+    def start(self):
+        """Activa tracemalloc y el muestreo de RSS."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._running = True
+        self._sampler = threading.Thread(target=self._sample_rss, daemon=True)
+        self._sampler.start()
+    
+    def stop(self):
+        """Detiene el muestreo y tracemalloc."""
+        self._running = False
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        tracemalloc.stop()
+    
+    def _sample_rss(self):
+        while self._running:
+            rss = current_rss()
+            if rss is not None:
+                with self._lock:
+                    self.rss_peak = max(self.rss_peak, rss)
+                    for entry in self._stack:
+                        entry[2] = max(entry[2], rss)
+            time.sleep(self.sample_interval)
+    
+    def enter(self, name):
+        """Abre una etapa: el pico de tracemalloc se reinicia para medirla sola."""
+        if not tracemalloc.is_tracing():
+            return
+        with self._lock:
+            # El pico acumulado hasta ahora pertenece a las etapas que la contienen
+            peak = tracemalloc.get_traced_memory()[1]
+            for entry in self._stack:
+                entry[1] = max(entry[1], peak)
+            tracemalloc.reset_peak()
+            self._stack.append([name, 0, current_rss() or 0])
+    
+    def exit(self, snapshot=False):
+        """
+        Cierra la etapa abierta más reciente.
+        
+        Args:
+            snapshot: Si es True, guarda los principales sitios de asignación
+                      vivos al terminar la etapa (costoso: usar en etapas únicas)
+        """
+        if not tracemalloc.is_tracing() or not self._stack:
+            return
+        with self._lock:
+            name, traced_peak, rss_peak = self._stack.pop()
+            traced_peak = max(traced_peak, tracemalloc.get_traced_memory()[1])
+            rss_peak = max(rss_peak, current_rss() or 0)
+            for entry in self._stack:
+                entry[1] = max(entry[1], traced_peak)
+                entry[2] = max(entry[2], rss_peak)
+            self.rss_peak = max(self.rss_peak, rss_peak)
+        
+        stage = self.stages.setdefault(name, {'traced_peak': 0, 'rss_peak': 0, 'count': 0})
+        stage['traced_peak'] = max(stage['traced_peak'], traced_peak)
+        stage['rss_peak'] = max(stage['rss_peak'], rss_peak)
+        stage['count'] += 1
+        
+        if snapshot:
+            # Filtrar las estadísticas ya agrupadas: filter_traces recorre cada traza y es muy lento
+            ignored = {tracemalloc.__file__, '<frozen importlib._bootstrap>'}
+            stats = [stat for stat in tracemalloc.take_snapshot().statistics('lineno')
+                     if stat.traceback[0].filename not in ignored]
+            total = sum(stat.size for stat in stats)
+            previous = self.top_allocations.get(name)
+            if previous is None or total > previous[0]:
+                sites = [(f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", stat.size)
+                         for stat in stats[:self.top]]
+                self.top_allocations[name] = (total, sites)
+    
+    def traced_peak(self):
+        """Mayor pico de tracemalloc registrado en cualquier etapa."""
+        return max((s['traced_peak'] for s in self.stages.values()), default=0)
+    
+    def to_dict(self):
+        """Picos por etapa (en MB) y sitios de asignación, listos para JSON."""
+        return {
+            'rss_peak_mb': round(self.rss_peak / MB, 2),
+            'traced_peak_mb': round(self.traced_peak() / MB, 2),
+            'stages': {
+                name: {
+                    'traced_peak_mb': round(s['traced_peak'] / MB, 2),
+                    'rss_peak_mb': round(s['rss_peak'] / MB, 2),
+                    'count': s['count'],
+                }
+                for name, s in self.stages.items()
+            },
+            'top_allocations': {
+                name: [{'site': site, 'mb': round(size / MB, 3)} for site, size in sites]
+                for name, (_, sites) in self.top_allocations.items()
+            },
+        }
+    
+    def summary(self):
+        """Resumen legible de los picos de memoria por etapa."""
+        lines = [f"Memoria por etapa (pico RSS {self.rss_peak / MB:.1f} MB):"]
+        for name, s in sorted(self.stages.items(), key=lambda item: -item[1]['traced_peak']):
+            lines.append(f"  {name:<16} python {s['traced_peak'] / MB:8.1f} MB   RSS {s['rss_peak'] / MB:8.1f} MB")
+        if self.top_allocations:
+            name, (_, sites) = max(self.top_allocations.items(), key=lambda item: item[1][0])
+            lines.append(f"Principales sitios de asignación al final de '{name}':")
+            for site, size in sites:
+                lines.append(f"  {size / MB:8.2f} MB  {site}")
+        return '\n'.join(lines)
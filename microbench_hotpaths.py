@@ -0,0 +1,159 @@
+"""
+Micro-benchmarks de las rutas calientes del parseo y del post-proceso.
+
+Reproduce páginas grabadas con page_fixtures.py (sin pdfplumber) a través de
+parse_page, _extract_row_values_improved y _parse_percentage, y mide la
+conversión a shared strings sobre el Excel generado con esos rubros. Reporta
+ns por fila y filas por segundo del mejor de varias repeticiones.
+
+Uso:
+    python microbench_hotpaths.py [fixtures/APU_CON_VAE.paginas.json] [--repeticiones 5] [--json salida.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+import pdf_to_excel_apu
+from page_fixtures import FIXTURES_DIR, load_pages
+from pdf_to_excel_apu import APUConverter, convert_to_shared_strings, decode_cache_clear, inline_to_shared_strings
+
+
+DEFAULT_FIXTURE = os.path.join(FIXTURES_DIR, 'APU_CON_VAE.paginas.json')
+
+
+def measure(func, repeat=5, min_seconds=0.2):
+    """Mejor tiempo por llamada (segundos) de repeat tandas de al menos min_seconds cada una."""
+    start = time.perf_counter()
+    func()
+    single = time.perf_counter() - start
+    number = max(1, int(min_seconds / single)) if single > 0 else 1000
+    
+    best = single
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _recorded_row_calls(converter, pages):
+    """Filas de datos (fila, sección) que parse_page entrega a _extract_row_values_improved."""
+    calls = []
+    extract = pdf_to_excel_apu.extract_row_values
+    
+    def recording(row, section):
+        calls.append((row, section))
+        return extract(row, section)
+    
+    pdf_to_excel_apu.extract_row_values = recording
+    try:
+        for page in pages:
+            converter.parse_page(page)
+    finally:
+        pdf_to_excel_apu.extract_row_values = extract
+    return calls
+
+
+def run_benchmarks(fixture_path=DEFAULT_FIXTURE, repeat=5):
+    """
+    Ejecuta los micro-benchmarks sobre un fixture grabado.
+    
+    Returns:
+        Lista de resultados {'name', 'rows', 'seconds', 'ns_per_row', 'rows_per_sec'}
+    """
+    pages = load_pages(fixture_path)
+    converter = APUConverter(fixture_path)
+    table_rows = sum(len(table) for page in pages for table in page.tables if table)
+    row_calls = _recorded_row_calls(converter, pages)
+    percentages = [cell for page in pages for table in page.tables if table
+                   for row in table for cell in row if cell and '%' in cell]
+    
+    converter.rubros = [rubro for rubro in (converter.parse_page(page) for page in pages)
+                        if rubro and rubro['numero_rubro']]
+    results = []
+    
+    def add(name, rows, func):
+        seconds = measure(func, repeat)
+        results.append({
+            'name': name,
+            'rows': rows,
+            'seconds': seconds,
+            'ns_per_row': seconds / rows * 1e9 if rows else 0,
+            'rows_per_sec': rows / seconds if seconds else 0,
+        })
+    
+    def cold(func):
+        # Cada pasada empieza con el memo de decodificación vacío, como un documento nuevo
+        def run():
+            decode_cache_clear()
+            return func()
+        return run
+    
+    add('parse_page', table_rows, cold(lambda: [converter.parse_page(page) for page in pages]))
+    extract = converter._extract_row_values_improved
+    add('_extract_row_values_improved', len(row_calls),
+        cold(lambda: [extract(row, section) for row, section in row_calls]))
+    parse_percentage = converter._parse_percentage
+    add('_parse_percentage', len(percentages), lambda: [parse_percentage(value) for value in percentages])
+    
+    tmp = tempfile.mkdtemp()
+    try:
+        source = os.path.join(tmp, 'inline.xlsx')
+        target = os.path.join(tmp, 'shared.xlsx')
+        with contextlib.redirect_stdout(io.StringIO()):
+            converter.create_excel(source)
+        with zipfile.ZipFile(source) as z:
+            sheet = z.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        sheet_rows = sheet.count('<row ')
+        
+        add('inline_to_shared_strings', sheet_rows, lambda: inline_to_shared_strings(sheet, [], {}))
+        
+        def convert_file():
+            with contextlib.redirect_stdout(io.StringIO()):
+                convert_to_shared_strings(source, target)
+        add('convert_to_shared_strings', sheet_rows, convert_file)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def format_results(results):
+    """Tabla legible de los resultados."""
+    lines = [f"  {'Función':<30} {'filas':>7} {'ms/pasada':>10} {'ns/fila':>11} {'filas/s':>12}"]
+    for r in results:
+        lines.append(f"  {r['name']:<30} {r['rows']:>7} {r['seconds'] * 1000:>10.3f} "
+                     f"{r['ns_per_row']:>11.0f} {r['rows_per_sec']:>12.0f}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de parseo y shared strings sobre páginas grabadas.")
+    parser.add_argument('fixture', nargs='?', default=DEFAULT_FIXTURE, help="Fixture JSON de page_fixtures.py")
+    parser.add_argument('--repeticiones', type=int, default=5, help="Tandas por benchmark (se toma la mejor)")
+    parser.add_argument('--json', help="Guarda los resultados como JSON")
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.fixture):
+        print(f"No se encontró el fixture: {args.fixture}")
+        print("Grábelo con: python page_fixtures.py APU_CON_VAE.pdf")
+        return
+    
+    print(f"Micro-benchmarks sobre {args.fixture}:")
+    results = run_benchmarks(args.fixture, args.repeticiones)
+    print(format_results(results))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados guardados en: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
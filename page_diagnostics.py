@@ -0,0 +1,90 @@
+"""
+Diagnóstico por página de la extracción de rubros.
+
+Trabaja sobre los registros por página que APUConverter.extract_all_rubros
+guarda en converter.timer.pages: tiempos de extract_text, extract_tables y
+parseo de filas, cantidad de tablas, filas clasificadas en cada sección y,
+con diagnostics=True, cantidad de caracteres, palabras y rectángulos.
+Sirve para ajustar la extracción contra las páginas que más cuestan.
+"""
+
+import csv
+
+
+SECTIONS = ['equipos', 'mano_obra', 'materiales', 'transporte']
+
+CSV_COLUMNS = [
+    'page', 'numero_rubro', 'total_ms', 'extract_text_ms', 'extract_tables_ms', 'row_parsing_ms',
+    'chars', 'words', 'rects', 'tables',
+] + SECTIONS
+
+
+def _ms(page, name):
+    return round(page.get(name, 0.0) * 1000, 2)
+
+
+def slowest_pages(pages, top=10):
+    """Devuelve las top páginas más lentas, de mayor a menor tiempo."""
+    return sorted(pages, key=lambda p: p.get('total', 0.0), reverse=True)[:top]
+
+
+def format_slowest_pages(pages, top=10):
+    """Reporte de texto con las páginas más lentas y sus conteos de objetos."""
+    if not pages:
+        return "Sin páginas procesadas."
+    
+    total = sum(p.get('total', 0.0) for p in pages)
+    average = total / len(pages)
+    lines = [
+        f"Páginas más lentas ({len(pages)} páginas, promedio {average * 1000:.1f} ms):",
+        f"  {'Pág.':>5} {'Rubro':>6} {'Total ms':>9} {'texto':>8} {'tablas':>8} {'filas':>7}"
+        f" {'chars':>7} {'words':>6} {'rects':>6} {'tabl.':>5}  E/MO/MAT/T",
+    ]
+    for page in slowest_pages(pages, top):
+        sections = '/'.join(str(page.get(s, 0)) for s in SECTIONS)
+        lines.append(
+            f"  {page['page']:>5} {str(page.get('numero_rubro') or '-'):>6} {_ms(page, 'total'):>9.1f}"
+            f" {_ms(page, 'extract_text'):>8.1f} {_ms(page, 'extract_tables'):>8.1f}"
+            f" {_ms(page, 'row_parsing'):>7.1f} {str(page.get('chars', '-')):>7}"
+            f" {str(page.get('words', '-')):>6} {str(page.get('rects', '-')):>6}"
+            f" {page.get('tables', 0):>5}  {sections}"
+        )
+    return '\n'.join(lines)
+
+
+def write_pages_csv(pages, path):
+    """Guarda el diagnóstico de todas las páginas como CSV."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for page in sorted(pages, key=lambda p: p['page']):
+            writer.writerow({
+                'page': page['page'],
+                'numero_rubro': page.get('numero_rubro') or '',
+                'total_ms': _ms(page, 'total'),
+                'extract_text_ms': _ms(page, 'extract_text'),
+                'extract_tables_ms': _ms(page, 'extract_tables'),
+                'row_parsing_ms': _ms(page, 'row_parsing'),
+                'chars': page.get('chars', ''),
+                'words': page.get('words', ''),
+                'rects': page.get('rects', ''),
+                'tables': page.get('tables', 0),
+                **{s: page.get(s, 0) for s in SECTIONS},
+            })
+    return path
+
+
+def format_decode_cache(pages):
+    """
+    Aciertos de los memos de decodificación de filas y celdas de parse_page.
+    
+    Se suman los registros por página, así que funciona igual en modo tubería,
+    donde cada proceso de parseo tiene sus propios memos.
+    """
+    parts = []
+    for prefix, label in (('row_cache', 'filas'), ('cell_cache', 'celdas')):
+        hits = sum(page.get(f'{prefix}_hits', 0) for page in pages)
+        lookups = hits + sum(page.get(f'{prefix}_misses', 0) for page in pages)
+        rate = hits / lookups if lookups else 0.0
+        parts.append(f"{label} {hits}/{lookups} aciertos ({rate:.1%})")
+    return "Memo de decodificación: " + ", ".join(parts)
@@ -0,0 +1,89 @@
+"""
+Grabación de páginas de un PDF de APU como fixtures JSON.
+
+Guarda, por página, las líneas de extract_text() y la salida de
+extract_tables() de pdfplumber. RecordedPage reproduce esas dos llamadas, así
+que APUConverter.parse_page puede procesar las páginas grabadas sin abrir el
+PDF ni cargar pdfplumber (ver microbench_hotpaths.py).
+
+Uso:
+    python page_fixtures.py APU_CON_VAE.pdf [fixtures/APU_CON_VAE.paginas.json]
+"""
+
+import json
+import os
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class RecordedPage:
+    """Página grabada con la misma interfaz que usa parse_page de una página de pdfplumber."""
+    
+    def __init__(self, number, lines, tables):
+        self.page_number = number
+        self.lines = lines
+        self.tables = tables
+    
+    def extract_text(self):
+        return None if self.lines is None else '\n'.join(self.lines)
+    
+    def extract_tables(self):
+        return self.tables
+
+
+def record_pdf(pdf_path, output_path=None):
+    """
+    Graba el texto y las tablas de todas las páginas de un PDF.
+    
+    Args:
+        pdf_path: PDF de APU a grabar
+        output_path: JSON de salida (por defecto fixtures/<nombre>.paginas.json)
+    
+    Returns:
+        Ruta del JSON generado
+    """
+    import pdfplumber
+    
+    if output_path is None:
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        output_path = os.path.join(FIXTURES_DIR, f'{base_name}.paginas.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    
+    pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for i, page in enumerate(pdf.pages):
+            text = page.extract_text()
+            pages.append({
+                'page': i + 1,
+                'lines': text.split('\n') if text else None,
+                'tables': page.extract_tables(),
+            })
+            page.close()
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({'pdf': os.path.basename(pdf_path), 'pages': pages}, f, ensure_ascii=False, indent=1)
+    return output_path
+
+
+def load_pages(fixture_path):
+    """Carga un fixture grabado como lista de RecordedPage."""
+    with open(fixture_path, encoding='utf-8') as f:
+        data = json.load(f)
+    return [RecordedPage(page['page'], page['lines'], page['tables']) for page in data['pages']]
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Graba texto y tablas de un PDF de APU como fixture JSON.")
+    parser.add_argument('pdf', help="PDF de entrada")
+    parser.add_argument('output', nargs='?', help="JSON de salida (por defecto en fixtures/)")
+    args = parser.parse_args()
+    
+    output_path = record_pdf(args.pdf, args.output)
+    print(f"Fixture guardado: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,289 +13,155 @@ from openpyxl.styles import Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from openpyxl.packaging.core import DocumentProperties
 from openpyxl.worksheet.datavalidation import DataValidation
+import io
 import re
 import os
+from functools import lru_cache
 import sys
 import zipfile
-import shutil
+import contextlib
 import xml.etree.ElementTree as ET
 from pathlib import Path
 
+from stage_timing import NULL_TIMER, StageTimer
+
+
+# Columnas de datos de cada sección: (índice de celda, campo, tipo de celda).
+# EQUIPO y MANO DE OBRA: 0=descripción, 1=cantidad, 2=tarifa/jornal, 3=costo hora,
+# 4=rendimiento, 5=costo. En Herramienta Menor las celdas 1-5 vienen vacías y el
+# costo está al final de la descripción.
+# MATERIALES y TRANSPORTE: 0=descripción, 1=vacío, 2=unidad, 3=cantidad,
+# 4=precio unitario, 5=costo.
+# Todas: 6=peso relativo, 7=CPC, 8=NP/EP/ND, 9=VAE (%), 10=VAE (%) elemento.
+_COMMON_COLUMNS = (
+    (6, 'peso_relativo', 'porcentaje'),
+    (7, 'cpc', 'cpc'),
+    (8, 'np_ep_nd', 'origen'),
+    (9, 'vae_pct', 'porcentaje'),
+    (10, 'vae_elemento', 'porcentaje'),
+)
+_LABOR_COLUMNS = (
+    (1, 'cantidad', 'numero'),
+    (2, 'tarifa', 'numero'),
+    (3, 'costo_hora', 'numero'),
+    (4, 'rendimiento', 'numero'),
+    (5, 'costo', 'numero'),
+) + _COMMON_COLUMNS
+_MATERIAL_COLUMNS = (
+    (3, 'cantidad', 'numero'),
+    (4, 'tarifa', 'numero'),
+    (5, 'costo', 'numero'),
+) + _COMMON_COLUMNS
+ROW_COLUMNS = {
+    'equipo': _LABOR_COLUMNS,
+    'mano_obra': _LABOR_COLUMNS,
+    'materiales': _MATERIAL_COLUMNS,
+    'transporte': _MATERIAL_COLUMNS,
+}
+
+ROW_CACHE_SIZE = 4096
+CELL_CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _decode_cell(kind, text):
+    """
+    Decodifica el texto de una celda según su tipo (memo LRU por tipo y texto).
+    
+    Las cantidades y pesos relativos cambian de un rubro a otro, pero
+    descripciones, tarifas, CPC y porcentajes se repiten en casi todas las
+    páginas, así que las expresiones regulares y el parseo de números solo se
+    ejecutan la primera vez que aparece cada texto.
+    
+    Returns:
+        El valor decodificado, o None si el texto no es válido para ese tipo
+    """
+    if kind == 'numero':
+        return APUConverter._parse_number(text) if APUConverter._is_number(text) else None
+    if kind == 'porcentaje':
+        return APUConverter._parse_percentage(text) if '%' in text else None
+    if kind == 'cpc':
+        return text if re.match(r'^\d{9,12}$', text) else None
+    if kind == 'origen':
+        return text.upper() if text.upper() in ['NP', 'EP', 'ND'] else None
+    # Descripción: buscar si tiene código de categoría incluido (EO C1, EO D2, etc.)
+    match = re.search(r'(.+?)\s+(EO\s*[A-Z]\d+)', text)
+    if match:
+        return match.group(1).strip(), match.group(2).strip(), None
+    # Para Herramienta Menor con costo incluido en la descripción
+    # Formato: "Herramienta Menor 5% de M.O. 0.07"
+    match_hm = re.search(r'^(Herramienta\s+Menor.+?)\s+(\d+\.\d+)$', text)
+    if match_hm:
+        return match_hm.group(1).strip(), '', float(match_hm.group(2))
+    return text, '', None
+
+
+@lru_cache(maxsize=ROW_CACHE_SIZE)
+def _decode_row_record(section, row):
+    """Fila decodificada como tupla inmutable de pares (campo, valor), con memo LRU."""
+    return tuple(APUConverter._decode_row(row, section).items())
+
+
+def decode_cache_clear():
+    """Vacía los memos de decodificación de filas y celdas."""
+    _decode_row_record.cache_clear()
+    _decode_cell.cache_clear()
+
+
+class ConversionCancelled(Exception):
+    """La conversión se detuvo porque se activó el token de cancelación."""
+
 
 class APUConverter:
-    """Clase para convertir PDFs de APU a Excel."""
+    """
+    Clase para convertir PDFs de APU a Excel.
+    
+    Args:
+        pdf_path: Ruta al archivo PDF
+        progress: Función opcional progress(etapa, hechos, total, rubros) que se
+                  llama después de cada página ('parseo') y de cada rubro
+                  escrito ('escritura')
+        cancel: Token opcional con is_set() (threading.Event,
+                multiprocessing.Event); se consulta entre páginas y entre
+                rubros y, si está activo, se lanza ConversionCancelled
+    """
     
-    def __init__(self, pdf_path):
+    def __init__(self, pdf_path, progress=None, cancel=None):
         self.pdf_path = pdf_path
         self.rubros = []
         self.header_info = {}
-        
+        self.timer = StageTimer()
+        self.progress = progress
+        self.cancel = cancel
+        self.failed_pages = []  # Páginas omitidas por el parseo supervisado (ver supervised_parsing.py)
+    
+    def _check_cancel(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise ConversionCancelled("Conversión cancelada")
+    
     def extract_header_info(self, text):
         """Extrae información del encabezado."""
-        lines = text.split('\n')
-        
-        # Buscar nombre del profesional (primera línea generalmente)
-        for line in lines[:5]:
-            if 'ING.' in line.upper() or 'ARQ.' in line.upper() or 'LIC.' in line.upper():
-                self.header_info['profesional'] = line.strip()
-                break
-        
-        # Buscar proyecto
-        for line in lines:
-            if 'PROYECTO:' in line.upper():
-                self.header_info['proyecto'] = line.strip()
-                break
-        
-        # Buscar ubicación
-        for line in lines:
-            if 'UBICACION:' in line.upper():
-                self.header_info['ubicacion'] = line.strip()
-                break
-                
+        self.header_info.update(extract_header_fields(text))
+    
     def parse_page(self, page):
-        """Parsea una página del PDF y extrae los datos del rubro."""
-        text = page.extract_text()
-        if not text:
-            return None
-            
-        # Extraer header info si no existe
-        if not self.header_info:
-            self.extract_header_info(text)
-        
-        rubro_data = {
-            'numero_rubro': None,
-            'unidad': None,
-            'detalle': None,
-            'cantidad': None,
-            'hoja': None,
-            'equipos': [],
-            'mano_obra': [],
-            'materiales': [],
-            'transporte': [],
-            'subtotal_m': 0,
-            'subtotal_n': 0,
-            'subtotal_o': 0,
-            'subtotal_p': 0,
-            'total_costo_directo': 0,
-            'vae_total': 0,
-            'indirectos_pct': 0,
-            'indirectos_valor': 0,
-            'utilidad_pct': 0,
-            'utilidad_valor': 0,
-            'costo_total': 0,
-            'valor_unitario': 0,
-            'texto_valor': '',
-            'fecha': '',
-        }
-        
-        lines = text.split('\n')
-        
-        # Buscar número de rubro, unidad, detalle
-        for i, line in enumerate(lines):
-            # Número de rubro
-            match = re.search(r'RUBRO\s*:\s*(\d+)', line, re.IGNORECASE)
-            if match:
-                rubro_data['numero_rubro'] = int(match.group(1))
-            
-            # Unidad
-            match = re.search(r'UNIDAD:\s*(\S+)', line, re.IGNORECASE)
-            if match:
-                rubro_data['unidad'] = match.group(1)
-            
-            # Detalle
-            match = re.search(r'DETALLE\s*:\s*(.+)', line, re.IGNORECASE)
-            if match:
-                rubro_data['detalle'] = match.group(1).strip()
-            
-            # Hoja
-            match = re.search(r'HOJA\s+(\d+)\s+DE\s+(\d+)', line, re.IGNORECASE)
-            if match:
-                rubro_data['hoja'] = f"HOJA {match.group(1)} DE {match.group(2)}"
-                rubro_data['numero_pagina'] = int(match.group(1))
-            
-            # Fecha
-            if 'LORETO,' in line.upper() or any(mes in line.upper() for mes in ['ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO', 'JULIO', 'AGOSTO', 'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE']):
-                if 'DE 202' in line or 'DE 2024' in line or 'DE 2025' in line:
-                    rubro_data['fecha'] = line.strip()
-            
-            # SON:
-            if line.startswith('SON:'):
-                rubro_data['texto_valor'] = line.strip()
-            
-            # ESPECIFICACIONES:
-            if line.startswith('ESPECIFICACIONES:'):
-                rubro_data['especificaciones'] = line.strip()
-            
-            # OBSERVACIONES:
-            if line.startswith('OBSERVACIONES:'):
-                rubro_data['observaciones'] = line.strip()
-        
-        # Extraer tablas
-        tables = page.extract_tables()
-        
-        # Determinar sección actual
-        current_section = None
-        last_data_row = None  # Para capturar subtotales
-        
-        for table in tables:
-            if not table:
-                continue
-                
-            for row_idx, row in enumerate(table):
-                if not row or all(cell is None for cell in row):
-                    continue
-                
-                row_text = ' '.join([str(cell) if cell else '' for cell in row])
-                first_cell = str(row[0]).upper() if row[0] else ''
-                
-                # Detectar cambio de sección
-                if 'EQUIPO' in first_cell and 'DESCRIPCION' in first_cell:
-                    current_section = 'equipo'
-                    continue
-                elif 'MANO DE OBRA' in first_cell and 'DESCRIPCION' in first_cell:
-                    # Capturar subtotal M de la fila anterior (que tiene solo el valor)
-                    if current_section == 'equipo' and last_data_row:
-                        for cell in last_data_row:
-                            if cell and self._is_number(cell):
-                                rubro_data['subtotal_m'] = self._parse_number(cell)
-                                break
-                    current_section = 'mano_obra'
-                    last_data_row = None
-                    continue
-                elif 'MATERIALES' in first_cell and 'DESCRIPCION' in first_cell:
-                    # Capturar subtotal N de la fila anterior
-                    if current_section == 'mano_obra' and last_data_row:
-                        for cell in last_data_row:
-                            if cell and self._is_number(cell):
-                                rubro_data['subtotal_n'] = self._parse_number(cell)
-                                break
-                    current_section = 'materiales'
-                    last_data_row = None
-                    continue
-                elif 'TRANSPORTE' in first_cell and 'DESCRIPCION' in first_cell:
-                    # Capturar subtotal O de la fila anterior
-                    if current_section == 'materiales' and last_data_row:
-                        for cell in last_data_row:
-                            if cell and self._is_number(cell):
-                                rubro_data['subtotal_o'] = self._parse_number(cell)
-                                break
-                    current_section = 'transporte'
-                    last_data_row = None
-                    continue
-                
-                # Identificar filas de totales
-                if 'TOTAL COSTO DIRECTO' in row_text:
-                    # Capturar subtotal P de la fila anterior
-                    if current_section == 'transporte' and last_data_row:
-                        for cell in last_data_row:
-                            if cell and self._is_number(cell):
-                                rubro_data['subtotal_p'] = self._parse_number(cell)
-                                break
-                    
-                    for cell in row:
-                        if cell and self._is_number(cell):
-                            val = self._parse_number(cell)
-                            if val > 0:
-                                rubro_data['total_costo_directo'] = val
-                                break
-                    current_section = None
-                
-                elif 'INDIRECTOS' in row_text:
-                    # Extraer porcentaje del texto
-                    match = re.search(r'(\d+\.?\d*)\s*%', row_text)
-                    if match:
-                        rubro_data['indirectos_pct'] = float(match.group(1)) / 100
-                    # Extraer valor numérico
-                    for cell in row[1:]:
-                        if cell and self._is_number(cell):
-                            rubro_data['indirectos_valor'] = self._parse_number(cell)
-                            break
-                
-                elif 'UTILIDAD' in row_text and 'COSTO' not in row_text:
-                    match = re.search(r'(\d+\.?\d*)\s*%', row_text)
-                    if match:
-                        rubro_data['utilidad_pct'] = float(match.group(1)) / 100
-                    for cell in row[1:]:
-                        if cell and self._is_number(cell):
-                            rubro_data['utilidad_valor'] = self._parse_number(cell)
-                            break
-                
-                elif 'COSTO TOTAL DEL RUBRO' in row_text:
-                    for cell in row:
-                        if cell and self._is_number(cell):
-                            rubro_data['costo_total'] = self._parse_number(cell)
-                            break
-                
-                elif 'VALOR UNITARIO' in row_text:
-                    for cell in row:
-                        if cell and self._is_number(cell):
-                            rubro_data['valor_unitario'] = self._parse_number(cell)
-                            break
-                
-                # Procesar filas de datos según la sección actual
-                elif current_section:
-                    # Si primera celda es None, puede ser fila de subtotal
-                    if row[0] is None:
-                        # Es probable que sea una fila de subtotal - guardar para siguiente sección
-                        last_data_row = row
-                    elif 'SUBTOTAL' not in first_cell:
-                        row_data = self._extract_row_values_improved(row, current_section)
-                        if row_data['descripcion'] and row_data['descripcion'].strip():
-                            if current_section == 'equipo':
-                                rubro_data['equipos'].append(row_data)
-                            elif current_section == 'mano_obra':
-                                rubro_data['mano_obra'].append(row_data)
-                            elif current_section == 'materiales':
-                                rubro_data['materiales'].append(row_data)
-                            elif current_section == 'transporte':
-                                rubro_data['transporte'].append(row_data)
-                        last_data_row = row
-        
-        # Buscar cantidad en el texto (después del detalle)
-        for line in lines:
-            if rubro_data['detalle'] and rubro_data['detalle'] in line:
-                continue
-            # Buscar números solos, incluyendo formato con coma (1,058.84)
-            numbers = re.findall(r'^\s*([\d,]+\.?\d*)\s*$', line)
-            for num in numbers:
-                # Convertir formato con coma a número
-                val_str = num.replace(',', '')
-                try:
-                    val = float(val_str)
-                    if val > 0 and val < 100000:
-                        if rubro_data['cantidad'] is None:
-                            rubro_data['cantidad'] = val
-                except:
-                    pass
-        
-        # Buscar VAE total desde el texto (está al final de la línea TOTAL COSTO DIRECTO)
-        # Formato esperado: "TOTAL COSTO DIRECTO (M+N+O+P) 1.44 100.00% 97.08%"
-        for line in lines:
-            if 'TOTAL COSTO DIRECTO' in line.upper():
-                # Buscar todos los porcentajes en la línea
-                percentages = re.findall(r'(\d+\.?\d*)\s*%', line)
-                if len(percentages) >= 2:
-                    # El último porcentaje es el VAE total (ej: 97.08%)
-                    # El primero suele ser 100.00%
-                    rubro_data['vae_total'] = float(percentages[-1]) / 100
-                elif len(percentages) == 1:
-                    rubro_data['vae_total'] = float(percentages[0]) / 100
-                break
-        
-        # Si no se encontró VAE total, calcularlo sumando los VAE de elementos
-        if rubro_data['vae_total'] == 0:
-            vae_sum = 0
-            for items in [rubro_data['equipos'], rubro_data['mano_obra'], rubro_data['materiales'], rubro_data['transporte']]:
-                for item in items:
-                    if item.get('vae_elemento'):
-                        vae_sum += item['vae_elemento']
-            if vae_sum > 0:
-                rubro_data['vae_total'] = vae_sum
-        
-        return rubro_data
+        """
+        Parsea una página del PDF y extrae los datos del rubro.
+        
+        Envoltorio de parse_apu_page que además toma el encabezado del documento
+        de la primera página que lo tenga y mide los tiempos en self.timer.
+        """
+        rubro, header = parse_apu_page(page, self.timer)
+        if not self.header_info and header:
+            self.header_info = header
+        return rubro
     
     def _extract_row_values_improved(self, row, section):
-        """Extrae los valores de una fila según la sección."""
+        """Extrae los valores de una fila según la sección (ver extract_row_values)."""
+        return extract_row_values(row, section)
+    
+    @staticmethod
+    def _decode_row(row, section):
+        """Decodifica una fila sin pasar por el memo de filas (ver _extract_row_values_improved)."""
         result = {
             'descripcion': '',
             'categoria': '',
@@ -316,138 +182,27 @@ class APUConverter:
             return result
         
         # Convertir todas las celdas a string y limpiar
-        cells = []
-        for cell in row:
-            if cell is not None:
-                cells.append(str(cell).strip())
-            else:
-                cells.append('')
-        
-        # Procesar primera celda (descripción)
+        cells = [str(cell).strip() if cell is not None else '' for cell in row]
+        
+        # Procesar primera celda (descripción, categoría EO y costo de Herramienta Menor)
         if cells[0]:
-            desc = cells[0]
-            # Buscar si tiene código de categoría incluido (EO C1, EO D2, etc.)
-            match = re.search(r'(.+?)\s+(EO\s*[A-Z]\d+)', desc)
-            if match:
-                result['descripcion'] = match.group(1).strip()
-                result['categoria'] = match.group(2).strip()
-            else:
-                # Para Herramienta Menor con costo incluido en la descripción
-                # Formato: "Herramienta Menor 5% de M.O. 0.07"
-                match_hm = re.search(r'^(Herramienta\s+Menor.+?)\s+(\d+\.\d+)$', desc)
-                if match_hm:
-                    result['descripcion'] = match_hm.group(1).strip()
-                    result['costo'] = float(match_hm.group(2))
-                else:
-                    result['descripcion'] = desc
-        
-        # Procesar según la sección
-        if section == 'equipo':
-            # EQUIPO - Según análisis del PDF, para Herramienta Menor:
-            # Celda[0] = 'Herramienta Menor 5% de M.O. 0.07' (descripción con costo)
-            # Celda[1-5] = None (vacíos)
-            # Celda[6] = peso relativo (4.861%)
-            # Celda[7] = CPC (4299217233)
-            # Celda[8] = ND
-            # Celda[9] = VAE % (40.00%)
-            # Celda[10] = VAE Elemento (1.944%)
-            if len(cells) >= 11:
-                # Para equipos normales (con valores en columnas intermedias)
-                if cells[1] and self._is_number(cells[1]):
-                    result['cantidad'] = self._parse_number(cells[1])
-                if cells[2] and self._is_number(cells[2]):
-                    result['tarifa'] = self._parse_number(cells[2])
-                if cells[3] and self._is_number(cells[3]):
-                    result['costo_hora'] = self._parse_number(cells[3])
-                if cells[4] and self._is_number(cells[4]):
-                    result['rendimiento'] = self._parse_number(cells[4])
-                # Solo sobrescribir costo si hay valor en celda[5] (para equipos normales)
-                # Para Herramienta Menor, el costo ya se extrajo de la descripción
-                if cells[5] and self._is_number(cells[5]):
-                    result['costo'] = self._parse_number(cells[5])
-                elif result['costo'] is None:
-                    # Intentar obtener costo de celda[5] si existe
-                    pass  # Ya se intentó arriba
-                # Peso relativo, CPC, NP/EP/ND, VAE siempre en mismas posiciones
-                if cells[6] and '%' in str(cells[6]):
-                    result['peso_relativo'] = self._parse_percentage(cells[6])
-                if cells[7] and re.match(r'^\d{9,12}$', str(cells[7])):
-                    result['cpc'] = cells[7]
-                if cells[8] and str(cells[8]).upper() in ['NP', 'EP', 'ND']:
-                    result['np_ep_nd'] = str(cells[8]).upper()
-                if cells[9] and '%' in str(cells[9]):
-                    result['vae_pct'] = self._parse_percentage(cells[9])
-                if cells[10] and '%' in str(cells[10]):
-                    result['vae_elemento'] = self._parse_percentage(cells[10])
-                    
-        elif section == 'mano_obra':
-            # MANO DE OBRA - Según análisis del PDF:
-            # Celda[0] = descripción (ej: 'Maestro mayor ejec.obras civil EO C1')
-            # Celda[1] = cantidad (0.01)
-            # Celda[2] = jornal/hr (4.75)
-            # Celda[3] = costo hora (0.05)
-            # Celda[4] = rendimiento (0.3200)
-            # Celda[5] = costo (0.02)
-            # Celda[6] = peso relativo (1.389%)
-            # Celda[7] = CPC (541210012)
-            # Celda[8] = EP
-            # Celda[9] = VAE % (100.00%)
-            # Celda[10] = VAE Elemento (1.389%)
-            if len(cells) >= 11:
-                if cells[1] and self._is_number(cells[1]):
-                    result['cantidad'] = self._parse_number(cells[1])
-                if cells[2] and self._is_number(cells[2]):
-                    result['tarifa'] = self._parse_number(cells[2])
-                if cells[3] and self._is_number(cells[3]):
-                    result['costo_hora'] = self._parse_number(cells[3])
-                if cells[4] and self._is_number(cells[4]):
-                    result['rendimiento'] = self._parse_number(cells[4])
-                if cells[5] and self._is_number(cells[5]):
-                    result['costo'] = self._parse_number(cells[5])
-                if cells[6] and '%' in str(cells[6]):
-                    result['peso_relativo'] = self._parse_percentage(cells[6])
-                if cells[7] and re.match(r'^\d{9,12}$', str(cells[7])):
-                    result['cpc'] = cells[7]
-                if cells[8] and str(cells[8]).upper() in ['NP', 'EP', 'ND']:
-                    result['np_ep_nd'] = str(cells[8]).upper()
-                if cells[9] and '%' in str(cells[9]):
-                    result['vae_pct'] = self._parse_percentage(cells[9])
-                if cells[10] and '%' in str(cells[10]):
-                    result['vae_elemento'] = self._parse_percentage(cells[10])
-                    
-        elif section in ['materiales', 'transporte']:
-            # MATERIALES/TRANSPORTE: idx 0=desc, 1=vacio, 2=unidad, 3=cantidad, 4=precio, 5=costo, 6=peso, 7=cpc, 8=np_ep, 9=vae%, 10=vae_elem
-            # Según análisis del PDF:
-            # Celda[0] = descripción
-            # Celda[1] = None (vacío)
-            # Celda[2] = unidad (u, kg, rollo, etc.)
-            # Celda[3] = cantidad (0.2000, 0.0130, etc.)
-            # Celda[4] = precio unitario
-            # Celda[5] = costo
-            # Celda[6] = peso relativo (%)
-            # Celda[7] = CPC
-            # Celda[8] = NP/EP/ND
-            # Celda[9] = VAE (%)
-            # Celda[10] = VAE (%) Elemento
-            if len(cells) >= 11:
-                if cells[2] and cells[2] != 'None':
-                    result['unidad'] = cells[2]
-                if cells[3] and self._is_number(cells[3]):
-                    result['cantidad'] = self._parse_number(cells[3])
-                if cells[4] and self._is_number(cells[4]):
-                    result['tarifa'] = self._parse_number(cells[4])
-                if cells[5] and self._is_number(cells[5]):
-                    result['costo'] = self._parse_number(cells[5])
-                if cells[6] and '%' in str(cells[6]):
-                    result['peso_relativo'] = self._parse_percentage(cells[6])
-                if cells[7] and re.match(r'^\d{9,12}$', str(cells[7])):
-                    result['cpc'] = cells[7]
-                if cells[8] and str(cells[8]).upper() in ['NP', 'EP', 'ND']:
-                    result['np_ep_nd'] = str(cells[8]).upper()
-                if cells[9] and '%' in str(cells[9]):
-                    result['vae_pct'] = self._parse_percentage(cells[9])
-                if cells[10] and '%' in str(cells[10]):
-                    result['vae_elemento'] = self._parse_percentage(cells[10])
+            descripcion, categoria, costo = _decode_cell('descripcion', cells[0])
+            result['descripcion'] = descripcion
+            result['categoria'] = categoria
+            result['costo'] = costo
+        
+        # Procesar según la sección (columnas en ROW_COLUMNS)
+        columns = ROW_COLUMNS.get(section)
+        if columns and len(cells) >= 11:
+            if section in ('materiales', 'transporte') and cells[2] and cells[2] != 'None':
+                result['unidad'] = cells[2]
+            for index, field, kind in columns:
+                if cells[index]:
+                    value = _decode_cell(kind, cells[index])
+                    # Sin valor válido se conserva lo anterior (p. ej. el costo
+                    # de Herramienta Menor tomado de la descripción)
+                    if value is not None:
+                        result[field] = value
         
         return result
     
@@ -455,7 +210,8 @@ class APUConverter:
         """Método legacy - no se usa más, reemplazado por _extract_row_values_improved."""
         pass
     
-    def _is_number(self, value):
+    @staticmethod
+    def _is_number(value):
         """Verifica si un valor es numérico."""
         if value is None:
             return False
@@ -466,7 +222,8 @@ class APUConverter:
         except (ValueError, TypeError):
             return False
     
-    def _parse_number(self, value):
+    @staticmethod
+    def _parse_number(value):
         """Convierte un valor a número."""
         if value is None:
             return 0
@@ -476,7 +233,8 @@ class APUConverter:
         except (ValueError, TypeError):
             return 0
     
-    def _parse_percentage(self, value):
+    @staticmethod
+    def _parse_percentage(value):
         """Convierte un porcentaje a decimal."""
         if value is None:
             return 0
@@ -493,44 +251,110 @@ class APUConverter:
         except (ValueError, TypeError):
             return 0
     
-    def extract_all_rubros(self):
-        """Extrae todos los rubros del PDF."""
-        with pdfplumber.open(self.pdf_path) as pdf:
-            print(f"Procesando {len(pdf.pages)} páginas...")
+    def extract_all_rubros(self, diagnostics=False):
+        """
+        Extrae todos los rubros del PDF.
+        
+        Args:
+            diagnostics: Si es True, anota además en self.timer.pages la cantidad
+                         de caracteres, palabras y rectángulos de cada página
+        """
+        for rubro in self.iter_rubros(diagnostics):
+            self.rubros.append(rubro)
+        print(f"\n  Encontrados {len(self.rubros)} rubros.")
+        return self.rubros
+    
+    def iter_rubros(self, diagnostics=False):
+        """
+        Parsea el PDF página por página y entrega cada rubro sin acumularlos.
+        
+        Args:
+            diagnostics: Igual que en extract_all_rubros
+        """
+        with self.timer.stage('pdf_open'):
+            pdf = pdfplumber.open(self.pdf_path)
+        with pdf:
+            total_pages = len(pdf.pages)
+            rubros_found = 0
+            print(f"Procesando {total_pages} páginas...")
             for i, page in enumerate(pdf.pages):
-                print(f"  Procesando página {i+1}/{len(pdf.pages)}...", end='\r')
+                self._check_cancel()
+                print(f"  Procesando página {i+1}/{total_pages}...", end='\r')
+                self.timer.start_page(i + 1)
                 rubro = self.parse_page(page)
-                if rubro and rubro['numero_rubro']:
-                    self.rubros.append(rubro)
-            print(f"\n  Encontrados {len(self.rubros)} rubros.")
-        return self.rubros
+                page_record = self.timer.end_page()
+                if diagnostics:
+                    # Fuera del tiempo de la página: extract_words no es parte del parseo
+                    page_record['chars'] = len(page.chars)
+                    page_record['words'] = len(page.extract_words())
+                    page_record['rects'] = len(page.rects)
+                # Libera los caches de la página (objetos, layout); si no, crecen con el documento
+                page.close()
+                is_rubro = bool(rubro and rubro['numero_rubro'])
+                rubros_found += is_rubro
+                if self.progress is not None:
+                    self.progress('parseo', i + 1, total_pages, rubros_found)
+                if is_rubro:
+                    yield rubro
+    
+    def export_items(self, output_path, fmt=None, batch_size=1000):
+        """
+        Exporta los items de cada rubro como tabla plana (CSV, JSONL o Parquet)
+        sin pasar por openpyxl.
+        
+        Si ya hay rubros extraídos se exportan esos; si no, se parsea el PDF y
+        cada rubro se escribe apenas se parsea, sin acumularlos.
+        
+        Returns:
+            Cantidad de filas (items) escritas
+        """
+        from apu_export import export_items
+        
+        rubros = self.rubros if len(self.rubros) else self.iter_rubros()
+        count = export_items(rubros, output_path, fmt, batch_size, timer=self.timer)
+        print(f"\n  {count} items exportados a: {output_path}")
+        return count
     
     def create_excel(self, output_path):
         """Crea el archivo Excel con el formato estandarizado exacto."""
-        from openpyxl.styles import PatternFill, numbers
+        self.write_workbook(output_path)
+        print(f"Archivo guardado: {output_path}")
+        return output_path
+    
+    def write_workbook(self, output):
+        """
+        Arma el libro con los rubros y lo guarda en output (ruta o archivo
+        binario, p. ej. BytesIO), sin mensajes.
+        """
+        with self.timer.stage('workbook_build'):
+            wb, ws, estilos, dv = self._start_workbook()
+            
+            current_row = 0  # Empezamos desde 0, se incrementará a 1 al inicio
+            total_rubros = len(self.rubros)
+            
+            for rubro_idx, rubro in enumerate(self.rubros, 1):
+                self._check_cancel()
+                current_row = self._write_rubro(ws, current_row, rubro, rubro_idx, total_rubros, estilos, dv)
+                if self.progress is not None:
+                    self.progress('escritura', rubro_idx, total_rubros, total_rubros)
+            
+            self._finish_workbook(wb, ws)
         
+        # Guardar archivo
+        with self.timer.stage('wb_save'):
+            wb.save(output)
+    
+    def _start_workbook(self):
+        """
+        Crea el libro con la hoja PUNIS, anchos de columna y validación NP/EP/ND.
+        
+        Returns:
+            Tupla (wb, ws, estilos, dv) lista para escribir rubros con _write_rubro
+        """
         wb = Workbook()
         ws = wb.active
         ws.title = "ANALISIS DE PUNIS"
         
-        # Formatos de número específicos para PUNIS
-        NUMBER_FORMAT_2DEC = '###,##0.00'
-        NUMBER_FORMAT_4DEC = '###,##0.0000'
-        NUMBER_FORMAT_5DEC = '###,##0.00000'
-        
-        # Función auxiliar para escribir celda numérica con formato
-        def write_numeric_cell(row, col, value, decimals=2, border=None):
-            cell = ws.cell(row=row, column=col, value=value)
-            if decimals == 4:
-                cell.number_format = NUMBER_FORMAT_4DEC
-            elif decimals == 5:
-                cell.number_format = NUMBER_FORMAT_5DEC
-            else:
-                cell.number_format = NUMBER_FORMAT_2DEC
-            if border:
-                cell.border = border
-            return cell
-        
         # Configurar anchos de columna EXACTOS del original
         column_widths = {
             'A': 33.67, 'B': 8.67, 'C': 12.67, 'D': 14.55,
@@ -540,6 +364,63 @@ class APUConverter:
         for col, width in column_widths.items():
             ws.column_dimensions[col].width = width
         
+        estilos = self._estilos_excel()
+        
+        # === AGREGAR VALIDACIÓN DE DATOS PARA COLUMNA J (NP/EP/ND) ===
+        # Crear la validación de datos con la lista de opciones
+        # showDropDown debe estar en False (no mostrar dropdown) pero la validación sigue activa
+        dv = DataValidation(
+            type="list",
+            formula1='"NP,EP,ND"',
+            allow_blank=False,
+            showDropDown=False,  # No mostrar el dropdown pero validar
+            showInputMessage=False,
+            showErrorMessage=False
+        )
+        dv.error = 'El valor debe ser NP, EP o ND'
+        dv.errorTitle = 'Entrada inválida'
+        dv.prompt = 'Seleccione NP, EP o ND'
+        dv.promptTitle = 'Tipo de origen'
+        
+        # Agregar la validación a la hoja
+        ws.add_data_validation(dv)
+        
+        return wb, ws, estilos, dv
+    
+    def _finish_workbook(self, wb, ws):
+        """Aplica la configuración de página y las propiedades del documento para PUNIS."""
+        # === CONFIGURACIÓN DE PÁGINA PARA IMPRESIÓN/PDF ===
+        from openpyxl.worksheet.page import PageMargins
+        
+        # Configurar orientación y tamaño de papel
+        ws.page_setup.orientation = 'portrait'
+        ws.page_setup.paperSize = 9  # A4
+        ws.page_setup.scale = 52  # Escala al 52%
+        ws.page_setup.fitToPage = False
+        
+        # Configurar márgenes
+        ws.page_margins = PageMargins(
+            top=0.5,
+            bottom=0.7,
+            left=0.7,
+            right=0.15,
+            header=0.3,
+            footer=0.3
+        )
+        
+        # Configurar títulos de impresión (print titles)
+        ws.print_title_rows = '1:1'
+        
+        # === PROPIEDADES DEL DOCUMENTO PARA PUNIS ===
+        wb.properties.title = 'PUNIS'
+        wb.properties.subject = 'Precios Unitarios'
+        wb.properties.creator = 'PUNIS'
+        wb.properties.category = self.header_info.get('profesional', '')
+    
+    def _estilos_excel(self):
+        """Crea los estilos exactos del formato PUNIS usados al escribir cada rubro."""
+        from types import SimpleNamespace
+        
         # Estilos exactos del original
         font_title = Font(name='Cambria', size=13, bold=True)
         font_project = Font(name='Cambria', size=9, bold=True)
@@ -572,497 +453,500 @@ class APUConverter:
         border_right = Border(right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
         border_middle = Border(top=Side(style='thin'), bottom=Side(style='thin'))
         
-        current_row = 0  # Empezamos desde 0, se incrementará a 1 al inicio
-        total_rubros = len(self.rubros)
-        
-        for rubro_idx, rubro in enumerate(self.rubros, 1):
-            start_row = current_row + 1
-            
-            # === FILA 1: Vacía ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 22.8
-            
-            # === FILA 2: Vacía ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            
-            # === FILA 3: Nombre del profesional ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 49.95
-            cell = ws.cell(row=current_row, column=1, value=self.header_info.get('profesional', '') + '\n')
-            cell.font = font_title
-            cell.alignment = align_center_top
-            
-            # === FILA 4: Vacía (fusionada A4:G4) ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.merge_cells(f'A{current_row}:G{current_row}')
-            ws.cell(row=current_row, column=1, value='')
-            
-            # === FILA 5: Proyecto y Ubicación (fusionada A5:L5) ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 55.05
-            proyecto_ubicacion = self.header_info.get('proyecto', '') + '\n' + self.header_info.get('ubicacion', '')
-            ws.merge_cells(f'A{current_row}:L{current_row}')
-            cell = ws.cell(row=current_row, column=1, value=proyecto_ubicacion)
-            cell.font = font_project
-            cell.alignment = align_justify_top
-            
-            # === FILA 6: Vacía (fusionada A6:G6) ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.merge_cells(f'A{current_row}:G{current_row}')
-            ws.cell(row=current_row, column=1, value='')
-            
-            # === FILA 7: ANALISIS DE PRECIOS UNITARIOS + HOJA + DETERMINACION ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 16.95
-            cell = ws.cell(row=current_row, column=1, value='                                   ANALISIS DE PRECIOS UNITARIOS')
-            cell.font = font_header_section
-            ws.cell(row=current_row, column=7, value=f'HOJA {rubro_idx} DE {total_rubros}')
-            ws.cell(row=current_row, column=8, value='               DETERMINACION DEL VAE DEL RUBRO')
-            
-            # === FILA 8: RUBRO + UNIDAD ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.cell(row=current_row, column=1, value=f'RUBRO   :      {rubro["numero_rubro"]}').font = font_normal
-            ws.cell(row=current_row, column=7, value=f'UNIDAD: {rubro["unidad"]}')
-            
-            # === FILA 9: DETALLE + CANTIDAD ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.cell(row=current_row, column=1, value=f'DETALLE :      {rubro["detalle"]}').font = font_normal
-            if rubro['cantidad']:
-                ws.cell(row=current_row, column=7, value=rubro['cantidad'])
-            
-            # === FILA 10: ESPECIFICACIONES/OBSERVACIONES o Número de página ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            if rubro.get('especificaciones'):
-                ws.cell(row=current_row, column=1, value=rubro['especificaciones']).font = font_normal
-                ws.cell(row=current_row, column=6, value=rubro.get('numero_pagina', rubro['numero_rubro']))
-                ws.cell(row=current_row, column=7, value=4)
-            elif rubro.get('observaciones'):
-                ws.cell(row=current_row, column=1, value=rubro['observaciones']).font = font_normal
-                ws.cell(row=current_row, column=6, value=rubro.get('numero_pagina', rubro['numero_rubro']))
-                ws.cell(row=current_row, column=7, value=4)
-            else:
-                ws.cell(row=current_row, column=1, value='')
-                ws.cell(row=current_row, column=6, value=rubro.get('numero_pagina', rubro['numero_rubro']))
-                ws.cell(row=current_row, column=7, value=4)
-            
-            # === FILA 11: Vacía ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
+        return SimpleNamespace(
+            font_title=font_title,
+            font_project=font_project,
+            font_header_section=font_header_section,
+            font_normal=font_normal,
+            font_header_table=font_header_table,
+            font_total=font_total,
+            align_center_top=align_center_top,
+            align_justify_top=align_justify_top,
+            align_center_wrap=align_center_wrap,
+            align_left=align_left,
+            align_right=align_right,
+            fmt_text=fmt_text,
+            fmt_number=fmt_number,
+            fmt_rendimiento=fmt_rendimiento,
+            fmt_peso_relativo=fmt_peso_relativo,
+            fmt_vae_pct=fmt_vae_pct,
+            fmt_vae_elemento=fmt_vae_elemento,
+            thin_border=thin_border,
+            border_left=border_left,
+            border_right=border_right,
+            border_middle=border_middle
+        )
+    
+    def _write_rubro(self, ws, current_row, rubro, rubro_idx, total_rubros, estilos, dv):
+        """
+        Escribe el bloque completo de un rubro a partir de la fila siguiente a current_row.
+        
+        Returns:
+            Última fila escrita del bloque
+        """
+        font_title = estilos.font_title
+        font_project = estilos.font_project
+        font_header_section = estilos.font_header_section
+        font_normal = estilos.font_normal
+        font_header_table = estilos.font_header_table
+        font_total = estilos.font_total
+        align_center_top = estilos.align_center_top
+        align_justify_top = estilos.align_justify_top
+        align_center_wrap = estilos.align_center_wrap
+        align_left = estilos.align_left
+        align_right = estilos.align_right
+        fmt_text = estilos.fmt_text
+        fmt_number = estilos.fmt_number
+        fmt_rendimiento = estilos.fmt_rendimiento
+        fmt_peso_relativo = estilos.fmt_peso_relativo
+        fmt_vae_pct = estilos.fmt_vae_pct
+        fmt_vae_elemento = estilos.fmt_vae_elemento
+        thin_border = estilos.thin_border
+        border_left = estilos.border_left
+        border_right = estilos.border_right
+        border_middle = estilos.border_middle
+        
+        start_row = current_row + 1
+        
+        # === FILA 1: Vacía ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 22.8
+        
+        # === FILA 2: Vacía ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        
+        # === FILA 3: Nombre del profesional ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 49.95
+        cell = ws.cell(row=current_row, column=1, value=self.header_info.get('profesional', '') + '\n')
+        cell.font = font_title
+        cell.alignment = align_center_top
+        
+        # === FILA 4: Vacía (fusionada A4:G4) ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.merge_cells(f'A{current_row}:G{current_row}')
+        ws.cell(row=current_row, column=1, value='')
+        
+        # === FILA 5: Proyecto y Ubicación (fusionada A5:L5) ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 55.05
+        proyecto_ubicacion = self.header_info.get('proyecto', '') + '\n' + self.header_info.get('ubicacion', '')
+        ws.merge_cells(f'A{current_row}:L{current_row}')
+        cell = ws.cell(row=current_row, column=1, value=proyecto_ubicacion)
+        cell.font = font_project
+        cell.alignment = align_justify_top
+        
+        # === FILA 6: Vacía (fusionada A6:G6) ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.merge_cells(f'A{current_row}:G{current_row}')
+        ws.cell(row=current_row, column=1, value='')
+        
+        # === FILA 7: ANALISIS DE PRECIOS UNITARIOS + HOJA + DETERMINACION ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 16.95
+        cell = ws.cell(row=current_row, column=1, value='                                   ANALISIS DE PRECIOS UNITARIOS')
+        cell.font = font_header_section
+        ws.cell(row=current_row, column=7, value=f'HOJA {rubro_idx} DE {total_rubros}')
+        ws.cell(row=current_row, column=8, value='               DETERMINACION DEL VAE DEL RUBRO')
+        
+        # === FILA 8: RUBRO + UNIDAD ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value=f'RUBRO   :      {rubro["numero_rubro"]}').font = font_normal
+        ws.cell(row=current_row, column=7, value=f'UNIDAD: {rubro["unidad"]}')
+        
+        # === FILA 9: DETALLE + CANTIDAD ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value=f'DETALLE :      {rubro["detalle"]}').font = font_normal
+        if rubro['cantidad']:
+            ws.cell(row=current_row, column=7, value=rubro['cantidad'])
+        
+        # === FILA 10: ESPECIFICACIONES/OBSERVACIONES o Número de página ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        if rubro.get('especificaciones'):
+            ws.cell(row=current_row, column=1, value=rubro['especificaciones']).font = font_normal
+            ws.cell(row=current_row, column=6, value=rubro.get('numero_pagina', rubro['numero_rubro']))
+            ws.cell(row=current_row, column=7, value=4)
+        elif rubro.get('observaciones'):
+            ws.cell(row=current_row, column=1, value=rubro['observaciones']).font = font_normal
+            ws.cell(row=current_row, column=6, value=rubro.get('numero_pagina', rubro['numero_rubro']))
+            ws.cell(row=current_row, column=7, value=4)
+        else:
             ws.cell(row=current_row, column=1, value='')
-            
-            # === FILA 12: ENCABEZADO EQUIPO ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 25.95
-            headers_equipo = ['EQUIPO\nDESCRIPCION', '514704408', 'CANTIDAD\nA', 'TARIFA\nB', 
-                            'COSTO HORA\nC=AxB', 'RENDIMIENTO\nR', 'COSTO\nD=CxR',
-                            'Peso Relativo\nElemento (%)', 'CPC\nElemento', 'NP / EP /\nND',
-                            'VAE (%)', 'VAE (%)\nElemento']
-            for col, header in enumerate(headers_equipo, 1):
-                cell = ws.cell(row=current_row, column=col, value=header)
-                cell.font = font_header_table
-                cell.alignment = align_center_wrap
-                cell.border = thin_border
-            
-            # === FILA 13: Datos de equipo ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            if rubro['equipos']:
-                for equipo in rubro['equipos']:
-                    cell_desc = ws.cell(row=current_row, column=1, value=equipo['descripcion'])
-                    cell_desc.border = border_left
-                    cell_desc.number_format = fmt_text
-                    
-                    # Escribir todos los campos del equipo con formatos correctos
-                    # Usar 0 en lugar de None para valores numéricos vacíos
-                    c = ws.cell(row=current_row, column=3, value=equipo.get('cantidad') if equipo.get('cantidad') is not None else 0)
-                    c.number_format = fmt_number
-                    
-                    c = ws.cell(row=current_row, column=4, value=equipo.get('tarifa') if equipo.get('tarifa') is not None else 0)
-                    c.number_format = fmt_number
-                    
-                    c = ws.cell(row=current_row, column=5, value=equipo.get('costo_hora') if equipo.get('costo_hora') is not None else 0)
-                    c.number_format = fmt_number
-                    
-                    c = ws.cell(row=current_row, column=6, value=equipo.get('rendimiento') if equipo.get('rendimiento') is not None else 0)
-                    c.number_format = fmt_rendimiento
-                    
-                    c = ws.cell(row=current_row, column=7, value=equipo.get('costo') if equipo.get('costo') is not None else 0)
-                    c.number_format = fmt_number
-                    
-                    c = ws.cell(row=current_row, column=8, value=equipo.get('peso_relativo') if equipo.get('peso_relativo') is not None else 0)
-                    c.number_format = fmt_peso_relativo
-                    
-                    # Asegurar que CPC sea string
-                    cpc_val = str(equipo.get('cpc', '')) if equipo.get('cpc') is not None else ''
-                    c = ws.cell(row=current_row, column=9, value=cpc_val)
-                    c.number_format = fmt_text
-                    
-                    # Celda NP/EP/ND con formato texto explícito
-                    c_vae = ws.cell(row=current_row, column=10, value=equipo.get('np_ep_nd', 'ND'))
-                    c_vae.number_format = fmt_text
-                    c_vae.data_type = 's'  # Forzar tipo string
-                    
-                    c = ws.cell(row=current_row, column=11, value=equipo.get('vae_pct', 0) if equipo.get('vae_pct') is not None else 0)
-                    c.number_format = fmt_vae_pct
-                    
-                    c = ws.cell(row=current_row, column=12, value=equipo.get('vae_elemento') if equipo.get('vae_elemento') is not None else 0)
-                    c.border = border_right
-                    c.number_format = fmt_vae_elemento
-                    
-                    # Aplicar bordes a todas las celdas de la fila
-                    for col in range(2, 12):
-                        if col != 12:
-                            ws.cell(row=current_row, column=col).border = border_middle
-                    current_row += 1
-                    ws.row_dimensions[current_row].height = 15.0
-                current_row -= 1  # Compensar el incremento extra
-            else:
-                cell_desc = ws.cell(row=current_row, column=1, value='Herramienta Menor 5% de M.O.')
-                cell_desc.border = border_left
-                cell_desc.number_format = fmt_text
-                c = ws.cell(row=current_row, column=7, value=rubro['subtotal_m'])
-                c.number_format = fmt_number
-                peso_rel = round(rubro['subtotal_m'] / rubro['total_costo_directo'], 5) if rubro['total_costo_directo'] > 0 else 0
-                c = ws.cell(row=current_row, column=8, value=peso_rel)
-                c.number_format = fmt_peso_relativo
-                c = ws.cell(row=current_row, column=9, value='4299217233')
-                c.number_format = fmt_text
-                c_vae = ws.cell(row=current_row, column=10, value='ND')
-                c_vae.number_format = fmt_text
-                c_vae.data_type = 's'
-                c = ws.cell(row=current_row, column=11, value=0.4)
-                c.number_format = fmt_vae_pct
-                c = ws.cell(row=current_row, column=12, value=round(peso_rel * 0.4, 5))
-                c.border = border_right
-                c.number_format = fmt_vae_elemento
-                for col in range(2, 12):
-                    ws.cell(row=current_row, column=col).border = border_middle
-            
-            # === FILA 14: SUBTOTAL M ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.cell(row=current_row, column=1, value='SUBTOTAL M').border = border_left
-            ws.cell(row=current_row, column=7, value=rubro['subtotal_m'])
-            for c in range(2, 12):
-                ws.cell(row=current_row, column=c).border = border_middle
-            ws.cell(row=current_row, column=12).border = border_right
-            
-            # === FILA 15: Vacía (altura pequeña) ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 4.95
-            
-            # === FILA 16: ENCABEZADO MANO DE OBRA ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 25.95
-            headers_mo = ['MANO DE OBRA\nDESCRIPCION', '', 'CANTIDAD\nA', 'JORNAL/HR\nB',
-                         'COSTO HORA\nC=AxB', 'RENDIMIENTO\nR', 'COSTO\nD=CxR',
-                         'Peso Relativo\nElemento (%)', 'CPC\nElemento', 'NP / EP /\nND',
-                         'VAE (%)', 'VAE (%)\nElemento']
-            for col, header in enumerate(headers_mo, 1):
-                cell = ws.cell(row=current_row, column=col, value=header)
-                cell.font = font_header_table
-                cell.alignment = align_center_wrap
-                cell.border = thin_border
-            
-            # === FILAS DE MANO DE OBRA ===
-            for mo in rubro['mano_obra']:
-                current_row += 1
-                ws.row_dimensions[current_row].height = 15.0
-                cell_desc = ws.cell(row=current_row, column=1, value=mo['descripcion'])
+            ws.cell(row=current_row, column=6, value=rubro.get('numero_pagina', rubro['numero_rubro']))
+            ws.cell(row=current_row, column=7, value=4)
+        
+        # === FILA 11: Vacía ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value='')
+        
+        # === FILA 12: ENCABEZADO EQUIPO ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 25.95
+        headers_equipo = ['EQUIPO\nDESCRIPCION', '514704408', 'CANTIDAD\nA', 'TARIFA\nB', 
+                        'COSTO HORA\nC=AxB', 'RENDIMIENTO\nR', 'COSTO\nD=CxR',
+                        'Peso Relativo\nElemento (%)', 'CPC\nElemento', 'NP / EP /\nND',
+                        'VAE (%)', 'VAE (%)\nElemento']
+        for col, header in enumerate(headers_equipo, 1):
+            cell = ws.cell(row=current_row, column=col, value=header)
+            cell.font = font_header_table
+            cell.alignment = align_center_wrap
+            cell.border = thin_border
+        
+        # === FILA 13: Datos de equipo ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        if rubro['equipos']:
+            for equipo in rubro['equipos']:
+                cell_desc = ws.cell(row=current_row, column=1, value=equipo['descripcion'])
                 cell_desc.border = border_left
                 cell_desc.number_format = fmt_text
-                ws.cell(row=current_row, column=2, value=mo.get('categoria', ''))
-                c = ws.cell(row=current_row, column=3, value=mo.get('cantidad'))
+                
+                # Escribir todos los campos del equipo con formatos correctos
+                # Usar 0 en lugar de None para valores numéricos vacíos
+                c = ws.cell(row=current_row, column=3, value=equipo.get('cantidad') if equipo.get('cantidad') is not None else 0)
                 c.number_format = fmt_number
-                c = ws.cell(row=current_row, column=4, value=mo.get('tarifa'))
+                
+                c = ws.cell(row=current_row, column=4, value=equipo.get('tarifa') if equipo.get('tarifa') is not None else 0)
                 c.number_format = fmt_number
-                c = ws.cell(row=current_row, column=5, value=mo.get('costo_hora'))
+                
+                c = ws.cell(row=current_row, column=5, value=equipo.get('costo_hora') if equipo.get('costo_hora') is not None else 0)
                 c.number_format = fmt_number
-                c = ws.cell(row=current_row, column=6, value=mo.get('rendimiento'))
+                
+                c = ws.cell(row=current_row, column=6, value=equipo.get('rendimiento') if equipo.get('rendimiento') is not None else 0)
                 c.number_format = fmt_rendimiento
-                c = ws.cell(row=current_row, column=7, value=mo.get('costo'))
-                c.number_format = fmt_number
-                c = ws.cell(row=current_row, column=8, value=mo.get('peso_relativo'))
-                c.number_format = fmt_peso_relativo
-                c = ws.cell(row=current_row, column=9, value=mo.get('cpc'))
-                c.number_format = fmt_text
-                c_vae = ws.cell(row=current_row, column=10, value=mo.get('np_ep_nd', 'EP'))
-                c_vae.number_format = fmt_text
-                c_vae.data_type = 's'
-                c = ws.cell(row=current_row, column=11, value=mo.get('vae_pct', 1))
-                c.number_format = fmt_vae_pct
-                c = ws.cell(row=current_row, column=12, value=mo.get('vae_elemento'))
-                c.border = border_right
-                c.number_format = fmt_vae_elemento
-                for col in range(2, 12):
-                    ws.cell(row=current_row, column=col).border = border_middle
-            
-            # === SUBTOTAL N ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.cell(row=current_row, column=1, value='SUBTOTAL N').border = border_left
-            ws.cell(row=current_row, column=7, value=rubro['subtotal_n'])
-            for c in range(2, 12):
-                ws.cell(row=current_row, column=c).border = border_middle
-            ws.cell(row=current_row, column=12).border = border_right
-            
-            # === FILA VACÍA (altura pequeña) ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 4.95
-            
-            # === ENCABEZADO MATERIALES ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 25.95
-            headers_mat = ['MATERIALES\nDESCRIPCION', '', '', 'UNIDAD\n', 'CANTIDAD\nA',
-                          'PRECIO UNIT.\nB', 'COSTO\nC=AxB', 'Peso Relativo\nElemento (%)',
-                          'CPC\nElemento', 'NP / EP /\nND', 'VAE (%)', 'VAE (%)\nElemento']
-            for col, header in enumerate(headers_mat, 1):
-                cell = ws.cell(row=current_row, column=col, value=header)
-                cell.font = font_header_table
-                cell.alignment = align_center_wrap
-                cell.border = thin_border
-            
-            # === FILAS DE MATERIALES ===
-            for mat in rubro['materiales']:
-                current_row += 1
-                ws.row_dimensions[current_row].height = 15.0
-                cell_desc = ws.cell(row=current_row, column=1, value=mat['descripcion'])
-                cell_desc.border = border_left
-                cell_desc.number_format = fmt_text
-                ws.cell(row=current_row, column=4, value=mat.get('unidad', ''))
-                c = ws.cell(row=current_row, column=5, value=mat.get('cantidad'))
-                c.number_format = fmt_number
-                c = ws.cell(row=current_row, column=6, value=mat.get('tarifa'))
-                c.number_format = fmt_number
-                c = ws.cell(row=current_row, column=7, value=mat.get('costo'))
+                
+                c = ws.cell(row=current_row, column=7, value=equipo.get('costo') if equipo.get('costo') is not None else 0)
                 c.number_format = fmt_number
-                c = ws.cell(row=current_row, column=8, value=mat.get('peso_relativo'))
+                
+                c = ws.cell(row=current_row, column=8, value=equipo.get('peso_relativo') if equipo.get('peso_relativo') is not None else 0)
                 c.number_format = fmt_peso_relativo
-                c = ws.cell(row=current_row, column=9, value=mat.get('cpc'))
+                
+                # Asegurar que CPC sea string
+                cpc_val = str(equipo.get('cpc', '')) if equipo.get('cpc') is not None else ''
+                c = ws.cell(row=current_row, column=9, value=cpc_val)
                 c.number_format = fmt_text
-                c_vae = ws.cell(row=current_row, column=10, value=mat.get('np_ep_nd', 'EP'))
+                
+                # Celda NP/EP/ND con formato texto explícito
+                c_vae = ws.cell(row=current_row, column=10, value=equipo.get('np_ep_nd', 'ND'))
                 c_vae.number_format = fmt_text
-                c_vae.data_type = 's'
-                c = ws.cell(row=current_row, column=11, value=mat.get('vae_pct', 1))
+                c_vae.data_type = 's'  # Forzar tipo string
+                
+                c = ws.cell(row=current_row, column=11, value=equipo.get('vae_pct', 0) if equipo.get('vae_pct') is not None else 0)
                 c.number_format = fmt_vae_pct
-                c = ws.cell(row=current_row, column=12, value=mat.get('vae_elemento'))
+                
+                c = ws.cell(row=current_row, column=12, value=equipo.get('vae_elemento') if equipo.get('vae_elemento') is not None else 0)
                 c.border = border_right
                 c.number_format = fmt_vae_elemento
+                
+                # Aplicar bordes a todas las celdas de la fila
                 for col in range(2, 12):
-                    ws.cell(row=current_row, column=col).border = border_middle
-            
-            # === SUBTOTAL O ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.cell(row=current_row, column=1, value='SUBTOTAL O').border = border_left
-            ws.cell(row=current_row, column=7, value=rubro['subtotal_o'])
-            for c in range(2, 12):
-                ws.cell(row=current_row, column=c).border = border_middle
-            ws.cell(row=current_row, column=12).border = border_right
-            
-            # === FILA VACÍA (altura pequeña) ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 4.95
-            
-            # === ENCABEZADO TRANSPORTE ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 25.95
-            headers_trans = ['TRANSPORTE\nDESCRIPCION', '', '', 'UNIDAD\n', 'CANTIDAD\nA',
-                            'TARIFA\nB', 'COSTO\nC=AxB', 'Peso Relativo\nElemento (%)',
-                            'CPC\nElemento', 'NP / EP /\nND', 'VAE (%)', 'VAE (%)\nElemento']
-            for col, header in enumerate(headers_trans, 1):
-                cell = ws.cell(row=current_row, column=col, value=header)
-                cell.font = font_header_table
-                cell.alignment = align_center_wrap
-                cell.border = thin_border
-            
-            # === FILAS DE TRANSPORTE ===
-            for trans in rubro['transporte']:
+                    if col != 12:
+                        ws.cell(row=current_row, column=col).border = border_middle
                 current_row += 1
                 ws.row_dimensions[current_row].height = 15.0
-                cell_desc = ws.cell(row=current_row, column=1, value=trans['descripcion'])
-                cell_desc.border = border_left
-                cell_desc.number_format = fmt_text
-                ws.cell(row=current_row, column=4, value=trans.get('unidad', ''))
-                c = ws.cell(row=current_row, column=5, value=trans.get('cantidad'))
-                c.number_format = fmt_number
-                c = ws.cell(row=current_row, column=6, value=trans.get('tarifa'))
-                c.number_format = fmt_number
-                c = ws.cell(row=current_row, column=7, value=trans.get('costo'))
-                c.number_format = fmt_number
-                c = ws.cell(row=current_row, column=8, value=trans.get('peso_relativo'))
-                c.number_format = fmt_peso_relativo
-                c = ws.cell(row=current_row, column=9, value=trans.get('cpc'))
-                c.number_format = fmt_text
-                c_vae = ws.cell(row=current_row, column=10, value=trans.get('np_ep_nd', 'EP'))
-                c_vae.number_format = fmt_text
-                c_vae.data_type = 's'
-                c = ws.cell(row=current_row, column=11, value=trans.get('vae_pct', 1))
-                c.number_format = fmt_vae_pct
-                c = ws.cell(row=current_row, column=12, value=trans.get('vae_elemento'))
-                c.border = border_right
-                c.number_format = fmt_vae_elemento
-                for col in range(2, 12):
-                    ws.cell(row=current_row, column=col).border = border_middle
-            
-            # === SUBTOTAL P ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.cell(row=current_row, column=1, value='SUBTOTAL P').border = border_left
-            ws.cell(row=current_row, column=7, value=rubro['subtotal_p'])
-            for c in range(2, 12):
-                ws.cell(row=current_row, column=c).border = border_middle
-            ws.cell(row=current_row, column=12).border = border_right
-            
-            # === FILA VACÍA ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            
-            # === TOTAL COSTO DIRECTO ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 18.0
-            ws.cell(row=current_row, column=3, value='514704408').border = thin_border
-            cell = ws.cell(row=current_row, column=4, value='TOTAL COSTO DIRECTO (M+N+O+P)')
-            cell.font = font_total
-            cell.border = thin_border
-            ws.cell(row=current_row, column=5).border = thin_border
-            ws.cell(row=current_row, column=6).border = thin_border
-            c = ws.cell(row=current_row, column=7, value=rubro['total_costo_directo'])
-            c.border = thin_border
+            current_row -= 1  # Compensar el incremento extra
+        else:
+            cell_desc = ws.cell(row=current_row, column=1, value='Herramienta Menor 5% de M.O.')
+            cell_desc.border = border_left
+            cell_desc.number_format = fmt_text
+            c = ws.cell(row=current_row, column=7, value=rubro['subtotal_m'])
             c.number_format = fmt_number
-            # Columna H: 100% (peso relativo total)
-            c = ws.cell(row=current_row, column=8, value=1)  # 100%
-            c.border = thin_border
-            c.number_format = fmt_peso_relativo  # Formato porcentaje 0.000%
-            ws.cell(row=current_row, column=9).border = thin_border
-            ws.cell(row=current_row, column=10).border = thin_border
-            ws.cell(row=current_row, column=11).border = thin_border
-            # Columna L: VAE Total del rubro
-            c = ws.cell(row=current_row, column=12, value=rubro['vae_total'])
-            c.border = thin_border
-            c.number_format = fmt_vae_elemento  # Formato porcentaje 0.000%
-            
-            # === INDIRECTOS ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 18.0
-            ws.cell(row=current_row, column=4, value='INDIRECTOS (%)').border = thin_border
-            ws.cell(row=current_row, column=5).border = thin_border
-            ws.cell(row=current_row, column=6, value=rubro['indirectos_pct']).border = thin_border
-            ws.cell(row=current_row, column=7, value=rubro['indirectos_valor']).border = thin_border
-            
-            # === UTILIDAD ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 18.0
-            ws.cell(row=current_row, column=4, value='UTILIDAD (%)').border = thin_border
-            ws.cell(row=current_row, column=5).border = thin_border
-            ws.cell(row=current_row, column=6, value=rubro['utilidad_pct']).border = thin_border
-            ws.cell(row=current_row, column=7, value=rubro['utilidad_valor']).border = thin_border
-            
-            # === COSTO TOTAL DEL RUBRO ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 18.0
-            ws.cell(row=current_row, column=4, value='COSTO TOTAL DEL RUBRO').border = thin_border
-            ws.cell(row=current_row, column=5).border = thin_border
-            ws.cell(row=current_row, column=6).border = thin_border
-            ws.cell(row=current_row, column=7, value=rubro['costo_total']).border = thin_border
-            
-            # === VALOR UNITARIO ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 21.0
-            ws.cell(row=current_row, column=4, value='VALOR UNITARIO').border = thin_border
-            ws.cell(row=current_row, column=5).border = thin_border
-            ws.cell(row=current_row, column=6).border = thin_border
-            ws.cell(row=current_row, column=7, value=rubro['valor_unitario']).border = thin_border
-            
-            # === FILA VACÍA ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.cell(row=current_row, column=1, value='')
-            
-            # === SON: ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.cell(row=current_row, column=1, value=rubro['texto_valor'])
-            
-            # === ESTOS PRECIOS NO INCLUYEN IVA ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
-            ws.cell(row=current_row, column=1, value='ESTOS PRECIOS NO INCLUYEN IVA')
-            
-            # === FILAS VACÍAS ===
-            current_row += 1
-            ws.row_dimensions[current_row].height = 15.0
+            peso_rel = round(rubro['subtotal_m'] / rubro['total_costo_directo'], 5) if rubro['total_costo_directo'] > 0 else 0
+            c = ws.cell(row=current_row, column=8, value=peso_rel)
+            c.number_format = fmt_peso_relativo
+            c = ws.cell(row=current_row, column=9, value='4299217233')
+            c.number_format = fmt_text
+            c_vae = ws.cell(row=current_row, column=10, value='ND')
+            c_vae.number_format = fmt_text
+            c_vae.data_type = 's'
+            c = ws.cell(row=current_row, column=11, value=0.4)
+            c.number_format = fmt_vae_pct
+            c = ws.cell(row=current_row, column=12, value=round(peso_rel * 0.4, 5))
+            c.border = border_right
+            c.number_format = fmt_vae_elemento
+            for col in range(2, 12):
+                ws.cell(row=current_row, column=col).border = border_middle
+        
+        # === FILA 14: SUBTOTAL M ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value='SUBTOTAL M').border = border_left
+        ws.cell(row=current_row, column=7, value=rubro['subtotal_m'])
+        for c in range(2, 12):
+            ws.cell(row=current_row, column=c).border = border_middle
+        ws.cell(row=current_row, column=12).border = border_right
+        
+        # === FILA 15: Vacía (altura pequeña) ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 4.95
+        
+        # === FILA 16: ENCABEZADO MANO DE OBRA ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 25.95
+        headers_mo = ['MANO DE OBRA\nDESCRIPCION', '', 'CANTIDAD\nA', 'JORNAL/HR\nB',
+                     'COSTO HORA\nC=AxB', 'RENDIMIENTO\nR', 'COSTO\nD=CxR',
+                     'Peso Relativo\nElemento (%)', 'CPC\nElemento', 'NP / EP /\nND',
+                     'VAE (%)', 'VAE (%)\nElemento']
+        for col, header in enumerate(headers_mo, 1):
+            cell = ws.cell(row=current_row, column=col, value=header)
+            cell.font = font_header_table
+            cell.alignment = align_center_wrap
+            cell.border = thin_border
+        
+        # === FILAS DE MANO DE OBRA ===
+        for mo in rubro['mano_obra']:
             current_row += 1
             ws.row_dimensions[current_row].height = 15.0
-            
-            # === FECHA ===
+            cell_desc = ws.cell(row=current_row, column=1, value=mo['descripcion'])
+            cell_desc.border = border_left
+            cell_desc.number_format = fmt_text
+            ws.cell(row=current_row, column=2, value=mo.get('categoria', ''))
+            c = ws.cell(row=current_row, column=3, value=mo.get('cantidad'))
+            c.number_format = fmt_number
+            c = ws.cell(row=current_row, column=4, value=mo.get('tarifa'))
+            c.number_format = fmt_number
+            c = ws.cell(row=current_row, column=5, value=mo.get('costo_hora'))
+            c.number_format = fmt_number
+            c = ws.cell(row=current_row, column=6, value=mo.get('rendimiento'))
+            c.number_format = fmt_rendimiento
+            c = ws.cell(row=current_row, column=7, value=mo.get('costo'))
+            c.number_format = fmt_number
+            c = ws.cell(row=current_row, column=8, value=mo.get('peso_relativo'))
+            c.number_format = fmt_peso_relativo
+            c = ws.cell(row=current_row, column=9, value=mo.get('cpc'))
+            c.number_format = fmt_text
+            c_vae = ws.cell(row=current_row, column=10, value=mo.get('np_ep_nd', 'EP'))
+            c_vae.number_format = fmt_text
+            c_vae.data_type = 's'
+            c = ws.cell(row=current_row, column=11, value=mo.get('vae_pct', 1))
+            c.number_format = fmt_vae_pct
+            c = ws.cell(row=current_row, column=12, value=mo.get('vae_elemento'))
+            c.border = border_right
+            c.number_format = fmt_vae_elemento
+            for col in range(2, 12):
+                ws.cell(row=current_row, column=col).border = border_middle
+        
+        # === SUBTOTAL N ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value='SUBTOTAL N').border = border_left
+        ws.cell(row=current_row, column=7, value=rubro['subtotal_n'])
+        for c in range(2, 12):
+            ws.cell(row=current_row, column=c).border = border_middle
+        ws.cell(row=current_row, column=12).border = border_right
+        
+        # === FILA VACÍA (altura pequeña) ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 4.95
+        
+        # === ENCABEZADO MATERIALES ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 25.95
+        headers_mat = ['MATERIALES\nDESCRIPCION', '', '', 'UNIDAD\n', 'CANTIDAD\nA',
+                      'PRECIO UNIT.\nB', 'COSTO\nC=AxB', 'Peso Relativo\nElemento (%)',
+                      'CPC\nElemento', 'NP / EP /\nND', 'VAE (%)', 'VAE (%)\nElemento']
+        for col, header in enumerate(headers_mat, 1):
+            cell = ws.cell(row=current_row, column=col, value=header)
+            cell.font = font_header_table
+            cell.alignment = align_center_wrap
+            cell.border = thin_border
+        
+        # === FILAS DE MATERIALES ===
+        for mat in rubro['materiales']:
             current_row += 1
             ws.row_dimensions[current_row].height = 15.0
-            ws.cell(row=current_row, column=1, value=rubro['fecha'])
-            
-            # === FILA VACÍA AL FINAL DEL RUBRO (solo 1) ===
+            cell_desc = ws.cell(row=current_row, column=1, value=mat['descripcion'])
+            cell_desc.border = border_left
+            cell_desc.number_format = fmt_text
+            ws.cell(row=current_row, column=4, value=mat.get('unidad', ''))
+            c = ws.cell(row=current_row, column=5, value=mat.get('cantidad'))
+            c.number_format = fmt_number
+            c = ws.cell(row=current_row, column=6, value=mat.get('tarifa'))
+            c.number_format = fmt_number
+            c = ws.cell(row=current_row, column=7, value=mat.get('costo'))
+            c.number_format = fmt_number
+            c = ws.cell(row=current_row, column=8, value=mat.get('peso_relativo'))
+            c.number_format = fmt_peso_relativo
+            c = ws.cell(row=current_row, column=9, value=mat.get('cpc'))
+            c.number_format = fmt_text
+            c_vae = ws.cell(row=current_row, column=10, value=mat.get('np_ep_nd', 'EP'))
+            c_vae.number_format = fmt_text
+            c_vae.data_type = 's'
+            c = ws.cell(row=current_row, column=11, value=mat.get('vae_pct', 1))
+            c.number_format = fmt_vae_pct
+            c = ws.cell(row=current_row, column=12, value=mat.get('vae_elemento'))
+            c.border = border_right
+            c.number_format = fmt_vae_elemento
+            for col in range(2, 12):
+                ws.cell(row=current_row, column=col).border = border_middle
+        
+        # === SUBTOTAL O ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value='SUBTOTAL O').border = border_left
+        ws.cell(row=current_row, column=7, value=rubro['subtotal_o'])
+        for c in range(2, 12):
+            ws.cell(row=current_row, column=c).border = border_middle
+        ws.cell(row=current_row, column=12).border = border_right
+        
+        # === FILA VACÍA (altura pequeña) ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 4.95
+        
+        # === ENCABEZADO TRANSPORTE ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 25.95
+        headers_trans = ['TRANSPORTE\nDESCRIPCION', '', '', 'UNIDAD\n', 'CANTIDAD\nA',
+                        'TARIFA\nB', 'COSTO\nC=AxB', 'Peso Relativo\nElemento (%)',
+                        'CPC\nElemento', 'NP / EP /\nND', 'VAE (%)', 'VAE (%)\nElemento']
+        for col, header in enumerate(headers_trans, 1):
+            cell = ws.cell(row=current_row, column=col, value=header)
+            cell.font = font_header_table
+            cell.alignment = align_center_wrap
+            cell.border = thin_border
+        
+        # === FILAS DE TRANSPORTE ===
+        for trans in rubro['transporte']:
             current_row += 1
             ws.row_dimensions[current_row].height = 15.0
-            
-            # Agregar salto de página después de cada rubro
-            from openpyxl.worksheet.pagebreak import Break
-            ws.row_breaks.append(Break(id=current_row))
-        
-        # === CONFIGURACIÓN DE PÁGINA PARA IMPRESIÓN/PDF ===
-        from openpyxl.worksheet.page import PageMargins
-        
-        # Configurar orientación y tamaño de papel
-        ws.page_setup.orientation = 'portrait'
-        ws.page_setup.paperSize = 9  # A4
-        ws.page_setup.scale = 52  # Escala al 52%
-        ws.page_setup.fitToPage = False
-        
-        # Configurar márgenes
-        ws.page_margins = PageMargins(
-            top=0.5,
-            bottom=0.7,
-            left=0.7,
-            right=0.15,
-            header=0.3,
-            footer=0.3
-        )
-        
-        # Configurar títulos de impresión (print titles)
-        ws.print_title_rows = '1:1'
-        
-        # === PROPIEDADES DEL DOCUMENTO PARA PUNIS ===
-        wb.properties.title = 'PUNIS'
-        wb.properties.subject = 'Precios Unitarios'
-        wb.properties.creator = 'PUNIS'
-        wb.properties.category = self.header_info.get('profesional', '')
-        
-        # === AGREGAR VALIDACIÓN DE DATOS PARA COLUMNA J (NP/EP/ND) ===
-        # Crear la validación de datos con la lista de opciones
-        # showDropDown debe estar en False (no mostrar dropdown) pero la validación sigue activa
-        dv = DataValidation(
-            type="list",
-            formula1='"NP,EP,ND"',
-            allow_blank=False,
-            showDropDown=False,  # No mostrar el dropdown pero validar
-            showInputMessage=False,
-            showErrorMessage=False
-        )
-        dv.error = 'El valor debe ser NP, EP o ND'
-        dv.errorTitle = 'Entrada inválida'
-        dv.prompt = 'Seleccione NP, EP o ND'
-        dv.promptTitle = 'Tipo de origen'
-        
-        # Agregar la validación a la hoja
-        ws.add_data_validation(dv)
+            cell_desc = ws.cell(row=current_row, column=1, value=trans['descripcion'])
+            cell_desc.border = border_left
+            cell_desc.number_format = fmt_text
+            ws.cell(row=current_row, column=4, value=trans.get('unidad', ''))
+            c = ws.cell(row=current_row, column=5, value=trans.get('cantidad'))
+            c.number_format = fmt_number
+            c = ws.cell(row=current_row, column=6, value=trans.get('tarifa'))
+            c.number_format = fmt_number
+            c = ws.cell(row=current_row, column=7, value=trans.get('costo'))
+            c.number_format = fmt_number
+            c = ws.cell(row=current_row, column=8, value=trans.get('peso_relativo'))
+            c.number_format = fmt_peso_relativo
+            c = ws.cell(row=current_row, column=9, value=trans.get('cpc'))
+            c.number_format = fmt_text
+            c_vae = ws.cell(row=current_row, column=10, value=trans.get('np_ep_nd', 'EP'))
+            c_vae.number_format = fmt_text
+            c_vae.data_type = 's'
+            c = ws.cell(row=current_row, column=11, value=trans.get('vae_pct', 1))
+            c.number_format = fmt_vae_pct
+            c = ws.cell(row=current_row, column=12, value=trans.get('vae_elemento'))
+            c.border = border_right
+            c.number_format = fmt_vae_elemento
+            for col in range(2, 12):
+                ws.cell(row=current_row, column=col).border = border_middle
+        
+        # === SUBTOTAL P ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value='SUBTOTAL P').border = border_left
+        ws.cell(row=current_row, column=7, value=rubro['subtotal_p'])
+        for c in range(2, 12):
+            ws.cell(row=current_row, column=c).border = border_middle
+        ws.cell(row=current_row, column=12).border = border_right
+        
+        # === FILA VACÍA ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        
+        # === TOTAL COSTO DIRECTO ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 18.0
+        ws.cell(row=current_row, column=3, value='514704408').border = thin_border
+        cell = ws.cell(row=current_row, column=4, value='TOTAL COSTO DIRECTO (M+N+O+P)')
+        cell.font = font_total
+        cell.border = thin_border
+        ws.cell(row=current_row, column=5).border = thin_border
+        ws.cell(row=current_row, column=6).border = thin_border
+        c = ws.cell(row=current_row, column=7, value=rubro['total_costo_directo'])
+        c.border = thin_border
+        c.number_format = fmt_number
+        # Columna H: 100% (peso relativo total)
+        c = ws.cell(row=current_row, column=8, value=1)  # 100%
+        c.border = thin_border
+        c.number_format = fmt_peso_relativo  # Formato porcentaje 0.000%
+        ws.cell(row=current_row, column=9).border = thin_border
+        ws.cell(row=current_row, column=10).border = thin_border
+        ws.cell(row=current_row, column=11).border = thin_border
+        # Columna L: VAE Total del rubro
+        c = ws.cell(row=current_row, column=12, value=rubro['vae_total'])
+        c.border = thin_border
+        c.number_format = fmt_vae_elemento  # Formato porcentaje 0.000%
+        
+        # === INDIRECTOS ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 18.0
+        ws.cell(row=current_row, column=4, value='INDIRECTOS (%)').border = thin_border
+        ws.cell(row=current_row, column=5).border = thin_border
+        ws.cell(row=current_row, column=6, value=rubro['indirectos_pct']).border = thin_border
+        ws.cell(row=current_row, column=7, value=rubro['indirectos_valor']).border = thin_border
+        
+        # === UTILIDAD ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 18.0
+        ws.cell(row=current_row, column=4, value='UTILIDAD (%)').border = thin_border
+        ws.cell(row=current_row, column=5).border = thin_border
+        ws.cell(row=current_row, column=6, value=rubro['utilidad_pct']).border = thin_border
+        ws.cell(row=current_row, column=7, value=rubro['utilidad_valor']).border = thin_border
+        
+        # === COSTO TOTAL DEL RUBRO ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 18.0
+        ws.cell(row=current_row, column=4, value='COSTO TOTAL DEL RUBRO').border = thin_border
+        ws.cell(row=current_row, column=5).border = thin_border
+        ws.cell(row=current_row, column=6).border = thin_border
+        ws.cell(row=current_row, column=7, value=rubro['costo_total']).border = thin_border
+        
+        # === VALOR UNITARIO ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 21.0
+        ws.cell(row=current_row, column=4, value='VALOR UNITARIO').border = thin_border
+        ws.cell(row=current_row, column=5).border = thin_border
+        ws.cell(row=current_row, column=6).border = thin_border
+        ws.cell(row=current_row, column=7, value=rubro['valor_unitario']).border = thin_border
+        
+        # === FILA VACÍA ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value='')
+        
+        # === SON: ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value=rubro['texto_valor'])
+        
+        # === ESTOS PRECIOS NO INCLUYEN IVA ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value='ESTOS PRECIOS NO INCLUYEN IVA')
+        
+        # === FILAS VACÍAS ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        
+        # === FECHA ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        ws.cell(row=current_row, column=1, value=rubro['fecha'])
+        
+        # === FILA VACÍA AL FINAL DEL RUBRO (solo 1) ===
+        current_row += 1
+        ws.row_dimensions[current_row].height = 15.0
+        
+        # Agregar salto de página después de cada rubro
+        from openpyxl.worksheet.pagebreak import Break
+        ws.row_breaks.append(Break(id=current_row))
         
         # Aplicar la validación a todas las celdas de columna J que contengan datos
-        for row in range(1, ws.max_row + 1):
+        # (la última fila del bloque siempre está vacía)
+        for row in range(start_row, current_row):
             cell_j = ws.cell(row=row, column=10)  # Columna J
             if cell_j.value in ['NP', 'EP', 'ND', 'NP / EP /\nND']:
                 dv.add(cell_j)
@@ -1073,7 +957,7 @@ class APUConverter:
         # Columnas con formato ###,##0.00: C, D, E, G (columnas numéricas regulares)
         # Columna con formato ###,##0.0000: F (Rendimiento)
         # Columnas con formato porcentaje (YA APLICADO): H=8 (0.000%), K=11 (0.00%), L=12 (0.000%)
-        for row in range(1, ws.max_row + 1):
+        for row in range(start_row, current_row):
             for col in [3, 4, 5, 7]:  # C, D, E, G - Solo columnas numéricas regulares
                 cell = ws.cell(row=row, column=col)
                 if cell.value is not None and isinstance(cell.value, (int, float)):
@@ -1083,172 +967,561 @@ class APUConverter:
             if cell_f.value is not None and isinstance(cell_f.value, (int, float)):
                 cell_f.number_format = '###,##0.0000'
         
-        # Guardar archivo
-        wb.save(output_path)
-        print(f"Archivo guardado: {output_path}")
-        return output_path
+        return current_row
 
 
-def convert_to_shared_strings(input_path, output_path=None):
-    """Convierte un archivo XLSX de inline strings a shared strings PRESERVANDO el orden."""
+# Atajos de módulo para el parseo sin estado
+_is_number = APUConverter._is_number
+_parse_number = APUConverter._parse_number
+
+
+def extract_header_fields(text):
+    """Extrae información del encabezado (profesional, proyecto, ubicación) de una página."""
+    header = {}
+    lines = text.split('\n')
     
-    if output_path is None:
-        output_path = input_path
+    # Buscar nombre del profesional (primera línea generalmente)
+    for line in lines[:5]:
+        if 'ING.' in line.upper() or 'ARQ.' in line.upper() or 'LIC.' in line.upper():
+            header['profesional'] = line.strip()
+            break
     
-    print(f"Post-procesando para compatibilidad PUNIS (Shared Strings)...")
+    # Buscar proyecto
+    for line in lines:
+        if 'PROYECTO:' in line.upper():
+            header['proyecto'] = line.strip()
+            break
     
-    # Crear directorio temporal
-    temp_dir = input_path + '_temp'
-    if os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
-    os.makedirs(temp_dir)
+    # Buscar ubicación
+    for line in lines:
+        if 'UBICACION:' in line.upper():
+            header['ubicacion'] = line.strip()
+            break
+    return header
+
+
+def parse_apu_page(page, timer=None):
+    """
+    Parsea una página del PDF sin estado: el resultado depende solo de la página.
     
-    try:
-        # Extraer el XLSX
-        with zipfile.ZipFile(input_path, 'r') as z:
-            z.extractall(temp_dir)
-        
-        # Parsear el worksheet
-        sheet_path = os.path.join(temp_dir, 'xl', 'worksheets', 'sheet1.xml')
-        
-        # Registrar namespace
-        ET.register_namespace('', 'http://schemas.openxmlformats.org/spreadsheetml/2006/main')
-        ET.register_namespace('r', 'http://schemas.openxmlformats.org/officeDocument/2006/relationships')
-        
-        # Leer y parsear
-        with open(sheet_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Recopilar todos los inline strings EN ORDEN DE APARICIÓN
-        # PUNIS REQUIERE que TODOS los strings sean shared strings, incluyendo NP/EP/ND
-        shared_strings = []
-        string_map = {}  # mapa de string -> índice
-        
-        # Buscar todos los inline strings EN ORDEN
-        # Patrón más flexible para capturar inline strings
-        pattern = r'<c r="([^"]*)"([^>]*)t="inlineStr"([^>]*)><is><t>([^<]*)</t></is></c>'
-        
-        # Primera pasada: recopilar strings en orden de primera aparición
-        for match in re.finditer(pattern, content):
-            cell_ref = match.group(1)
-            text = match.group(4)
+    No modifica ningún convertidor, así que se puede llamar desde varios hilos
+    o procesos a la vez (cada hilo con su propio objeto de página de pdfplumber
+    y, si mide tiempos, su propio StageTimer).
+    
+    Args:
+        page: Página de pdfplumber (o RecordedPage de page_fixtures.py)
+        timer: StageTimer opcional donde medir extract_text y extract_tables
+    
+    Returns:
+        Tupla (rubro o None, campos de encabezado encontrados en la página)
+    """
+    timer = timer or NULL_TIMER
+    with timer.stage('extract_text'):
+        text = page.extract_text()
+    if not text:
+        return None, {}
+    row_cache, cell_cache = _decode_row_record.cache_info(), _decode_cell.cache_info()
+    
+    # Encabezado del documento (el convertidor toma el de la primera página que lo tenga)
+    header = extract_header_fields(text)
+    
+    rubro_data = {
+        'numero_rubro': None,
+        'unidad': None,
+        'detalle': None,
+        'cantidad': None,
+        'hoja': None,
+        'equipos': [],
+        'mano_obra': [],
+        'materiales': [],
+        'transporte': [],
+        'subtotal_m': 0,
+        'subtotal_n': 0,
+        'subtotal_o': 0,
+        'subtotal_p': 0,
+        'total_costo_directo': 0,
+        'vae_total': 0,
+        'indirectos_pct': 0,
+        'indirectos_valor': 0,
+        'utilidad_pct': 0,
+        'utilidad_valor': 0,
+        'costo_total': 0,
+        'valor_unitario': 0,
+        'texto_valor': '',
+        'fecha': '',
+    }
+    
+    lines = text.split('\n')
+    
+    # Buscar número de rubro, unidad, detalle
+    for i, line in enumerate(lines):
+        # Número de rubro
+        match = re.search(r'RUBRO\s*:\s*(\d+)', line, re.IGNORECASE)
+        if match:
+            rubro_data['numero_rubro'] = int(match.group(1))
+        
+        # Unidad
+        match = re.search(r'UNIDAD:\s*(\S+)', line, re.IGNORECASE)
+        if match:
+            rubro_data['unidad'] = match.group(1)
+        
+        # Detalle
+        match = re.search(r'DETALLE\s*:\s*(.+)', line, re.IGNORECASE)
+        if match:
+            rubro_data['detalle'] = match.group(1).strip()
+        
+        # Hoja
+        match = re.search(r'HOJA\s+(\d+)\s+DE\s+(\d+)', line, re.IGNORECASE)
+        if match:
+            rubro_data['hoja'] = f"HOJA {match.group(1)} DE {match.group(2)}"
+            rubro_data['numero_pagina'] = int(match.group(1))
+        
+        # Fecha
+        if 'LORETO,' in line.upper() or any(mes in line.upper() for mes in ['ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO', 'JULIO', 'AGOSTO', 'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE']):
+            if 'DE 202' in line or 'DE 2024' in line or 'DE 2025' in line:
+                rubro_data['fecha'] = line.strip()
+        
+        # SON:
+        if line.startswith('SON:'):
+            rubro_data['texto_valor'] = line.strip()
+        
+        # ESPECIFICACIONES:
+        if line.startswith('ESPECIFICACIONES:'):
+            rubro_data['especificaciones'] = line.strip()
+        
+        # OBSERVACIONES:
+        if line.startswith('OBSERVACIONES:'):
+            rubro_data['observaciones'] = line.strip()
+    
+    # Extraer tablas
+    with timer.stage('extract_tables'):
+        tables = page.extract_tables()
+    timer.note('tables', sum(1 for table in tables if table))
+    
+    # Determinar sección actual
+    current_section = None
+    last_data_row = None  # Para capturar subtotales
+    
+    for table in tables:
+        if not table:
+            continue
+        
+        for row_idx, row in enumerate(table):
+            if not row or all(cell is None for cell in row):
+                continue
+            
+            row_text = ' '.join([str(cell) if cell else '' for cell in row])
+            first_cell = str(row[0]).upper() if row[0] else ''
+            
+            # Detectar cambio de sección
+            if 'EQUIPO' in first_cell and 'DESCRIPCION' in first_cell:
+                current_section = 'equipo'
+                continue
+            elif 'MANO DE OBRA' in first_cell and 'DESCRIPCION' in first_cell:
+                # Capturar subtotal M de la fila anterior (que tiene solo el valor)
+                if current_section == 'equipo' and last_data_row:
+                    for cell in last_data_row:
+                        if cell and _is_number(cell):
+                            rubro_data['subtotal_m'] = _parse_number(cell)
+                            break
+                current_section = 'mano_obra'
+                last_data_row = None
+                continue
+            elif 'MATERIALES' in first_cell and 'DESCRIPCION' in first_cell:
+                # Capturar subtotal N de la fila anterior
+                if current_section == 'mano_obra' and last_data_row:
+                    for cell in last_data_row:
+                        if cell and _is_number(cell):
+                            rubro_data['subtotal_n'] = _parse_number(cell)
+                            break
+                current_section = 'materiales'
+                last_data_row = None
+                continue
+            elif 'TRANSPORTE' in first_cell and 'DESCRIPCION' in first_cell:
+                # Capturar subtotal O de la fila anterior
+                if current_section == 'materiales' and last_data_row:
+                    for cell in last_data_row:
+                        if cell and _is_number(cell):
+                            rubro_data['subtotal_o'] = _parse_number(cell)
+                            break
+                current_section = 'transporte'
+                last_data_row = None
+                continue
+            
+            # Identificar filas de totales
+            if 'TOTAL COSTO DIRECTO' in row_text:
+                # Capturar subtotal P de la fila anterior
+                if current_section == 'transporte' and last_data_row:
+                    for cell in last_data_row:
+                        if cell and _is_number(cell):
+                            rubro_data['subtotal_p'] = _parse_number(cell)
+                            break
+                
+                for cell in row:
+                    if cell and _is_number(cell):
+                        val = _parse_number(cell)
+                        if val > 0:
+                            rubro_data['total_costo_directo'] = val
+                            break
+                current_section = None
             
-            # Agregar TODOS los strings al mapa (incluyendo NP/EP/ND)
-            if text not in string_map:
-                string_map[text] = len(shared_strings)
-                shared_strings.append(text)
-        
-        print(f"  Encontrados {len(shared_strings)} strings únicos")
-        
-        # Reemplazar inline strings con referencias a shared strings
-        # TODOS los strings se convierten a shared strings (PUNIS lo requiere)
-        def replace_inline(match):
-            full_match = match.group(0)
-            cell_ref = match.group(1)
-            attrs_before = match.group(2)
-            attrs_after = match.group(3)
-            text = match.group(4)
+            elif 'INDIRECTOS' in row_text:
+                # Extraer porcentaje del texto
+                match = re.search(r'(\d+\.?\d*)\s*%', row_text)
+                if match:
+                    rubro_data['indirectos_pct'] = float(match.group(1)) / 100
+                # Extraer valor numérico
+                for cell in row[1:]:
+                    if cell and _is_number(cell):
+                        rubro_data['indirectos_valor'] = _parse_number(cell)
+                        break
             
-            # Convertir a shared string
-            if text in string_map:
-                idx = string_map[text]
-                # Preservar atributos de estilo si existen
-                style_match = re.search(r's="(\d+)"', attrs_before + attrs_after)
-                if style_match:
-                    style = style_match.group(1)
-                    return f'<c r="{cell_ref}" s="{style}" t="s"><v>{idx}</v></c>'
-                else:
-                    return f'<c r="{cell_ref}" t="s"><v>{idx}</v></c>'
-            else:
-                # Por seguridad, mantener inline si no está en el mapa
-                return full_match
-        
-        new_content = re.sub(pattern, replace_inline, content)
-        
-        # Escribir el worksheet modificado
-        with open(sheet_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        
-        # Crear el archivo sharedStrings.xml
-        shared_strings_path = os.path.join(temp_dir, 'xl', 'sharedStrings.xml')
-        
-        ss_content = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
-        ss_content += '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
-        ss_content += f'count="{len(shared_strings)}" uniqueCount="{len(shared_strings)}">'
-        
-        for s in shared_strings:
-            # Escapar caracteres especiales
-            s_escaped = s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-            ss_content += f'<si><t>{s_escaped}</t></si>'
-        
-        ss_content += '</sst>'
-        
-        with open(shared_strings_path, 'w', encoding='utf-8') as f:
-            f.write(ss_content)
-        
-        # Actualizar [Content_Types].xml para incluir sharedStrings
-        content_types_path = os.path.join(temp_dir, '[Content_Types].xml')
-        with open(content_types_path, 'r', encoding='utf-8') as f:
-            ct_content = f.read()
-        
-        if 'sharedStrings' not in ct_content:
-            # Agregar el override para sharedStrings
-            insert_pos = ct_content.find('</Types>')
-            override = '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
-            ct_content = ct_content[:insert_pos] + override + ct_content[insert_pos:]
+            elif 'UTILIDAD' in row_text and 'COSTO' not in row_text:
+                match = re.search(r'(\d+\.?\d*)\s*%', row_text)
+                if match:
+                    rubro_data['utilidad_pct'] = float(match.group(1)) / 100
+                for cell in row[1:]:
+                    if cell and _is_number(cell):
+                        rubro_data['utilidad_valor'] = _parse_number(cell)
+                        break
             
-            with open(content_types_path, 'w', encoding='utf-8') as f:
-                f.write(ct_content)
-        
-        # Actualizar xl/_rels/workbook.xml.rels para incluir relación con sharedStrings
-        rels_path = os.path.join(temp_dir, 'xl', '_rels', 'workbook.xml.rels')
-        with open(rels_path, 'r', encoding='utf-8') as f:
-            rels_content = f.read()
-        
-        if 'sharedStrings' not in rels_content:
-            # Encontrar el próximo rId
-            rids = re.findall(r'rId(\d+)', rels_content)
-            next_rid = max(int(r) for r in rids) + 1 if rids else 1
+            elif 'COSTO TOTAL DEL RUBRO' in row_text:
+                for cell in row:
+                    if cell and _is_number(cell):
+                        rubro_data['costo_total'] = _parse_number(cell)
+                        break
             
-            insert_pos = rels_content.find('</Relationships>')
-            rel = f'<Relationship Id="rId{next_rid}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
-            rels_content = rels_content[:insert_pos] + rel + rels_content[insert_pos:]
+            elif 'VALOR UNITARIO' in row_text:
+                for cell in row:
+                    if cell and _is_number(cell):
+                        rubro_data['valor_unitario'] = _parse_number(cell)
+                        break
             
-            with open(rels_path, 'w', encoding='utf-8') as f:
-                f.write(rels_content)
-        
-        # Crear el nuevo XLSX
-        if os.path.exists(output_path):
-            os.remove(output_path)
-        
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as z:
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, temp_dir)
-                    z.write(file_path, arcname)
-                    
+            # Procesar filas de datos según la sección actual
+            elif current_section:
+                # Si primera celda es None, puede ser fila de subtotal
+                if row[0] is None:
+                    # Es probable que sea una fila de subtotal - guardar para siguiente sección
+                    last_data_row = row
+                elif 'SUBTOTAL' not in first_cell:
+                    row_data = extract_row_values(row, current_section)
+                    if row_data['descripcion'] and row_data['descripcion'].strip():
+                        if current_section == 'equipo':
+                            rubro_data['equipos'].append(row_data)
+                        elif current_section == 'mano_obra':
+                            rubro_data['mano_obra'].append(row_data)
+                        elif current_section == 'materiales':
+                            rubro_data['materiales'].append(row_data)
+                        elif current_section == 'transporte':
+                            rubro_data['transporte'].append(row_data)
+                    last_data_row = row
+    
+    # Buscar cantidad en el texto (después del detalle)
+    for line in lines:
+        if rubro_data['detalle'] and rubro_data['detalle'] in line:
+            continue
+        # Buscar números solos, incluyendo formato con coma (1,058.84)
+        numbers = re.findall(r'^\s*([\d,]+\.?\d*)\s*$', line)
+        for num in numbers:
+            # Convertir formato con coma a número
+            val_str = num.replace(',', '')
+            try:
+                val = float(val_str)
+                if val > 0 and val < 100000:
+                    if rubro_data['cantidad'] is None:
+                        rubro_data['cantidad'] = val
+            except:
+                pass
+    
+    # Buscar VAE total desde el texto (está al final de la línea TOTAL COSTO DIRECTO)
+    # Formato esperado: "TOTAL COSTO DIRECTO (M+N+O+P) 1.44 100.00% 97.08%"
+    for line in lines:
+        if 'TOTAL COSTO DIRECTO' in line.upper():
+            # Buscar todos los porcentajes en la línea
+            percentages = re.findall(r'(\d+\.?\d*)\s*%', line)
+            if len(percentages) >= 2:
+                # El último porcentaje es el VAE total (ej: 97.08%)
+                # El primero suele ser 100.00%
+                rubro_data['vae_total'] = float(percentages[-1]) / 100
+            elif len(percentages) == 1:
+                rubro_data['vae_total'] = float(percentages[0]) / 100
+            break
+    
+    # Si no se encontró VAE total, calcularlo sumando los VAE de elementos
+    if rubro_data['vae_total'] == 0:
+        vae_sum = 0
+        for items in [rubro_data['equipos'], rubro_data['mano_obra'], rubro_data['materiales'], rubro_data['transporte']]:
+            for item in items:
+                if item.get('vae_elemento'):
+                    vae_sum += item['vae_elemento']
+        if vae_sum > 0:
+            rubro_data['vae_total'] = vae_sum
+    
+    # Filas clasificadas por sección (diagnóstico por página)
+    timer.note('numero_rubro', rubro_data['numero_rubro'])
+    for section in ('equipos', 'mano_obra', 'materiales', 'transporte'):
+        timer.note(section, len(rubro_data[section]))
+    # Aciertos del memo de decodificación en esta página
+    for name, before, after in (('row_cache', row_cache, _decode_row_record.cache_info()),
+                                ('cell_cache', cell_cache, _decode_cell.cache_info())):
+        timer.note(f'{name}_hits', after.hits - before.hits)
+        timer.note(f'{name}_misses', after.misses - before.misses)
+    
+    return rubro_data, header
+
+
+def extract_row_values(row, section):
+    """
+    Extrae los valores de una fila según la sección.
+    
+    Las filas repetidas se resuelven con el memo LRU _decode_row_record y,
+    dentro de cada fila, las celdas repetidas con _decode_cell. El registro
+    memorizado es una tupla compartida; cada llamada devuelve un dict nuevo,
+    así que modificarlo no afecta al memo.
+    """
+    if not row:
+        return APUConverter._decode_row(row, section)
+    return dict(_decode_row_record(section, tuple(row)))
+
+
+def parse_document(pdf_path, timer=None):
+    """
+    Parsea un PDF completo sin estado compartido.
+    
+    Cada llamada abre su propio documento, así que un servicio puede convertir
+    varios PDFs a la vez en un pool de hilos o de procesos.
+    
+    Returns:
+        Tupla (header_info, rubros) con el encabezado de la primera página que
+        lo tenga y los rubros en orden de página
+    """
+    return assemble_document(parse_apu_page(page, timer) for page in _iter_pdf_pages(pdf_path))
+
+
+def _iter_pdf_pages(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            yield page
+            page.close()
+
+
+def assemble_document(page_results):
+    """
+    Arma el estado del documento a partir de los resultados de parse_apu_page
+    en orden de página.
+    
+    Returns:
+        Tupla (header_info, rubros)
+    """
+    header_info = {}
+    rubros = []
+    for rubro, header in page_results:
+        if not header_info and header:
+            header_info = header
+        if rubro and rubro['numero_rubro']:
+            rubros.append(rubro)
+    return header_info, rubros
+
+
+# Patrón de una celda inline string tal como la escribe openpyxl
+INLINE_STRING_PATTERN = r'<c r="([^"]*)"([^>]*)t="inlineStr"([^>]*)><is><t>([^<]*)</t></is></c>'
+
+
+def inline_to_shared_strings(content, shared_strings, string_map):
+    """
+    Reemplaza los inline strings de un fragmento de sheet1.xml por referencias
+    a shared strings.
+    
+    Los strings que no están en string_map se agregan al final de shared_strings
+    en orden de primera aparición, de modo que una tabla existente puede
+    extenderse sin alterar sus índices.
+    
+    Returns:
+        El fragmento XML con las celdas convertidas
+    """
+    def replace_inline(match):
+        cell_ref = match.group(1)
+        attrs_before = match.group(2)
+        attrs_after = match.group(3)
+        text = match.group(4)
+        
+        # Agregar TODOS los strings al mapa (incluyendo NP/EP/ND)
+        if text not in string_map:
+            string_map[text] = len(shared_strings)
+            shared_strings.append(text)
+        idx = string_map[text]
+        
+        # Preservar atributos de estilo si existen
+        style_match = re.search(r's="(\d+)"', attrs_before + attrs_after)
+        if style_match:
+            style = style_match.group(1)
+            return f'<c r="{cell_ref}" s="{style}" t="s"><v>{idx}</v></c>'
+        return f'<c r="{cell_ref}" t="s"><v>{idx}</v></c>'
+    
+    return re.sub(INLINE_STRING_PATTERN, replace_inline, content)
+
+
+def shared_strings_xml(shared_strings):
+    """Genera el contenido de xl/sharedStrings.xml para la tabla dada."""
+    ss_content = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    ss_content += '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    ss_content += f'count="{len(shared_strings)}" uniqueCount="{len(shared_strings)}">'
+    
+    for s in shared_strings:
+        # Escapar caracteres especiales
+        s_escaped = s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        ss_content += f'<si><t>{s_escaped}</t></si>'
+    
+    ss_content += '</sst>'
+    return ss_content
+
+
+SHARED_STRINGS_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml'
+SHARED_STRINGS_REL_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings'
+
+
+def shared_strings_package(source, target):
+    """
+    Convierte un XLSX de inline strings a shared strings de zip a zip, en memoria.
+    
+    Las partes se leen del zip de origen, se modifican en memoria (sheet1.xml,
+    sharedStrings.xml, [Content_Types].xml y las relaciones del libro) y se
+    escriben directamente en el zip de destino, sin carpeta temporal.
+    
+    Args:
+        source: Ruta o archivo binario con el XLSX de openpyxl
+        target: Ruta o archivo binario de salida (puede ser la misma ruta que source)
+    
+    Returns:
+        Cantidad de strings únicos de la tabla
+    """
+    with zipfile.ZipFile(source, 'r') as z:
+        parts = [(info.filename, z.read(info.filename)) for info in z.infolist()]
+    
+    # Recopilar todos los inline strings EN ORDEN DE APARICIÓN y reemplazarlos
+    # PUNIS REQUIERE que TODOS los strings sean shared strings, incluyendo NP/EP/ND
+    shared_strings = []
+    string_map = {}  # mapa de string -> índice
+    output = []
+    for name, data in parts:
+        if name == 'xl/sharedStrings.xml':
+            continue
+        if name == 'xl/worksheets/sheet1.xml':
+            content = inline_to_shared_strings(data.decode('utf-8'), shared_strings, string_map)
+            output.append((name, content.encode('utf-8')))
+            output.append(('xl/sharedStrings.xml', shared_strings_xml(shared_strings).encode('utf-8')))
+            continue
+        if name == '[Content_Types].xml':
+            ct_content = data.decode('utf-8')
+            if 'sharedStrings' not in ct_content:
+                # Agregar el override para sharedStrings
+                insert_pos = ct_content.find('</Types>')
+                override = f'<Override PartName="/xl/sharedStrings.xml" ContentType="{SHARED_STRINGS_CONTENT_TYPE}"/>'
+                data = (ct_content[:insert_pos] + override + ct_content[insert_pos:]).encode('utf-8')
+        elif name == 'xl/_rels/workbook.xml.rels':
+            rels_content = data.decode('utf-8')
+            if 'sharedStrings' not in rels_content:
+                # Encontrar el próximo rId
+                rids = re.findall(r'rId(\d+)', rels_content)
+                next_rid = max(int(r) for r in rids) + 1 if rids else 1
+                insert_pos = rels_content.find('</Relationships>')
+                rel = f'<Relationship Id="rId{next_rid}" Type="{SHARED_STRINGS_REL_TYPE}" Target="sharedStrings.xml"/>'
+                data = (rels_content[:insert_pos] + rel + rels_content[insert_pos:]).encode('utf-8')
+        output.append((name, data))
+    
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, data in output:
+            z.writestr(name, data)
+    return len(shared_strings)
+
+
+def convert_to_shared_strings(input_path, output_path=None):
+    """Convierte un archivo XLSX de inline strings a shared strings PRESERVANDO el orden."""
+    
+    if output_path is None:
+        output_path = input_path
+    
+    print(f"Post-procesando para compatibilidad PUNIS (Shared Strings)...")
+    
+    try:
+        count = shared_strings_package(input_path, output_path)
+        print(f"  Encontrados {count} strings únicos")
         print(f"  Archivo final guardado: {output_path}")
-        
     except Exception as e:
         print(f"Error en post-procesamiento: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        # Limpiar
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-            
+    
     return output_path
 
 
-def convert_pdf_to_excel(pdf_path, output_path=None):
+def convert_pdf_stream(pdf_file, output_file):
+    """
+    Convierte un PDF de APU leído de un archivo binario y escribe el Excel de
+    PUNIS en otro, sin archivos intermedios en disco.
+    
+    Args:
+        pdf_file: Archivo binario con el PDF (debe admitir seek, p. ej. BytesIO)
+        output_file: Archivo binario donde escribir el XLSX final
+    
+    Returns:
+        APUConverter con los rubros y el encabezado del documento
+    """
+    converter = APUConverter(pdf_file)
+    converter.extract_all_rubros()
+    workbook = io.BytesIO()
+    converter.write_workbook(workbook)
+    workbook.seek(0)
+    with converter.timer.stage('shared_strings'):
+        shared_strings_package(workbook, output_file)
+    return converter
+
+
+def convert_pdf_bytes(data):
+    """Convierte el contenido de un PDF de APU en el contenido del XLSX de PUNIS."""
+    output = io.BytesIO()
+    convert_pdf_stream(io.BytesIO(data), output)
+    return output.getvalue()
+
+
+def convert_pdf_to_excel(pdf_path, output_path=None, previous_xlsx=None, changed_rubros=None,
+                         pipeline=False, workers=None, timings_path=None,
+                         diagnostics_top=None, diagnostics_csv=None, track_memory=False,
+                         max_memory_mb=None, price_index=None, page_timeout=None, worker_memory_mb=None,
+                         failed_pages=None):
     """
     Función principal para convertir un PDF de APU a Excel.
     
     Args:
         pdf_path: Ruta al archivo PDF
         output_path: Ruta de salida para el Excel (opcional)
+        previous_xlsx: Excel convertido previamente del mismo proyecto (opcional).
+                       Si se indica, solo se reescriben los rubros que cambiaron
+                       y, sin output_path, el Excel previo se actualiza en sitio.
+        changed_rubros: Números de rubro a reescribir al actualizar (opcional,
+                        por defecto se detectan comparando con el Excel previo)
+        pipeline: Si es True, parsea las páginas en procesos paralelos y escribe
+                  cada rubro a medida que llega, en orden de página
+        workers: Número de procesos de parseo para pipeline (opcional)
+        timings_path: Ruta del JSON con los tiempos por etapa y por página (opcional)
+        diagnostics_top: Muestra las N páginas más lentas con sus conteos de objetos (opcional)
+        diagnostics_csv: Ruta del CSV con el diagnóstico de todas las páginas (opcional)
+        track_memory: Si es True, mide el pico de memoria por etapa con tracemalloc
+                      y muestreo de RSS (hace la conversión más lenta)
+        max_memory_mb: Si se indica, los rubros parseados que superen estos MB
+                       (serializados) se guardan en una base SQLite temporal y
+                       se leen de a lotes al escribir (ver rubro_store.py)
+        price_index: Base SQLite del índice de precios donde agregar los items
+                     del PDF (opcional, ver price_index.py)
+        page_timeout: Si se indica, cada página se parsea en un proceso
+                      supervisado con este límite en segundos; las páginas que
+                      fallan dos veces se omiten (ver supervised_parsing.py); se
+                      ignora con pipeline o previous_xlsx, y max_memory_mb no
+                      se aplica a los rubros parseados así
+        worker_memory_mb: Límite de memoria de cada proceso supervisado (opcional,
+                          también activa el parseo supervisado)
+        failed_pages: Lista donde se agregan las páginas omitidas por el parseo
+                      supervisado, como dicts {'pagina', 'error'} (opcional)
     
     Returns:
         Ruta del archivo Excel generado
@@ -1256,6 +1529,9 @@ def convert_pdf_to_excel(pdf_path, output_path=None):
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"No se encontró el archivo: {pdf_path}")
     
+    if output_path is None and previous_xlsx:
+        output_path = previous_xlsx
+    
     if output_path is None:
         from datetime import datetime
         timestamp = datetime.now().strftime("%H%M%S")
@@ -1264,20 +1540,173 @@ def convert_pdf_to_excel(pdf_path, output_path=None):
     
     print(f"Iniciando conversión de: {pdf_path}")
     
-    converter = APUConverter(pdf_path)
-    converter.extract_all_rubros()
-    converter.create_excel(output_path)
+    memory = None
+    if track_memory:
+        from memory_tracking import MemoryTracker
+        memory = MemoryTracker()
+        memory.start()
+    
+    if pipeline and not previous_xlsx:
+        from conversion_pipeline import convert_pipelined
+        converter = convert_pipelined(pdf_path, output_path, workers=workers, memory=memory,
+                                      max_memory_mb=max_memory_mb)
+    elif (page_timeout or worker_memory_mb) and not previous_xlsx:
+        from supervised_parsing import PAGE_TIMEOUT, parse_supervised
+        converter = APUConverter(pdf_path)
+        converter.timer.memory = memory
+        converter.header_info, converter.rubros, converter.failed_pages = parse_supervised(
+            pdf_path, workers, page_timeout or PAGE_TIMEOUT, worker_memory_mb, timer=converter.timer)
+        for failure in converter.failed_pages:
+            print(f"  ✗ Página {failure['pagina']} omitida: {failure['error']}")
+        converter.create_excel(output_path)
+        with converter.timer.stage('shared_strings'):
+            convert_to_shared_strings(output_path)
+    else:
+        converter = APUConverter(pdf_path)
+        converter.timer.memory = memory
+        if max_memory_mb is not None:
+            from rubro_store import MB, RubroStore
+            converter.rubros = RubroStore(int(max_memory_mb * MB))
+        converter.extract_all_rubros(diagnostics=bool(diagnostics_top or diagnostics_csv))
+        
+        updated = False
+        if previous_xlsx:
+            from update_excel import update_excel_in_place
+            print(f"Actualizando rubros modificados sobre: {previous_xlsx}")
+            try:
+                with converter.timer.stage('update_in_place'):
+                    update_excel_in_place(previous_xlsx, converter, output_path, changed=changed_rubros)
+                updated = True
+            except ValueError as e:
+                # Rubros agregados/eliminados o libro con otra estructura: regenerar todo
+                print(f"  No se puede actualizar en sitio ({e}); se regenera el libro completo.")
+        
+        if not updated:
+            converter.create_excel(output_path)
+            
+            # Post-procesar para asegurar compatibilidad con PUNIS (Shared Strings)
+            # La versión mejorada ahora preserva el orden y contenido correcto
+            with converter.timer.stage('shared_strings'):
+                convert_to_shared_strings(output_path)
+    
+    if price_index:
+        from price_index import connect, ingest_rubros
+        with converter.timer.stage('price_index'):
+            db = connect(price_index)
+            count = ingest_rubros(db, converter.rubros, converter.header_info, pdf_path)
+            db.close()
+        print(f"  {count} items agregados al índice de precios: {price_index}")
     
-    # Post-procesar para asegurar compatibilidad con PUNIS (Shared Strings)
-    # La versión mejorada ahora preserva el orden y contenido correcto
-    convert_to_shared_strings(output_path)
+    if failed_pages is not None:
+        failed_pages.extend(converter.failed_pages)
+    
+    if max_memory_mb is not None:
+        from rubro_store import RubroStore
+        # El parseo supervisado devuelve una lista ya en memoria: no hay nada que volcar a disco
+        if isinstance(converter.rubros, RubroStore):
+            if converter.rubros.spilled:
+                print(f"  {len(converter.rubros)} rubros guardados en disco (límite {max_memory_mb} MB).")
+            converter.rubros.close()
+    
+    if memory is not None:
+        memory.stop()
+        print(memory.summary())
+    
+    if diagnostics_top or diagnostics_csv:
+        from page_diagnostics import format_slowest_pages, write_pages_csv
+        print(format_slowest_pages(converter.timer.pages, diagnostics_top or 10))
+        if diagnostics_csv:
+            write_pages_csv(converter.timer.pages, diagnostics_csv)
+            print(f"  Diagnóstico por página guardado en: {diagnostics_csv}")
+    
+    if timings_path:
+        from page_diagnostics import format_decode_cache
+        converter.timer.write_json(timings_path, pdf=pdf_path, output=output_path,
+                                   failed_pages=converter.failed_pages)
+        print(converter.timer.summary())
+        print(f"  {format_decode_cache(converter.timer.pages)}")
+        print(f"  Tiempos guardados en: {timings_path}")
     
     return output_path
 
 
 def main():
     """Función principal del script."""
-    if len(sys.argv) < 2:
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Convierte PDFs de APU con VAE al formato Excel de PUNIS.")
+    parser.add_argument('pdf', nargs='?', help="Archivo PDF de entrada")
+    parser.add_argument('output', nargs='?', help="Archivo Excel de salida (opcional)")
+    parser.add_argument('--actualizar', metavar='XLSX_PREVIO',
+                        help="Actualiza un Excel convertido previamente reescribiendo solo los rubros modificados")
+    parser.add_argument('--rubros', type=lambda v: {int(n) for n in v.split(',')},
+                        help="Con --actualizar: números de rubro a reescribir, separados por coma")
+    parser.add_argument('--tuberia', action='store_true',
+                        help="Parsea páginas en procesos paralelos mientras se escribe el Excel")
+    parser.add_argument('--procesos', type=int, metavar='N',
+                        help="Con --tuberia o --timeout-pagina: número de procesos de parseo "
+                             "(por defecto, núcleos disponibles)")
+    parser.add_argument('--timeout-pagina', type=float, metavar='SEG',
+                        help="Parsea cada página en un proceso supervisado con este límite de tiempo; "
+                             "las páginas que fallan dos veces se omiten")
+    parser.add_argument('--memoria-proceso', type=float, metavar='MB',
+                        help="Límite de memoria de cada proceso supervisado (activa el parseo supervisado)")
+    parser.add_argument('--tiempos', nargs='?', const='', metavar='JSON',
+                        help="Guarda los tiempos por etapa y por página (por defecto <salida>.tiempos.json)")
+    parser.add_argument('--diagnostico', nargs='?', type=int, const=10, metavar='N',
+                        help="Muestra las N páginas más lentas con sus conteos de objetos (por defecto 10)")
+    parser.add_argument('--diagnostico-csv', metavar='CSV',
+                        help="Guarda el diagnóstico de todas las páginas en un CSV")
+    parser.add_argument('--memoria', action='store_true',
+                        help="Mide el pico de memoria por etapa (tracemalloc + RSS); más lento")
+    parser.add_argument('--memoria-max', type=float, metavar='MB',
+                        help="Guarda en disco (SQLite temporal) los rubros parseados que excedan estos MB")
+    parser.add_argument('--indice-precios', metavar='SQLITE',
+                        help="Agrega los items del PDF al índice de precios entre proyectos")
+    parser.add_argument('--comparar-con', metavar='XLSX_REFERENCIA',
+                        help="Compara el resultado contra un libro de referencia y termina con código 1 si difiere")
+    parser.add_argument('--max-diferencias', type=int, default=50, metavar='N',
+                        help="Con --comparar-con: se detiene en las primeras N diferencias (por defecto 50)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Perfila toda la ejecución con cProfile (<salida>.prof) y muestra las funciones más costosas")
+    args = parser.parse_args()
+    
+    if args.timeout_pagina is not None or args.memoria_proceso is not None:
+        # El parseo supervisado tiene su propio camino: estas opciones no se aplicarían
+        for flag, value in (('--timeout-pagina', args.timeout_pagina), ('--memoria-proceso', args.memoria_proceso)):
+            if value is not None and value <= 0:
+                parser.error(f"{flag} debe ser mayor que 0")
+        unsupported = [flag for flag, value in (('--tuberia', args.tuberia), ('--actualizar', args.actualizar),
+                                                ('--memoria-max', args.memoria_max is not None)) if value]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} no se puede usar con --timeout-pagina o --memoria-proceso")
+    
+    if '-' in (args.pdf, args.output):
+        # Conversión en memoria entre stdin/stdout y archivos: los mensajes van a stderr
+        # para no mezclarse con el XLSX
+        unsupported = [flag for flag, value in (('--actualizar', args.actualizar), ('--tuberia', args.tuberia),
+                                                ('--tiempos', args.tiempos is not None),
+                                                ('--timeout-pagina', args.timeout_pagina),
+                                                ('--memoria-proceso', args.memoria_proceso),
+                                                ('--diagnostico', args.diagnostico is not None),
+                                                ('--diagnostico-csv', args.diagnostico_csv),
+                                                ('--memoria', args.memoria), ('--memoria-max', args.memoria_max is not None),
+                                                ('--indice-precios', args.indice_precios),
+                                                ('--comparar-con', args.comparar_con),
+                                                ('--profile', args.profile)) if value]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} no se puede usar con '-' como entrada o salida")
+        data = sys.stdin.buffer.read() if args.pdf == '-' else Path(args.pdf).read_bytes()
+        with contextlib.redirect_stdout(sys.stderr):
+            xlsx = convert_pdf_bytes(data)
+        if args.output in (None, '-'):
+            sys.stdout.buffer.write(xlsx)
+            sys.stdout.buffer.flush()
+        else:
+            Path(args.output).write_bytes(xlsx)
+        return
+    
+    if args.pdf is None:
         # Si no se proporciona argumento, buscar PDFs en el directorio actual
         current_dir = os.path.dirname(os.path.abspath(__file__))
         pdf_files = list(Path(current_dir).glob("*.pdf"))
@@ -1294,18 +1723,63 @@ def main():
         # Convertir el primer PDF encontrado
         pdf_path = str(pdf_files[0])
     else:
-        pdf_path = sys.argv[1]
+        pdf_path = args.pdf
     
-    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+    output_path = args.output
+    if output_path is None and args.actualizar:
+        output_path = args.actualizar
+    if output_path is None and (args.tiempos == '' or args.profile):
+        # Los archivos acompañantes necesitan conocer la ruta de salida de antemano
+        from datetime import datetime
+        timestamp = datetime.now().strftime("%H%M%S")
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        output_path = os.path.join(os.path.dirname(pdf_path), f"{base_name}_CONVERTIDO_v({timestamp}).xlsx")
+    timings_path = args.tiempos
+    if timings_path == '':
+        timings_path = os.path.splitext(output_path)[0] + '.tiempos.json'
+    
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
     
+    failed_pages = []
     try:
-        result = convert_pdf_to_excel(pdf_path, output_path)
-        print(f"\n✓ Conversión completada exitosamente!")
+        result = convert_pdf_to_excel(pdf_path, output_path, previous_xlsx=args.actualizar,
+                                      changed_rubros=args.rubros, pipeline=args.tuberia,
+                                      workers=args.procesos, timings_path=timings_path,
+                                      diagnostics_top=args.diagnostico, diagnostics_csv=args.diagnostico_csv,
+                                      track_memory=args.memoria, max_memory_mb=args.memoria_max,
+                                      price_index=args.indice_precios, page_timeout=args.timeout_pagina,
+                                      worker_memory_mb=args.memoria_proceso, failed_pages=failed_pages)
+        if failed_pages:
+            pages = ', '.join(str(failure['pagina']) for failure in failed_pages)
+            print(f"\n⚠ Conversión completada con {len(failed_pages)} páginas omitidas: {pages}")
+        else:
+            print(f"\n✓ Conversión completada exitosamente!")
         print(f"  Archivo generado: {result}")
+        if args.comparar_con:
+            from golden_compare import compare_workbooks, format_differences
+            differences = compare_workbooks(args.comparar_con, result, args.max_diferencias)
+            print(f"\nComparación con {os.path.basename(args.comparar_con)}:")
+            print(format_differences(differences, len(differences) >= args.max_diferencias))
+            if differences:
+                sys.exit(1)
+        if failed_pages:
+            sys.exit(2)
     except Exception as e:
         print(f"\n✗ Error durante la conversión: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if profiler is not None:
+            import pstats
+            profiler.disable()
+            profile_path = os.path.splitext(output_path)[0] + '.prof'
+            profiler.dump_stats(profile_path)
+            print(f"\nPerfil guardado en: {profile_path}")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(30)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+"""
+Índice de precios entre proyectos en una base SQLite local.
+
+Cada PDF convertido agrega sus items (equipo, mano de obra, materiales y
+transporte) a la base, con índices por CPC, categoría y descripción
+normalizada y una tabla FTS5 sobre las descripciones. Consultar el historial
+de precios de un material en todos los proyectos es entonces una consulta
+indexada en lugar de abrir decenas de xlsx.
+
+Volver a ingresar el mismo PDF (mismo contenido) reemplaza sus items.
+
+Uso:
+    python price_index.py ingresar precios.sqlite APU_CON_VAE.pdf [OTRO.pdf ...]
+    python price_index.py historial precios.sqlite --cpc 541210012
+    python price_index.py historial precios.sqlite --descripcion "Cemento Portland"
+    python price_index.py buscar precios.sqlite "piola albañil"
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import unicodedata
+from datetime import datetime
+
+
+SECTIONS = ('equipos', 'mano_obra', 'materiales', 'transporte')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proyectos (
+    id INTEGER PRIMARY KEY,
+    sha1 TEXT UNIQUE NOT NULL,
+    pdf TEXT NOT NULL,
+    proyecto TEXT,
+    ubicacion TEXT,
+    profesional TEXT,
+    fecha TEXT,
+    ingresado TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    proyecto_id INTEGER NOT NULL REFERENCES proyectos(id),
+    numero_rubro INTEGER,
+    detalle_rubro TEXT,
+    seccion TEXT NOT NULL,
+    descripcion TEXT,
+    descripcion_norm TEXT,
+    cpc TEXT,
+    categoria TEXT,
+    unidad TEXT,
+    cantidad REAL,
+    tarifa REAL,
+    costo_hora REAL,
+    rendimiento REAL,
+    costo REAL,
+    np_ep_nd TEXT,
+    vae_pct REAL
+);
+CREATE INDEX IF NOT EXISTS items_cpc ON items (cpc);
+CREATE INDEX IF NOT EXISTS items_categoria ON items (categoria);
+CREATE INDEX IF NOT EXISTS items_descripcion_norm ON items (descripcion_norm);
+CREATE INDEX IF NOT EXISTS items_proyecto ON items (proyecto_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5 (
+    descripcion, content='items', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+ITEM_COLUMNS = ('descripcion', 'cpc', 'categoria', 'unidad', 'cantidad', 'tarifa', 'costo_hora',
+                'rendimiento', 'costo', 'np_ep_nd', 'vae_pct')
+
+
+def normalize_description(text):
+    """Descripción sin tildes, en minúsculas y con espacios y puntuación colapsados."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return re.sub(r'[\s.,;:]+', ' ', text).strip()
+
+
+def file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def connect(db_path):
+    """Abre (o crea) la base del índice de precios."""
+    db = sqlite3.connect(db_path)
+    db.row_factory = sqlite3.Row
+    db.executescript(SCHEMA)
+    return db
+
+
+def _delete_project(db, project_id):
+    # La tabla FTS es de contenido externo: hay que retirar las filas explícitamente
+    db.execute("INSERT INTO items_fts (items_fts, rowid, descripcion) "
+               "SELECT 'delete', id, descripcion FROM items WHERE proyecto_id = ?", (project_id,))
+    db.execute("DELETE FROM items WHERE proyecto_id = ?", (project_id,))
+    db.execute("DELETE FROM proyectos WHERE id = ?", (project_id,))
+
+
+def ingest_rubros(db, rubros, header_info, pdf_path, sha1=None):
+    """
+    Agrega los items de los rubros de un PDF al índice.
+    
+    Args:
+        db: Conexión de connect()
+        rubros: Iterable de rubros parseados
+        header_info: Encabezado del documento (profesional, proyecto, ubicación)
+        pdf_path: PDF de origen (identifica al proyecto por su contenido)
+        sha1: Hash del PDF, si ya se calculó
+    
+    Returns:
+        Cantidad de items ingresados
+    """
+    sha1 = sha1 or file_sha1(pdf_path)
+    with db:
+        previous = db.execute("SELECT id FROM proyectos WHERE sha1 = ?", (sha1,)).fetchone()
+        if previous:
+            _delete_project(db, previous['id'])
+        project_id = db.execute(
+            "INSERT INTO proyectos (sha1, pdf, proyecto, ubicacion, profesional, ingresado) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (sha1, os.path.basename(pdf_path), header_info.get('proyecto'), header_info.get('ubicacion'),
+             header_info.get('profesional'), datetime.now().isoformat(timespec='seconds'))).lastrowid
+        
+        fecha = None
+        rows = []
+        for rubro in rubros:
+            fecha = fecha or rubro.get('fecha')
+            for section in SECTIONS:
+                for item in rubro.get(section) or []:
+                    rows.append((project_id, rubro['numero_rubro'], rubro.get('detalle'), section,
+                                 normalize_description(item.get('descripcion')),
+                                 *(item.get(column) for column in ITEM_COLUMNS)))
+        db.executemany(
+            "INSERT INTO items (proyecto_id, numero_rubro, detalle_rubro, seccion, descripcion_norm, "
+            f"{', '.join(ITEM_COLUMNS)}) VALUES ({', '.join('?' * (5 + len(ITEM_COLUMNS)))})", rows)
+        db.execute("INSERT INTO items_fts (rowid, descripcion) "
+                   "SELECT id, descripcion FROM items WHERE proyecto_id = ?", (project_id,))
+        db.execute("UPDATE proyectos SET fecha = ? WHERE id = ?", (fecha, project_id))
+    return len(rows)
+
+
+def ingest_pdf(db, pdf_path):
+    """Parsea un PDF de APU (sin generar el Excel) y agrega sus items al índice."""
+    from pdf_to_excel_apu import APUConverter
+    
+    converter = APUConverter(pdf_path)
+    rubros = list(converter.iter_rubros())
+    return ingest_rubros(db, rubros, converter.header_info, pdf_path)
+
+
+_HISTORY_SELECT = """
+    SELECT p.pdf, p.proyecto, p.fecha, i.numero_rubro, i.seccion, i.descripcion, i.cpc,
+           i.categoria, i.unidad, i.tarifa, i.costo_hora, i.cantidad, i.costo
+    FROM items i JOIN proyectos p ON p.id = i.proyecto_id
+"""
+
+
+def price_history(db, cpc=None, descripcion=None, categoria=None):
+    """
+    Precios de un item en todos los proyectos, del ingreso más antiguo al más reciente.
+    
+    Se filtra por CPC, descripción (comparada normalizada) y/o categoría; todas
+    las condiciones usan índices.
+    """
+    conditions, params = [], []
+    if cpc:
+        conditions.append("i.cpc = ?")
+        params.append(cpc)
+    if descripcion:
+        conditions.append("i.descripcion_norm = ?")
+        params.append(normalize_description(descripcion))
+    if categoria:
+        conditions.append("i.categoria = ?")
+        params.append(categoria)
+    if not conditions:
+        raise ValueError("Indique al menos CPC, descripción o categoría")
+    query = _HISTORY_SELECT + " WHERE " + " AND ".join(conditions) + " ORDER BY p.ingresado, p.id, i.numero_rubro"
+    return db.execute(query, params).fetchall()
+
+
+def search(db, text, limit=50):
+    """Búsqueda de texto completo en las descripciones (sin distinguir tildes)."""
+    terms = ' '.join(f'"{term}"' for term in re.findall(r'\w+', text))
+    if not terms:
+        return []
+    query = (_HISTORY_SELECT + " JOIN items_fts f ON f.rowid = i.id "
+             "WHERE items_fts MATCH ? ORDER BY f.rank LIMIT ?")
+    return db.execute(query, (terms, limit)).fetchall()
+
+
+def format_rows(rows):
+    """Tabla legible de resultados de price_history o search."""
+    if not rows:
+        return "Sin resultados."
+    lines = [f"  {'PDF':<28} {'Rubro':>5} {'Sección':<11} {'CPC':<12} {'Categoría':<9} "
+             f"{'Tarifa':>10} {'Costo/h':>10}  Descripción"]
+    for row in rows:
+        tarifa = f"{row['tarifa']:.4f}" if row['tarifa'] is not None else '-'
+        costo_hora = f"{row['costo_hora']:.4f}" if row['costo_hora'] is not None else '-'
+        lines.append(f"  {row['pdf'][:28]:<28} {row['numero_rubro']:>5} {row['seccion']:<11} "
+                     f"{row['cpc'] or '':<12} {row['categoria'] or '':<9} {tarifa:>10} {costo_hora:>10}  "
+                     f"{row['descripcion']}")
+    return '\n'.join(lines)
+
+
+def main():
+    import argparse
+    import time
+    
+    parser = argparse.ArgumentParser(description="Índice de precios de APU entre proyectos (SQLite).")
+    commands = parser.add_subparsers(dest='comando', required=True)
+    
+    ingest = commands.add_parser('ingresar', help="Agrega los items de uno o más PDFs")
+    ingest.add_argument('db', help="Base SQLite del índice")
+    ingest.add_argument('pdfs', nargs='+', help="PDFs de APU")
+    
+    history = commands.add_parser('historial', help="Historial de precios de un item")
+    history.add_argument('db')
+    history.add_argument('--cpc')
+    history.add_argument('--descripcion')
+    history.add_argument('--categoria')
+    
+    find = commands.add_parser('buscar', help="Búsqueda de texto en las descripciones")
+    find.add_argument('db')
+    find.add_argument('texto')
+    find.add_argument('--limite', type=int, default=50)
+    args = parser.parse_args()
+    
+    db = connect(args.db)
+    if args.comando == 'ingresar':
+        for pdf_path in args.pdfs:
+            count = ingest_pdf(db, pdf_path)
+            print(f"\n  {pdf_path}: {count} items ingresados")
+        return
+    
+    start = time.perf_counter()
+    if args.comando == 'historial':
+        try:
+            rows = price_history(db, args.cpc, args.descripcion, args.categoria)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        rows = search(db, args.texto, args.limite)
+    elapsed = time.perf_counter() - start
+    print(format_rows(rows))
+    print(f"  {len(rows)} filas en {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Lectura en streaming de libros PUNIS ya convertidos.
+
+Recorre la hoja con iterparse (XlsxWorkbook.iter_row_values), fila por fila,
+reconoce el bloque que escribe APUConverter._write_rubro (filas RUBRO/UNIDAD y
+DETALLE, encabezados de sección, SUBTOTAL M/N/O/P y bloque de totales) y
+reconstruye los mismos rubros e items que produce el parser de PDFs. Solo se
+mantienen en memoria los shared strings y el rubro en curso, así que sirve
+para libros de cualquier tamaño.
+
+Uso:
+    python punis_reader.py ANALISIS_PU_VAE_PUNIS_SS_HH__LAGO_SAN_PEDRO.xlsx
+    python punis_reader.py APU_PUNIS_V8.xlsx --json rubros.json
+"""
+
+import re
+
+from xlsx_inspect import XlsxWorkbook
+
+
+RUBRO_PATTERN = re.compile(r'RUBRO\s*:\s*(\d+)')
+DETALLE_PATTERN = re.compile(r'DETALLE\s*:\s*(.*)', re.DOTALL)
+UNIDAD_PATTERN = re.compile(r'UNIDAD:\s*(\S*)')
+HOJA_PATTERN = re.compile(r'HOJA\s+(\d+)\s+DE\s+(\d+)')
+
+# Primera línea del encabezado de cada sección -> clave del rubro
+SECTION_TITLES = {'EQUIPO': 'equipos', 'MANO DE OBRA': 'mano_obra',
+                  'MATERIALES': 'materiales', 'TRANSPORTE': 'transporte'}
+SUBTOTALS = {'SUBTOTAL M': 'subtotal_m', 'SUBTOTAL N': 'subtotal_n',
+             'SUBTOTAL O': 'subtotal_o', 'SUBTOTAL P': 'subtotal_p'}
+
+# Columnas de los items tal como las escribe _write_rubro
+_COMMON_COLUMNS = {'G': 'costo', 'H': 'peso_relativo', 'I': 'cpc', 'J': 'np_ep_nd',
+                   'K': 'vae_pct', 'L': 'vae_elemento'}
+_HOURLY_COLUMNS = {'A': 'descripcion', 'C': 'cantidad', 'D': 'tarifa', 'E': 'costo_hora',
+                   'F': 'rendimiento', **_COMMON_COLUMNS}
+_UNIT_COLUMNS = {'A': 'descripcion', 'D': 'unidad', 'E': 'cantidad', 'F': 'tarifa', **_COMMON_COLUMNS}
+ITEM_COLUMNS = {
+    'equipos': _HOURLY_COLUMNS,
+    'mano_obra': {**_HOURLY_COLUMNS, 'B': 'categoria'},
+    'materiales': _UNIT_COLUMNS,
+    'transporte': _UNIT_COLUMNS,
+}
+
+# Filas del bloque de totales: texto de la columna D -> {columna: campo}
+TOTAL_ROWS = {
+    'TOTAL COSTO DIRECTO (M+N+O+P)': {'G': 'total_costo_directo', 'L': 'vae_total'},
+    'INDIRECTOS (%)': {'F': 'indirectos_pct', 'G': 'indirectos_valor'},
+    'UTILIDAD (%)': {'F': 'utilidad_pct', 'G': 'utilidad_valor'},
+    'COSTO TOTAL DEL RUBRO': {'G': 'costo_total'},
+    'VALOR UNITARIO': {'G': 'valor_unitario'},
+}
+
+# Fila que escribe _write_rubro cuando el rubro no tiene equipos
+HERRAMIENTA_MENOR = 'Herramienta Menor 5% de M.O.'
+
+
+def _new_item():
+    """Item con los mismos valores por defecto que APUConverter._decode_row."""
+    return {
+        'descripcion': '', 'categoria': '', 'cantidad': None, 'tarifa': None, 'costo_hora': None,
+        'rendimiento': None, 'costo': None, 'peso_relativo': None, 'cpc': '', 'np_ep_nd': '',
+        'vae_pct': None, 'vae_elemento': None, 'unidad': '',
+    }
+
+
+def _new_rubro(numero_rubro):
+    """Rubro con los mismos valores por defecto que parse_apu_page."""
+    return {
+        'numero_rubro': numero_rubro, 'unidad': None, 'detalle': None, 'cantidad': None, 'hoja': None,
+        'equipos': [], 'mano_obra': [], 'materiales': [], 'transporte': [],
+        'subtotal_m': 0, 'subtotal_n': 0, 'subtotal_o': 0, 'subtotal_p': 0,
+        'total_costo_directo': 0, 'vae_total': 0, 'indirectos_pct': 0, 'indirectos_valor': 0,
+        'utilidad_pct': 0, 'utilidad_valor': 0, 'costo_total': 0, 'valor_unitario': 0,
+        'texto_valor': '', 'fecha': '',
+    }
+
+
+TEXT_FIELDS = {'descripcion', 'cpc', 'np_ep_nd', 'unidad', 'categoria'}
+
+
+def _as_text(value):
+    # Un CPC guardado como número vuelve como float: 541210012.0 -> '541210012'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _read_item(cells, section):
+    item = _new_item()
+    for column, field in ITEM_COLUMNS[section].items():
+        value = cells.get(column)
+        if value is not None:
+            item[field] = _as_text(value) if field in TEXT_FIELDS else value
+    if section == 'equipos' and item['descripcion'].startswith('Herramienta Menor') and \
+            not any(item[field] for field in ('cantidad', 'tarifa', 'costo_hora', 'rendimiento')):
+        # _write_rubro escribe 0 en lugar de las celdas vacías de la herramienta menor
+        for field in ('cantidad', 'tarifa', 'costo_hora', 'rendimiento'):
+            item[field] = None
+    return item
+
+
+def iter_workbook_rubros(source, header_info=None):
+    """
+    Reconstruye los rubros de un libro PUNIS en el orden del libro.
+    
+    Args:
+        source: Ruta o archivo binario del XLSX
+        header_info: Dict opcional donde se completa el encabezado del documento
+                     (profesional, proyecto, ubicación) del primer bloque
+    
+    Yields:
+        Rubros con la estructura de parse_apu_page
+    """
+    with XlsxWorkbook(source) as book:
+        yield from rubros_from_rows(book.iter_row_values(), header_info)
+
+
+def rubros_from_rows(rows, header_info=None):
+    """
+    Reconoce los bloques de rubro en filas (número, {columna: valor}) como las
+    de XlsxWorkbook.iter_row_values y arma un rubro por bloque.
+    
+    La fila con ESPECIFICACIONES u OBSERVACIONES tiene lugar para uno solo de
+    los dos textos (el que escribe _write_rubro), así que un rubro del PDF que
+    tenía ambos vuelve solo con ESPECIFICACIONES.
+    """
+    rubro = None
+    section = None
+    preamble = []  # Textos de la columna A antes de la fila RUBRO del bloque
+    hoja = None
+    state = 'preamble'
+    
+    for _, cells in rows:
+        a = cells.get('A')
+        text_a = a if isinstance(a, str) else ''
+        
+        match = RUBRO_PATTERN.match(text_a)
+        if match:
+            if rubro is not None:
+                yield rubro
+            rubro = _new_rubro(int(match.group(1)))
+            unidad = UNIDAD_PATTERN.match(str(cells.get('G', '')))
+            rubro['unidad'] = unidad.group(1) if unidad else None
+            if hoja:
+                rubro['hoja'] = f"HOJA {hoja.group(1)} DE {hoja.group(2)}"
+            if header_info is not None and not header_info and len(preamble) >= 2:
+                header_info['profesional'] = preamble[0].rstrip('\n')
+                proyecto, _, ubicacion = preamble[1].partition('\n')
+                header_info['proyecto'] = proyecto
+                header_info['ubicacion'] = ubicacion
+            preamble = []
+            hoja = None
+            section = None
+            state = 'detalle'
+            continue
+        
+        if state == 'preamble' or rubro is None:
+            if text_a.strip().startswith('ANALISIS DE PRECIOS'):
+                hoja = HOJA_PATTERN.match(str(cells.get('G', '')))
+            elif text_a:
+                preamble.append(text_a)
+            continue
+        
+        if state == 'detalle':
+            match = DETALLE_PATTERN.match(text_a)
+            if match:
+                rubro['detalle'] = match.group(1).strip()
+                cantidad = cells.get('G')
+                rubro['cantidad'] = cantidad if isinstance(cantidad, (int, float)) else None
+                state = 'pagina'
+            continue
+        
+        if state == 'pagina':
+            # ESPECIFICACIONES/OBSERVACIONES (si hay) y número de página
+            if text_a.startswith('ESPECIFICACIONES'):
+                rubro['especificaciones'] = text_a
+            elif text_a.startswith('OBSERVACIONES'):
+                rubro['observaciones'] = text_a
+            pagina = cells.get('F')
+            if isinstance(pagina, float):
+                rubro['numero_pagina'] = int(pagina)
+            state = 'items'
+            continue
+        
+        if state == 'items':
+            title = text_a.split('\n', 1)[0]
+            if title in SECTION_TITLES and text_a.endswith('DESCRIPCION'):
+                section = SECTION_TITLES[title]
+            elif text_a in SUBTOTALS:
+                value = cells.get('G')
+                rubro[SUBTOTALS[text_a]] = value if value is not None else 0
+                section = None
+            elif section and text_a:
+                if not (section == 'equipos' and text_a == HERRAMIENTA_MENOR and 'C' not in cells):
+                    rubro[section].append(_read_item(cells, section))
+            elif cells.get('D') in TOTAL_ROWS:
+                state = 'totales'
+            if state != 'totales':
+                continue
+        
+        if state == 'totales':
+            label = cells.get('D')
+            if label in TOTAL_ROWS:
+                for column, field in TOTAL_ROWS[label].items():
+                    value = cells.get(column)
+                    if value is not None:
+                        rubro[field] = value
+            elif text_a == 'ESTOS PRECIOS NO INCLUYEN IVA':
+                state = 'fecha'
+            elif text_a:
+                rubro['texto_valor'] = text_a
+            continue
+        
+        if state == 'fecha' and text_a:
+            rubro['fecha'] = text_a
+            yield rubro
+            rubro = None
+            state = 'preamble'
+    
+    if rubro is not None:
+        yield rubro
+
+
+def read_workbook(source):
+    """
+    Lee un libro PUNIS completo.
+    
+    Returns:
+        Tupla (header_info, rubros), como parse_document
+    """
+    header_info = {}
+    rubros = list(iter_workbook_rubros(source, header_info))
+    return header_info, rubros
+
+
+def main():
+    import argparse
+    import json
+    import time
+    
+    parser = argparse.ArgumentParser(description="Lee un libro PUNIS convertido y reconstruye sus rubros.")
+    parser.add_argument('xlsx', help="Libro PUNIS (.xlsx)")
+    parser.add_argument('--json', metavar='JSON', help="Guarda el encabezado y los rubros en un JSON")
+    args = parser.parse_args()
+    
+    header_info = {}
+    row_count = 0
+    
+    def counted(rows):
+        nonlocal row_count
+        for row in rows:
+            row_count += 1
+            yield row
+    
+    start = time.perf_counter()
+    with XlsxWorkbook(args.xlsx) as book:
+        rubros = list(rubros_from_rows(counted(book.iter_row_values()), header_info))
+    elapsed = time.perf_counter() - start
+    items = sum(len(rubro[section]) for rubro in rubros for section in ITEM_COLUMNS)
+    print(f"  {len(rubros)} rubros, {items} items, {row_count} filas en {elapsed:.2f} s "
+          f"({row_count / elapsed if elapsed else 0:,.0f} filas/s)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'header_info': header_info, 'rubros': rubros}, f, ensure_ascii=False, indent=1)
+        print(f"  Guardado en: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
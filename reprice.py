@@ -0,0 +1,303 @@
+"""
+Recálculo masivo de precios sobre rubros ya parseados.
+
+Aplica una tabla de precios (por descripción o por CPC) a todos los items de
+todos los rubros a la vez y vuelve a correr la aritmética del APU con arreglos
+de numpy: costo hora y costo de cada item, herramienta menor (5% de la mano de
+obra), subtotales M/N/O/P, total costo directo, indirectos, utilidad, costo
+total, peso relativo y VAE de cada elemento. Solo se recalculan los rubros en
+los que cambió algún precio; el resto queda tal como vino del PDF.
+
+La tabla de precios es un CSV con columna precio y columna descripcion y/o cpc:
+
+    descripcion,cpc,precio
+    Cemento portland tipo GU,,8.25
+    ,541210012,4.95
+
+Uso:
+    python reprice.py APU_CON_VAE.pdf precios.csv APU_REPRECIADO.xlsx
+    python reprice.py APU_PUNIS_V8.xlsx precios.csv APU_PUNIS_V9.xlsx
+"""
+
+import copy
+import csv
+import re
+
+import numpy as np
+
+from price_index import normalize_description
+
+
+SECTIONS = ('equipos', 'mano_obra', 'materiales', 'transporte')
+# Equipo y mano de obra: costo hora = cantidad x tarifa, costo = costo hora x rendimiento.
+# Materiales y transporte: costo = cantidad x precio unitario.
+HOURLY_SECTIONS = ('equipos', 'mano_obra')
+
+HERRAMIENTA_MENOR_PATTERN = re.compile(r'Herramienta Menor\s+(\d+(?:\.\d+)?)\s*%', re.IGNORECASE)
+
+# Los importes del APU se redondean a centavos en cada paso; los pesos
+# relativos y el VAE por elemento a 5 decimales, el VAE del rubro a 4
+MONEY_DECIMALS = 2
+WEIGHT_DECIMALS = 5
+VAE_TOTAL_DECIMALS = 4
+
+
+class PriceTable:
+    """
+    Precios nuevos por descripción (normalizada) o por CPC.
+    
+    Si un item coincide por descripción y por CPC, gana la descripción: un
+    mismo CPC suele agrupar varias categorías de mano de obra.
+    """
+    
+    def __init__(self, by_description=None, by_cpc=None):
+        self.by_description = {normalize_description(k): float(v) for k, v in (by_description or {}).items()}
+        self.by_cpc = {str(k).strip(): float(v) for k, v in (by_cpc or {}).items()}
+    
+    @classmethod
+    def from_csv(cls, path):
+        """Lee un CSV con columnas precio y descripcion y/o cpc."""
+        by_description, by_cpc = {}, {}
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            for line, row in enumerate(csv.DictReader(f), 2):
+                row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+                if not row.get('precio'):
+                    continue
+                try:
+                    price = float(row['precio'].replace(',', ''))
+                except ValueError:
+                    raise ValueError(f"{path}, línea {line}: precio inválido {row['precio']!r}")
+                if row.get('descripcion'):
+                    by_description[row['descripcion']] = price
+                elif row.get('cpc'):
+                    by_cpc[row['cpc']] = price
+                else:
+                    raise ValueError(f"{path}, línea {line}: falta descripcion o cpc")
+        return cls(by_description, by_cpc)
+    
+    def __len__(self):
+        return len(self.by_description) + len(self.by_cpc)
+    
+    def lookup(self, item):
+        """Precio nuevo del item, o None si la tabla no lo incluye."""
+        price = self.by_description.get(normalize_description(item.get('descripcion')))
+        if price is None:
+            price = self.by_cpc.get((item.get('cpc') or '').strip())
+        return price
+
+
+def _round(values, decimals):
+    # Redondeo comercial (mitad hacia arriba): 0.475 -> 0.48 aunque en binario
+    # sea 0.47499999...
+    return np.round(values + np.copysign(1e-9, values), decimals)
+
+
+def _array(values):
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+
+def reprice_rubros(rubros, prices):
+    """
+    Aplica los precios y recalcula los rubros afectados.
+    
+    Args:
+        rubros: Lista de rubros parseados (no se modifica)
+        prices: PriceTable
+    
+    Returns:
+        Tupla (rubros, cambios): la lista nueva de rubros (los no afectados son
+        los mismos objetos) y la cantidad de items cuyo precio cambió
+    """
+    rubros = list(rubros)
+    
+    # Aplanar todos los items: un elemento por item en cada arreglo
+    owners, sections, items = [], [], []
+    new_prices = []
+    for rubro_index, rubro in enumerate(rubros):
+        for section_index, section in enumerate(SECTIONS):
+            for item in rubro.get(section) or []:
+                owners.append(rubro_index)
+                sections.append(section_index)
+                items.append(item)
+                new_prices.append(prices.lookup(item))
+    if not items:
+        return rubros, 0
+    
+    owner = np.array(owners)
+    section = np.array(sections)
+    old_tarifa = _array(item.get('tarifa') for item in items)
+    price = _array(new_prices)
+    repriced = ~np.isnan(price) & ~np.isclose(price, old_tarifa, rtol=0, atol=1e-12)
+    if not repriced.any():
+        return rubros, 0
+    
+    # Solo se recalculan los rubros con al menos un precio nuevo
+    affected_rubros = np.unique(owner[repriced])
+    mask = np.isin(owner, affected_rubros)
+    owner, section = owner[mask], section[mask]
+    items = [item for item, keep in zip(items, mask) if keep]
+    repriced = repriced[mask]
+    tarifa = np.where(repriced, price[mask], old_tarifa[mask])
+    cantidad = _array(item.get('cantidad') for item in items)
+    rendimiento = _array(item.get('rendimiento') for item in items)
+    vae_pct = _array(item.get('vae_pct') for item in items)
+    old_costo = _array(item.get('costo') for item in items)
+    
+    # Costo de cada item
+    hourly = section < len(HOURLY_SECTIONS)
+    costo_hora = np.where(hourly, _round(cantidad * tarifa, MONEY_DECIMALS), np.nan)
+    costo = np.where(hourly, _round(costo_hora * rendimiento, MONEY_DECIMALS),
+                     _round(cantidad * tarifa, MONEY_DECIMALS))
+    # Items sin cantidad (herramienta menor, filas incompletas) conservan su costo
+    costo = np.where(np.isnan(costo), old_costo, costo)
+    costo = np.nan_to_num(costo)
+    
+    # Subtotales por (rubro, sección) con una sola pasada de bincount
+    slot = np.searchsorted(affected_rubros, owner)
+    n = len(affected_rubros)
+    buckets = slot * len(SECTIONS) + section
+    mano_obra = SECTIONS.index('mano_obra')
+    
+    # Herramienta menor: porcentaje de la mano de obra del mismo rubro
+    tool_pct = np.array([_tool_percentage(item) if sec == 0 else np.nan for item, sec in zip(items, section)])
+    subtotals = np.bincount(buckets, weights=costo, minlength=n * len(SECTIONS)).reshape(n, len(SECTIONS))
+    is_tool = ~np.isnan(tool_pct)
+    costo = np.where(is_tool, _round(np.nan_to_num(tool_pct) * subtotals[slot, mano_obra], MONEY_DECIMALS), costo)
+    subtotals = _round(np.bincount(buckets, weights=costo, minlength=n * len(SECTIONS)).reshape(n, len(SECTIONS)),
+                       MONEY_DECIMALS)
+    
+    # Totales del rubro
+    total_costo_directo = _round(subtotals.sum(axis=1), MONEY_DECIMALS)
+    indirectos_pct = np.array([rubros[i].get('indirectos_pct') or 0 for i in affected_rubros], dtype=float)
+    utilidad_pct = np.array([rubros[i].get('utilidad_pct') or 0 for i in affected_rubros], dtype=float)
+    indirectos = _round(total_costo_directo * indirectos_pct, MONEY_DECIMALS)
+    utilidad = _round(total_costo_directo * utilidad_pct, MONEY_DECIMALS)
+    costo_total = _round(total_costo_directo + indirectos + utilidad, MONEY_DECIMALS)
+    
+    # Peso relativo y VAE por elemento
+    divisor = total_costo_directo[slot]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        peso = np.where(divisor > 0, _round(costo / divisor, WEIGHT_DECIMALS), 0.0)
+    vae_elemento = _round(peso * np.nan_to_num(vae_pct), WEIGHT_DECIMALS)
+    vae_total = _round(np.bincount(slot, weights=vae_elemento, minlength=n), VAE_TOTAL_DECIMALS)
+    
+    # Volcar los resultados en copias de los rubros afectados
+    copies = {}
+    for position, rubro_index in enumerate(affected_rubros):
+        rubro = copy.deepcopy(rubros[rubro_index])
+        for key, values in (('subtotal_m', subtotals[:, 0]), ('subtotal_n', subtotals[:, 1]),
+                            ('subtotal_o', subtotals[:, 2]), ('subtotal_p', subtotals[:, 3]),
+                            ('total_costo_directo', total_costo_directo), ('indirectos_valor', indirectos),
+                            ('utilidad_valor', utilidad), ('costo_total', costo_total),
+                            ('vae_total', vae_total)):
+            rubro[key] = float(values[position])
+        rubro['valor_unitario'] = rubro['costo_total']
+        rubro['texto_valor'] = amount_in_words(rubro['valor_unitario'])
+        copies[rubro_index] = rubro
+        rubros[rubro_index] = rubro
+    
+    counters = {}
+    for index, item in enumerate(items):
+        rubro_index = int(affected_rubros[slot[index]])
+        section_name = SECTIONS[section[index]]
+        position = counters.get((rubro_index, section_name), 0)
+        counters[(rubro_index, section_name)] = position + 1
+        target = copies[rubro_index][section_name][position]
+        if repriced[index]:
+            target['tarifa'] = float(tarifa[index])
+        if hourly[index] and not np.isnan(costo_hora[index]):
+            target['costo_hora'] = float(costo_hora[index])
+        target['costo'] = float(costo[index])
+        target['peso_relativo'] = float(peso[index])
+        target['vae_elemento'] = float(vae_elemento[index])
+    
+    return rubros, int(repriced.sum())
+
+
+def _tool_percentage(item):
+    """Fracción de la mano de obra que cobra la herramienta menor, o NaN si el item no lo es."""
+    if item.get('cantidad') is not None:
+        return np.nan
+    match = HERRAMIENTA_MENOR_PATTERN.search(item.get('descripcion') or '')
+    return float(match.group(1)) / 100 if match else np.nan
+
+
+_UNITS = ['CERO', 'UN', 'DOS', 'TRES', 'CUATRO', 'CINCO', 'SEIS', 'SIETE', 'OCHO', 'NUEVE', 'DIEZ',
+          'ONCE', 'DOCE', 'TRECE', 'CATORCE', 'QUINCE', 'DIECISEIS', 'DIECISIETE', 'DIECIOCHO', 'DIECINUEVE']
+_TENS = ['', '', 'VEINTE', 'TREINTA', 'CUARENTA', 'CINCUENTA', 'SESENTA', 'SETENTA', 'OCHENTA', 'NOVENTA']
+_HUNDREDS = ['', 'CIENTO', 'DOSCIENTOS', 'TRESCIENTOS', 'CUATROCIENTOS', 'QUINIENTOS', 'SEISCIENTOS',
+             'SETECIENTOS', 'OCHOCIENTOS', 'NOVECIENTOS']
+
+
+def _words_below_thousand(number):
+    if number == 100:
+        return 'CIEN'
+    words = []
+    if number >= 100:
+        words.append(_HUNDREDS[number // 100])
+        number %= 100
+    if number >= 20:
+        words.append(_TENS[number // 10] + (f' Y {_UNITS[number % 10]}' if number % 10 else ''))
+    elif number or not words:
+        words.append(_UNITS[number])
+    return ' '.join(words)
+
+
+def number_in_words(number):
+    """Entero en palabras como en los APU: 25 -> 'VEINTE Y CINCO', 41 -> 'CUARENTA Y UN'."""
+    if number < 1000:
+        return _words_below_thousand(number)
+    if number < 1000000:
+        thousands, rest = divmod(number, 1000)
+        words = 'MIL' if thousands == 1 else f'{_words_below_thousand(thousands)} MIL'
+        return words + (f' {_words_below_thousand(rest)}' if rest else '')
+    millions, rest = divmod(number, 1000000)
+    words = 'UN MILLON' if millions == 1 else f'{number_in_words(millions)} MILLONES'
+    return words + (f' {number_in_words(rest)}' if rest else '')
+
+
+def amount_in_words(value):
+    """Texto del valor unitario: 1.73 -> 'SON: UN DOLAR, 73/100 CENTAVOS'."""
+    cents = int(round(value * 100))
+    dollars, cents = divmod(cents, 100)
+    unit = 'DOLAR' if dollars == 1 else 'DOLARES'
+    cents_unit = 'CENTAVO' if cents == 1 else 'CENTAVOS'
+    return f"SON: {number_in_words(dollars)} {unit}, {cents:02d}/100 {cents_unit}"
+
+
+def main():
+    import argparse
+    import time
+    
+    from budget_diff import load_rubros
+    from pdf_to_excel_apu import APUConverter, convert_to_shared_strings
+    
+    parser = argparse.ArgumentParser(description="Aplica una tabla de precios a un presupuesto de APU y "
+                                                 "genera el Excel recalculado.")
+    parser.add_argument('origen', help="PDF de APU o libro PUNIS (.xlsx)")
+    parser.add_argument('precios', help="CSV con columnas precio y descripcion y/o cpc")
+    parser.add_argument('output', help="Excel de salida")
+    args = parser.parse_args()
+    
+    try:
+        prices = PriceTable.from_csv(args.precios)
+    except ValueError as e:
+        parser.error(str(e))
+    header_info, rubros = load_rubros(args.origen)
+    
+    start = time.perf_counter()
+    new_rubros, changed = reprice_rubros(rubros, prices)
+    elapsed = time.perf_counter() - start
+    affected = sum(1 for old, new in zip(rubros, new_rubros) if old is not new)
+    print(f"  {len(prices)} precios, {changed} items cambiados en {affected} de {len(rubros)} rubros "
+          f"({elapsed * 1000:.1f} ms)")
+    
+    converter = APUConverter(args.origen)
+    converter.header_info = header_info
+    converter.rubros = new_rubros
+    converter.create_excel(args.output)
+    convert_to_shared_strings(args.output)
+
+
+if __name__ == "__main__":
+    main()
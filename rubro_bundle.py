@@ -0,0 +1,143 @@
+"""
+Conversión en dos fases con un archivo intermedio de rubros (bundle).
+
+La fase parse lee el PDF y guarda el encabezado y todos los rubros en un
+bundle compacto; la fase render arma el Excel de PUNIS a partir del bundle sin
+volver a tocar el PDF. Así se puede regenerar el libro después de cambiar el
+formato sin parsear de nuevo, o parsear en una máquina y generar en otra.
+
+Formato del bundle (versión 1):
+    6 bytes   firma b'APURUB'
+    2 bytes   versión (entero sin signo, little endian)
+    resto     pickle (protocolo 5) comprimido con zlib de {"header_info": {...},
+              "rubros": [...], "pdf": "nombre.pdf"}
+
+El pickle solo contiene dicts, listas, textos y números y se lee con un
+Unpickler que rechaza cualquier clase o función, así que abrir un bundle de
+otra máquina no ejecuta código. Cargarlo es varias veces más rápido que JSON.
+
+Uso:
+    python rubro_bundle.py parse APU_CON_VAE.pdf APU_CON_VAE.apub
+    python rubro_bundle.py render APU_CON_VAE.apub salida.xlsx
+"""
+
+import io
+import os
+import pickle
+import struct
+import zlib
+
+
+MAGIC = b'APURUB'
+VERSION = 1
+_HEADER = struct.Struct('<6sH')
+PICKLE_PROTOCOL = 5
+
+
+class _DataUnpickler(pickle.Unpickler):
+    """Unpickler que solo acepta tipos básicos (no resuelve clases ni funciones)."""
+    
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Bundle inválido: contiene {module}.{name}")
+
+
+def load_data(payload):
+    """Deserializa un pickle de datos simples (dicts, listas, textos, números, bytes)."""
+    return _DataUnpickler(io.BytesIO(payload)).load()
+
+
+def dumps(header_info, rubros, pdf=None):
+    """Bundle (bytes) con el encabezado y los rubros."""
+    payload = pickle.dumps({'header_info': dict(header_info), 'rubros': list(rubros), 'pdf': pdf},
+                           PICKLE_PROTOCOL)
+    return _HEADER.pack(MAGIC, VERSION) + zlib.compress(payload, 6)
+
+
+def loads(data):
+    """
+    Lee un bundle.
+    
+    Returns:
+        Dict con header_info, rubros y pdf
+    
+    Raises:
+        ValueError: Si no es un bundle o es de una versión no soportada
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("El archivo no es un bundle de rubros")
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("El archivo no es un bundle de rubros")
+    if version > VERSION:
+        raise ValueError(f"Bundle de versión {version}; esta versión del convertidor lee hasta la {VERSION}")
+    try:
+        payload = zlib.decompress(data[_HEADER.size:])
+        return load_data(payload)
+    except (zlib.error, pickle.UnpicklingError, EOFError) as e:
+        raise ValueError(f"Bundle dañado: {e}")
+
+
+def write_bundle(path, header_info, rubros, pdf=None):
+    data = dumps(header_info, rubros, pdf)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def read_bundle(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def parse_to_bundle(pdf_path, bundle_path):
+    """Fase 1: parsea el PDF y guarda el bundle. Devuelve la cantidad de rubros."""
+    from pdf_to_excel_apu import APUConverter
+    
+    converter = APUConverter(pdf_path)
+    converter.extract_all_rubros()
+    size = write_bundle(bundle_path, converter.header_info, converter.rubros, os.path.basename(pdf_path))
+    print(f"Bundle guardado: {bundle_path} ({len(converter.rubros)} rubros, {size / 1024:.1f} KB)")
+    return len(converter.rubros)
+
+
+def render_bundle(bundle_path, output_path):
+    """Fase 2: genera el Excel de PUNIS a partir de un bundle."""
+    from pdf_to_excel_apu import APUConverter, convert_to_shared_strings
+    
+    bundle = read_bundle(bundle_path)
+    converter = APUConverter(bundle.get('pdf') or bundle_path)
+    converter.header_info = bundle['header_info']
+    converter.rubros = bundle['rubros']
+    converter.create_excel(output_path)
+    with converter.timer.stage('shared_strings'):
+        convert_to_shared_strings(output_path)
+    return output_path
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Conversión de APU en dos fases (parse y render) con un bundle intermedio.")
+    commands = parser.add_subparsers(dest='comando', required=True)
+    
+    parse = commands.add_parser('parse', help="Parsea un PDF y guarda el bundle de rubros")
+    parse.add_argument('pdf', help="PDF de APU")
+    parse.add_argument('bundle', nargs='?', help="Bundle de salida (por defecto <pdf>.apub)")
+    
+    render = commands.add_parser('render', help="Genera el Excel de PUNIS a partir de un bundle")
+    render.add_argument('bundle', help="Bundle generado con parse")
+    render.add_argument('output', nargs='?', help="Excel de salida (por defecto <bundle>.xlsx)")
+    args = parser.parse_args()
+    
+    if args.comando == 'parse':
+        parse_to_bundle(args.pdf, args.bundle or os.path.splitext(args.pdf)[0] + '.apub')
+        return
+    
+    try:
+        render_bundle(args.bundle, args.output or os.path.splitext(args.bundle)[0] + '.xlsx')
+    except ValueError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
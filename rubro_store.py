@@ -0,0 +1,130 @@
+"""
+Almacén de rubros parseados con desborde a disco.
+
+RubroStore reemplaza a la lista APUConverter.rubros en documentos muy grandes:
+guarda los rubros en memoria hasta que su tamaño serializado supera el límite
+indicado y desde ahí los escribe en una base SQLite temporal, en lotes. Al
+recorrerlo los entrega en el mismo orden en que se agregaron, leyendo de a un
+lote por vez, así que la memoria que ocupan los rubros queda acotada sin
+importar cuántas páginas tenga el PDF.
+"""
+
+import os
+import pickle
+import sqlite3
+import tempfile
+
+
+MB = 1024 * 1024
+BATCH_SIZE = 64
+
+
+class RubroStore:
+    """
+    Secuencia de rubros con la interfaz de lista que usan create_excel,
+    convert_pipelined y update_excel (append, len, iteración e índice).
+    
+    Args:
+        max_memory: Bytes serializados que se mantienen en memoria antes de
+                    pasar a disco (0 = todo a disco desde el primer rubro)
+        directory: Carpeta del archivo SQLite temporal (por defecto la de tempfile)
+    """
+    
+    def __init__(self, max_memory=64 * MB, directory=None):
+        self.max_memory = max_memory
+        self.directory = directory
+        self._memory = []  # Rubros serializados aún en memoria
+        self._memory_bytes = 0
+        self._pending = []  # Rubros serializados esperando la próxima inserción en lote
+        self._count = 0
+        self._db = None
+        self._db_path = None
+    
+    @property
+    def spilled(self):
+        """True si los rubros ya se están guardando en disco."""
+        return self._db is not None
+    
+    def _open_db(self):
+        fd, self._db_path = tempfile.mkstemp(prefix='apu_rubros_', suffix='.sqlite', dir=self.directory)
+        os.close(fd)
+        self._db = sqlite3.connect(self._db_path)
+        # Base descartable: sin diario ni sincronización, solo se lee en esta corrida
+        self._db.execute('PRAGMA journal_mode=OFF')
+        self._db.execute('PRAGMA synchronous=OFF')
+        self._db.execute('CREATE TABLE rubros (idx INTEGER PRIMARY KEY, data BLOB NOT NULL)')
+        self._pending = list(self._memory)
+        self._memory = []
+        self._memory_bytes = 0
+        self._flush()
+    
+    def _flush(self):
+        if not self._pending:
+            return
+        first = self._count - len(self._pending)
+        self._db.executemany('INSERT INTO rubros (idx, data) VALUES (?, ?)',
+                             ((first + i, data) for i, data in enumerate(self._pending)))
+        self._db.commit()
+        self._pending = []
+    
+    def append(self, rubro):
+        """Agrega un rubro al final."""
+        data = pickle.dumps(rubro, pickle.HIGHEST_PROTOCOL)
+        self._count += 1
+        if self._db is None:
+            self._memory.append(data)
+            self._memory_bytes += len(data)
+            if self._memory_bytes > self.max_memory:
+                self._open_db()
+            return
+        self._pending.append(data)
+        if len(self._pending) >= BATCH_SIZE:
+            self._flush()
+    
+    def extend(self, rubros):
+        for rubro in rubros:
+            self.append(rubro)
+    
+    def __len__(self):
+        return self._count
+    
+    def __iter__(self):
+        if self._db is None:
+            for data in self._memory:
+                yield pickle.loads(data)
+            return
+        self._flush()
+        cursor = self._db.execute('SELECT data FROM rubros ORDER BY idx')
+        while True:
+            batch = cursor.fetchmany(BATCH_SIZE)
+            if not batch:
+                break
+            for (data,) in batch:
+                yield pickle.loads(data)
+    
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        if self._db is None:
+            return pickle.loads(self._memory[index])
+        self._flush()
+        (data,) = self._db.execute('SELECT data FROM rubros WHERE idx = ?', (index,)).fetchone()
+        return pickle.loads(data)
+    
+    def close(self):
+        """Cierra y borra la base temporal (los rubros dejan de estar disponibles)."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            os.remove(self._db_path)
+        self._memory = []
+        self._pending = []
+        self._count = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
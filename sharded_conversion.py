@@ -0,0 +1,319 @@
+"""
+Conversión repartida entre varias máquinas con un protocolo TCP simple.
+
+Un coordinador divide el PDF en rangos de páginas (shards) y los reparte entre
+los trabajadores que se registran por TCP. Cada trabajador parsea sus páginas
+con parse_apu_page y devuelve los resultados; el coordinador los une en orden
+de página y escribe el Excel. Si un trabajador se cae, tarda demasiado o
+informa un error, su shard vuelve a la cola y lo toma otro.
+
+El PDF viaja una vez por trabajador (como bytes) o, con --ruta-compartida, solo
+se envía la ruta (carpeta de red montada en todas las máquinas).
+
+El protocolo no tiene autenticación: cualquiera que se conecte recibe el PDF y
+puede entregar rubros. Por eso el coordinador escucha solo en 127.0.0.1 salvo
+que se indique otra dirección con --host (p. ej. 0.0.0.0 en una red de confianza).
+
+Protocolo: cada mensaje es un entero de 4 bytes (big endian) con el largo y un
+pickle de datos simples, que se lee con rubro_bundle.load_data (no resuelve
+clases ni funciones). Mensajes:
+    trabajador -> coordinador  {'tipo': 'registro', 'nombre'}
+    coordinador -> trabajador  {'tipo': 'documento', 'pdf': bytes | None, 'ruta'}
+    coordinador -> trabajador  {'tipo': 'shard', 'id', 'desde', 'hasta'}
+    trabajador -> coordinador  {'tipo': 'resultado', 'id', 'paginas': [(rubro, encabezado), ...]}
+                               {'tipo': 'error', 'id', 'mensaje'}
+    coordinador -> trabajador  {'tipo': 'fin'}
+
+Uso:
+    python sharded_conversion.py coordinar PROYECTO.pdf salida.xlsx --host 0.0.0.0 --puerto 5555
+    python sharded_conversion.py trabajar 192.168.1.10:5555
+    python sharded_conversion.py coordinar PROYECTO.pdf salida.xlsx --workers-locales 4
+"""
+
+import io
+import os
+import pickle
+import socket
+import struct
+import threading
+from collections import deque
+from pathlib import Path
+
+import pdfplumber
+
+from pdf_to_excel_apu import APUConverter, assemble_document, convert_to_shared_strings, parse_apu_page
+from rubro_bundle import load_data
+
+
+PAGES_PER_SHARD = 25
+MAX_ATTEMPTS = 3  # Intentos por shard antes de abortar la conversión
+SHARD_TIMEOUT = 600  # Segundos que se espera el resultado de un shard
+_LENGTH = struct.Struct('>I')
+
+
+def send_message(sock, message):
+    payload = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Conexión cerrada")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock):
+    (size,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return load_data(_recv_exact(sock, size))
+
+
+def make_shards(total_pages, pages_per_shard=PAGES_PER_SHARD):
+    """Rangos [desde, hasta) de índices de página."""
+    return [(start, min(start + pages_per_shard, total_pages))
+            for start in range(0, total_pages, pages_per_shard)]
+
+
+class Coordinator:
+    """
+    Reparte los shards de un PDF entre los trabajadores conectados.
+    
+    Args:
+        pdf_path: PDF a convertir
+        host, port: Dirección donde escuchar (port 0 = puerto libre, ver .port)
+        pages_per_shard: Páginas por shard
+        shared_path: Si es True se envía la ruta del PDF en lugar de sus bytes
+        shard_timeout: Segundos máximos de espera por shard antes de reasignarlo
+    """
+    
+    def __init__(self, pdf_path, host='127.0.0.1', port=5555, pages_per_shard=PAGES_PER_SHARD,
+                 shared_path=False, shard_timeout=SHARD_TIMEOUT):
+        self.pdf_path = pdf_path
+        self.shared_path = shared_path
+        self.shard_timeout = shard_timeout
+        with pdfplumber.open(pdf_path) as pdf:
+            self.total_pages = len(pdf.pages)
+        self.shards = make_shards(self.total_pages, pages_per_shard)
+        self.pending = deque(range(len(self.shards)))
+        self.attempts = [0] * len(self.shards)
+        self.results = {}
+        self.error = None
+        self._condition = threading.Condition()
+        self._document = None if shared_path else Path(pdf_path).read_bytes()
+        self._server = socket.create_server((host, port))
+        self._server.settimeout(0.5)
+        self.port = self._server.getsockname()[1]
+    
+    @property
+    def finished(self):
+        return self.error is not None or len(self.results) == len(self.shards)
+    
+    def _next_shard(self):
+        """Próximo shard pendiente; espera si todos están en curso. None al terminar."""
+        with self._condition:
+            while not self.pending and not self.finished:
+                self._condition.wait()
+            if self.finished:
+                return None
+            return self.pending.popleft()
+    
+    def _requeue(self, shard_id, reason):
+        with self._condition:
+            self.attempts[shard_id] += 1
+            start, end = self.shards[shard_id]
+            if self.attempts[shard_id] >= MAX_ATTEMPTS:
+                self.error = f"Páginas {start + 1}-{end} fallaron {MAX_ATTEMPTS} veces: {reason}"
+            else:
+                print(f"\n  Páginas {start + 1}-{end}: {reason}; se reasignan")
+                self.pending.appendleft(shard_id)
+            self._condition.notify_all()
+    
+    def _store(self, shard_id, pages):
+        with self._condition:
+            self.results[shard_id] = pages
+            print(f"  Shards terminados: {len(self.results)}/{len(self.shards)}", end='\r')
+            self._condition.notify_all()
+    
+    def _serve_worker(self, conn, address):
+        shard_id = None
+        name = f'{address[0]}:{address[1]}'
+        try:
+            with conn:
+                conn.settimeout(self.shard_timeout)
+                hello = recv_message(conn)
+                if isinstance(hello, dict) and hello.get('nombre'):
+                    name = hello['nombre']
+                print(f"\n  Trabajador registrado: {name}")
+                send_message(conn, {'tipo': 'documento', 'pdf': self._document,
+                                    'ruta': os.path.abspath(self.pdf_path)})
+                while True:
+                    shard_id = self._next_shard()
+                    if shard_id is None:
+                        send_message(conn, {'tipo': 'fin'})
+                        return
+                    start, end = self.shards[shard_id]
+                    send_message(conn, {'tipo': 'shard', 'id': shard_id, 'desde': start, 'hasta': end})
+                    reply = recv_message(conn)
+                    if (isinstance(reply, dict) and reply.get('tipo') == 'resultado'
+                            and reply.get('id') == shard_id and isinstance(reply.get('paginas'), list)
+                            and len(reply['paginas']) == end - start):
+                        self._store(shard_id, reply['paginas'])
+                    elif isinstance(reply, dict) and reply.get('tipo') == 'error':
+                        self._requeue(shard_id, f"{name} informó: {reply.get('mensaje')}")
+                    else:
+                        # Respuesta mal formada: el trabajador no es confiable, se desconecta
+                        raise ValueError(f"respuesta inválida de {name}")
+                    shard_id = None
+        except Exception as e:
+            # Trabajador caído, que no responde a tiempo o que responde basura: su shard vuelve a la cola
+            if shard_id is not None:
+                self._requeue(shard_id, f"trabajador {name} perdido ({e})")
+    
+    def run(self):
+        """
+        Atiende trabajadores hasta terminar todos los shards.
+        
+        Returns:
+            Resultados por página (rubro, encabezado) en orden de página
+        
+        Raises:
+            RuntimeError: Si un shard falló MAX_ATTEMPTS veces
+        """
+        print(f"Coordinando {self.total_pages} páginas en {len(self.shards)} shards "
+              f"(puerto {self.port})...")
+        threads = []
+        with self._server:
+            while not self.finished:
+                try:
+                    conn, address = self._server.accept()
+                except socket.timeout:
+                    continue
+                thread = threading.Thread(target=self._serve_worker, args=(conn, address), daemon=True)
+                thread.start()
+                threads.append(thread)
+        with self._condition:
+            self._condition.notify_all()
+        for thread in threads:
+            thread.join(timeout=5)
+        if self.error:
+            raise RuntimeError(self.error)
+        print(f"\n  {len(self.shards)} shards terminados.")
+        return [page for shard_id in range(len(self.shards)) for page in self.results[shard_id]]
+
+
+def run_worker(host, port, name=None):
+    """
+    Trabajador: se registra en el coordinador y parsea los shards que recibe.
+    
+    Returns:
+        Cantidad de shards procesados
+    """
+    processed = 0
+    with socket.create_connection((host, port)) as sock:
+        send_message(sock, {'tipo': 'registro', 'nombre': name or f'{socket.gethostname()}/{os.getpid()}'})
+        document = recv_message(sock)
+        source = io.BytesIO(document['pdf']) if document.get('pdf') is not None else document['ruta']
+        with pdfplumber.open(source) as pdf:
+            while True:
+                message = recv_message(sock)
+                if message.get('tipo') != 'shard':
+                    break
+                try:
+                    pages = []
+                    for index in range(message['desde'], message['hasta']):
+                        page = pdf.pages[index]
+                        pages.append(parse_apu_page(page))
+                        page.close()
+                    send_message(sock, {'tipo': 'resultado', 'id': message['id'], 'paginas': pages})
+                except Exception as e:
+                    send_message(sock, {'tipo': 'error', 'id': message['id'], 'mensaje': f'{type(e).__name__}: {e}'})
+                processed += 1
+    return processed
+
+
+def _local_worker(host, port, index):
+    run_worker(host, port, f'local-{index}')
+
+
+def convert_sharded(pdf_path, output_path, host='127.0.0.1', port=5555, pages_per_shard=PAGES_PER_SHARD,
+                    shared_path=False, local_workers=0, shard_timeout=SHARD_TIMEOUT):
+    """
+    Convierte un PDF repartiendo el parseo entre trabajadores TCP.
+    
+    Args:
+        local_workers: Trabajadores a lanzar en esta máquina (procesos), además
+                       de los remotos que se conecten
+    
+    Returns:
+        APUConverter con los rubros y el encabezado del documento
+    """
+    from multiprocessing import Process
+    
+    coordinator = Coordinator(pdf_path, host, port, pages_per_shard, shared_path, shard_timeout)
+    processes = [Process(target=_local_worker, args=('127.0.0.1', coordinator.port, i), daemon=True)
+                 for i in range(local_workers)]
+    for process in processes:
+        process.start()
+    try:
+        page_results = coordinator.run()
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+    
+    converter = APUConverter(pdf_path)
+    converter.header_info, converter.rubros = assemble_document(page_results)
+    print(f"  Encontrados {len(converter.rubros)} rubros.")
+    converter.create_excel(output_path)
+    with converter.timer.stage('shared_strings'):
+        convert_to_shared_strings(output_path)
+    return converter
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Conversión de APU repartida entre trabajadores TCP.")
+    commands = parser.add_subparsers(dest='comando', required=True)
+    
+    coordinate = commands.add_parser('coordinar', help="Reparte el PDF y escribe el Excel")
+    coordinate.add_argument('pdf', help="PDF de APU")
+    coordinate.add_argument('output', help="Excel de salida")
+    coordinate.add_argument('--host', default='127.0.0.1',
+                            help="Dirección donde escuchar (por defecto 127.0.0.1, solo esta máquina; "
+                                 "0.0.0.0 acepta trabajadores de la red, sin autenticación)")
+    coordinate.add_argument('--puerto', type=int, default=5555)
+    coordinate.add_argument('--paginas-por-shard', type=int, default=PAGES_PER_SHARD)
+    coordinate.add_argument('--ruta-compartida', action='store_true',
+                            help="Envía la ruta del PDF (carpeta compartida) en lugar de sus bytes")
+    coordinate.add_argument('--workers-locales', type=int, default=0, metavar='N',
+                            help="Lanza N trabajadores en esta máquina")
+    coordinate.add_argument('--timeout-shard', type=float, default=SHARD_TIMEOUT, metavar='SEG',
+                            help="Segundos de espera por shard antes de reasignarlo")
+    
+    work = commands.add_parser('trabajar', help="Se registra en un coordinador y parsea shards")
+    work.add_argument('coordinador', help="HOST:PUERTO del coordinador")
+    work.add_argument('--nombre', help="Nombre del trabajador en los mensajes del coordinador")
+    args = parser.parse_args()
+    
+    if args.comando == 'trabajar':
+        host, _, port = args.coordinador.rpartition(':')
+        count = run_worker(host or '127.0.0.1', int(port), args.nombre)
+        print(f"  {count} shards procesados.")
+        return
+    
+    try:
+        convert_sharded(args.pdf, args.output, args.host, args.puerto, args.paginas_por_shard,
+                        args.ruta_compartida, args.workers_locales, args.timeout_shard)
+    except RuntimeError as e:
+        print(f"\n✗ Error durante la conversión: {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Medición de tiempos por etapa de la conversión de APU.
+
+Cada etapa (apertura del PDF, extract_text, extract_tables, parseo de filas,
+construcción del libro, wb.save, shared strings) se mide con perf_counter, que
+cuesta menos de un microsegundo por llamada, así que los temporizadores pueden
+quedar activos siempre. El resultado se puede guardar como JSON junto al Excel.
+"""
+
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class StageTimer:
+    """Acumula tiempos por etapa y por página."""
+    
+    def __init__(self):
+        self.stages = {}  # nombre -> {'seconds': float, 'count': int}
+        self.pages = []
+        self._page = None
+        self._page_start = None
+        self._page_measured = 0.0
+        self._start = time.perf_counter()
+        self.memory = None  # MemoryTracker opcional (ver memory_tracking.py)
+    
+    def add(self, name, seconds):
+        """Suma una medición a la etapa (y a la página en curso, si hay una)."""
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'count': 0})
+        stage['seconds'] += seconds
+        stage['count'] += 1
+        if self._page is not None:
+            self._page[name] = self._page.get(name, 0.0) + seconds
+            self._page_measured += seconds
+    
+    def note(self, name, value):
+        """Anota un dato (no un tiempo) en la página en curso, p. ej. número de tablas."""
+        if self._page is not None:
+            self._page[name] = value
+    
+    @contextmanager
+    def stage(self, name):
+        """Mide el bloque de código como una ejecución de la etapa."""
+        if self.memory is not None:
+            self.memory.enter(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+            if self.memory is not None:
+                # Sitios de asignación solo en etapas fuera de una página
+                self.memory.exit(snapshot=self._page is None)
+    
+    def start_page(self, page_number):
+        """Empieza a registrar los tiempos de una página."""
+        self._page = {'page': page_number}
+        self._page_start = time.perf_counter()
+        self._page_measured = 0.0
+    
+    def end_page(self, **extra):
+        """
+        Cierra la página en curso. El tiempo no atribuido a otra etapa se
+        registra como parseo de filas.
+        """
+        total = time.perf_counter() - self._page_start
+        page = self._page
+        self._page = None
+        row_parsing = max(total - self._page_measured, 0.0)
+        self.add('row_parsing', row_parsing)
+        page['row_parsing'] = row_parsing
+        page['total'] = total
+        page.update(extra)
+        self.pages.append(page)
+        return page
+    
+    def merge_page(self, page):
+        """Incorpora los tiempos de una página medida en otro proceso."""
+        for name, seconds in page.items():
+            if name not in ('page', 'total') and isinstance(seconds, float):
+                self.add(name, seconds)
+        self.pages.append(page)
+    
+    def to_dict(self):
+        """Tiempos por etapa y por página, listos para serializar."""
+        data = {
+            'total_seconds': time.perf_counter() - self._start,
+            'stages': self.stages,
+            'pages': sorted(self.pages, key=lambda p: p['page']),
+        }
+        if self.memory is not None:
+            data['memory'] = self.memory.to_dict()
+        return data
+    
+    def write_json(self, path, **extra):
+        """Guarda los tiempos como JSON (archivo acompañante del Excel)."""
+        data = dict(extra)
+        data.update(self.to_dict())
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return path
+    
+    def summary(self):
+        """
+        Resumen legible de los tiempos por etapa.
+        
+        En modo tubería las etapas de parseo suman el tiempo de todos los
+        procesos, por lo que pueden superar el tiempo total.
+        """
+        total = time.perf_counter() - self._start
+        lines = [f"Tiempos por etapa (total {total:.2f} s):"]
+        for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]['seconds']):
+            pct = stage['seconds'] / total * 100 if total > 0 else 0
+            lines.append(f"  {name:<16} {stage['seconds']:8.3f} s  {pct:5.1f}%  ({stage['count']} veces)")
+        return '\n'.join(lines)
+
+
+class NullTimer:
+    """Temporizador que no mide nada, para parsear sin StageTimer."""
+    
+    def stage(self, name):
+        return nullcontext()
+    
+    def note(self, name, value):
+        pass
+
+
+NULL_TIMER = NullTimer()
@@ -0,0 +1,192 @@
+"""
+Parseo de páginas en procesos supervisados, con límite de tiempo y de memoria.
+
+Una página mal formada puede colgar a pdfplumber o consumir toda la memoria.
+Aquí cada proceso parsea una página a la vez y el supervisor lo vigila: si la
+página supera el tiempo máximo se mata el proceso y se levanta otro; si el
+proceso muere (memoria agotada, error fatal) o la página lanza una excepción,
+la página se reintenta una vez en un proceso nuevo. Las páginas que vuelven a
+fallar quedan registradas con su número y se omiten, y el resto del documento
+se convierte normalmente. El tiempo de una página empieza a contar cuando el
+proceso ya abrió el PDF (avisa con 'listo'), así que un proceso recién creado
+no gasta el límite de la página reintentada en abrir un PDF grande.
+
+El límite de memoria se aplica a cada proceso con resource.setrlimit
+(RLIMIT_AS, espacio de direcciones); en sistemas sin el módulo resource
+(Windows) solo rige el límite de tiempo.
+"""
+
+import os
+import time
+from collections import deque
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+
+import pdfplumber
+
+from pdf_to_excel_apu import assemble_document, parse_apu_page
+from stage_timing import StageTimer
+
+
+PAGE_TIMEOUT = 120  # Segundos máximos por página
+PAGE_RETRIES = 1  # Reintentos de una página fallida en un proceso nuevo
+STARTUP_TIMEOUT = 300  # Segundos máximos para que un proceso abra el PDF
+
+
+def _limit_memory(max_memory_mb):
+    try:
+        import resource
+    except ImportError:
+        return False
+    limit = int(max_memory_mb * 1024 * 1024)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return True
+
+
+def _worker_main(pdf_path, conn, max_memory_mb):
+    """Proceso de parseo: recibe índices de página y devuelve sus resultados por conn."""
+    if max_memory_mb:
+        _limit_memory(max_memory_mb)
+    timer = StageTimer()
+    with pdfplumber.open(pdf_path) as pdf:
+        # Abrir el PDF no cuenta para el límite de la página: se avisa al terminar
+        conn.send(('listo', None, None, None))
+        while True:
+            page_index = conn.recv()
+            if page_index is None:
+                break
+            try:
+                timer.start_page(page_index + 1)
+                page = pdf.pages[page_index]
+                rubro, header = parse_apu_page(page, timer)
+                page.close()
+                conn.send(('ok', page_index, (rubro, header), timer.end_page()))
+            except Exception as e:
+                message = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                conn.send(('error', page_index, message, None))
+
+
+class _Worker:
+    """Proceso de parseo y la página que tiene asignada."""
+    
+    def __init__(self, pdf_path, max_memory_mb):
+        self.conn, child_conn = Pipe()
+        self.process = Process(target=_worker_main, args=(pdf_path, child_conn, max_memory_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False  # Hasta que el proceso avisa que abrió el PDF
+        self.page_index = None
+        self.deadline = time.monotonic() + STARTUP_TIMEOUT
+    
+    def assign(self, page_index, timeout):
+        self.page_index = page_index
+        self.deadline = time.monotonic() + timeout
+        self.conn.send(page_index)
+    
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+    
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def parse_supervised(pdf_path, workers=None, page_timeout=PAGE_TIMEOUT, max_memory_mb=None,
+                     retries=PAGE_RETRIES, timer=None):
+    """
+    Parsea todas las páginas de un PDF en procesos supervisados.
+    
+    Args:
+        pdf_path: Ruta al archivo PDF
+        workers: Número de procesos (por defecto, núcleos disponibles)
+        page_timeout: Segundos máximos por página antes de matar su proceso
+        max_memory_mb: Límite de memoria de cada proceso (opcional)
+        retries: Reintentos de una página que falla, cada uno en un proceso nuevo
+        timer: StageTimer opcional donde se suman los tiempos de cada página
+    
+    Returns:
+        Tupla (header_info, rubros, failed_pages) donde failed_pages es una
+        lista de dicts {'pagina', 'error'} ordenada por página
+    """
+    workers = workers or os.cpu_count() or 1
+    with pdfplumber.open(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+    
+    pending = deque(range(total_pages))
+    attempts = [0] * total_pages
+    results = [None] * total_pages
+    failed = {}
+    done = 0
+    pool = [_Worker(pdf_path, max_memory_mb) for _ in range(min(workers, total_pages))]
+    
+    def page_failed(worker, error):
+        # El proceso puede haber quedado en mal estado: se reemplaza siempre
+        nonlocal done
+        page_index = worker.page_index
+        worker.kill()
+        pool[pool.index(worker)] = _Worker(pdf_path, max_memory_mb)
+        attempts[page_index] += 1
+        if attempts[page_index] <= retries:
+            print(f"\n  Página {page_index + 1}: {error}; se reintenta")
+            pending.appendleft(page_index)
+        else:
+            print(f"\n  Página {page_index + 1}: {error}; se omite")
+            failed[page_index] = error
+            done += 1
+    
+    print(f"Procesando {total_pages} páginas en {len(pool)} procesos supervisados "
+          f"(límite {page_timeout:g} s por página)...")
+    try:
+        while done < total_pages:
+            for worker in pool:
+                if worker.ready and worker.page_index is None and pending:
+                    worker.assign(pending.popleft(), page_timeout)
+            # Procesos abriendo el PDF o con una página asignada
+            busy = [worker for worker in pool if not worker.ready or worker.page_index is not None]
+            
+            now = time.monotonic()
+            ready = wait([worker.conn for worker in busy],
+                         timeout=max(0, min(worker.deadline for worker in busy) - now))
+            for worker in busy:
+                if worker.conn in ready:
+                    try:
+                        status, page_index, payload, page_timing = worker.conn.recv()
+                    except (EOFError, OSError):
+                        worker.process.join(timeout=1)
+                        if not worker.ready:
+                            # Sin página asignada no hay nada que omitir: el PDF no se puede abrir así
+                            raise RuntimeError(f"un proceso de parseo terminó al abrir el PDF "
+                                               f"(código {worker.process.exitcode})")
+                        page_failed(worker, f"el proceso terminó inesperadamente "
+                                            f"(código {worker.process.exitcode})")
+                        continue
+                    if status == 'listo':
+                        worker.ready = True
+                    elif status == 'ok':
+                        results[page_index] = payload
+                        if timer is not None:
+                            timer.merge_page(page_timing)
+                        worker.page_index = None
+                        done += 1
+                        print(f"  Procesando página {done}/{total_pages}...", end='\r')
+                    else:
+                        page_failed(worker, payload)
+                elif time.monotonic() >= worker.deadline:
+                    if not worker.ready:
+                        raise RuntimeError(f"un proceso de parseo no abrió el PDF en {STARTUP_TIMEOUT:g} s")
+                    page_failed(worker, f"superó el límite de {page_timeout:g} s")
+    finally:
+        for worker in pool:
+            worker.stop()
+    
+    header_info, rubros = assemble_document(result for result in results if result is not None)
+    failed_pages = [{'pagina': page_index + 1, 'error': failed[page_index]} for page_index in sorted(failed)]
+    print(f"\n  Encontrados {len(rubros)} rubros; {len(failed_pages)} páginas omitidas.")
+    return header_info, rubros, failed_pages
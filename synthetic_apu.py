@@ -0,0 +1,328 @@
+"""
+Generador de PDFs sintéticos de APU con el mismo formato que APU_CON_VAE.pdf.
+
+Cada página es un rubro: encabezado (profesional, proyecto, ubicación, HOJA n
+DE total, RUBRO, UNIDAD, DETALLE y cantidad), la tabla con las secciones
+EQUIPO, MANO DE OBRA, MATERIALES y TRANSPORTE con su subtotal, la tabla de
+totales (costo directo, indirectos, utilidad, costo total, valor unitario) y el
+pie con SON: y la fecha. Las celdas se dibujan como rectángulos, igual que en
+el PDF real, para que pdfplumber encuentre las mismas tablas.
+
+El PDF se escribe a mano (Helvetica estándar, sin dependencias) y página por
+página, así que se pueden generar miles de páginas sin cargarlas en memoria.
+
+Uso:
+    python synthetic_apu.py salida.pdf [--paginas 100] [--filas 4] [--semilla 0]
+"""
+
+import random
+import zlib
+
+
+HEADER_INFO = {
+    'profesional': 'ING. PROFESIONAL DE PRUEBA',
+    'proyecto': 'PROYECTO: CONSTRUCCIÓN SINTÉTICA PARA PRUEBAS DE RENDIMIENTO',
+    'ubicacion': 'UBICACION: CIUDAD DE PRUEBA, CANTÓN DE PRUEBA, PROVINCIA DE PRUEBA.',
+}
+
+FECHA = 'LORETO, 26 DE NOVIEMBRE DE 2025'
+
+EQUIPOS = ['Concretera 1 saco', 'Vibrador de manguera', 'Andamio metálico', 'Volqueta 8 m3',
+           'Retroexcavadora', 'Compactador manual', 'Cortadora de hierro', 'Bomba de agua 2"']
+MANO_OBRA = [('Peón', 'EO E2'), ('Albañil', 'EO D2'), ('Maestro mayor ejec.obras civil', 'EO C1'),
+             ('Fierrero', 'EO D2'), ('Carpintero', 'EO D2'), ('Operador de equipo liviano', 'EO D2'),
+             ('Pintor', 'EO D2'), ('Inspector de obra', 'EO B3')]
+MATERIALES = [('Cemento tipo GU', 'saco'), ('Arena fina', 'm3'), ('Ripio triturado', 'm3'), ('Agua', 'm3'),
+              ('Clavos 2" a 4"', 'kg'), ('Tabla de encofrado 0.30m', 'u'), ('Acero de refuerzo fy=4200', 'kg'),
+              ('Alambre galvanizado #18', 'kg'), ('Bloque de hormigón 15cm', 'u'), ('Tubo PVC 110mm', 'm')]
+TRANSPORTES = [('Transporte de material pétreo', 'm3-km'), ('Transporte de cemento', 'saco-km'),
+               ('Transporte de acero', 'kg-km'), ('Transporte de bloques', 'u-km')]
+UNIDADES = ['m2', 'm3', 'ml', 'u', 'kg', 'global']
+
+# Secciones de la tabla principal: (clave del rubro, título, encabezados, letra del subtotal)
+SECTIONS = [
+    ('equipos', 'EQUIPO', ['CANTIDAD\nA', 'TARIFA\nB', 'COSTO HORA\nC=AxB', 'RENDIMIENTO\nR', 'COSTO\nD=CxR'], 'M'),
+    ('mano_obra', 'MANO DE OBRA', ['CANTIDAD\nA', 'JORNAL/HR\nB', 'COSTO HORA\nC=AxB', 'RENDIMIENTO\nR', 'COSTO\nD=CxR'], 'N'),
+    ('materiales', 'MATERIALES', ['UNIDAD', 'CANTIDAD\nA', 'PRECIO UNIT.\nB', 'COSTO\nC=AxB'], 'O'),
+    ('transporte', 'TRANSPORTE', ['UNIDAD', 'CANTIDAD\nA', 'TARIFA\nB', 'COSTO\nC=AxB'], 'P'),
+]
+VAE_HEADERS = ['Peso Relativo\nElemento (%)', 'CPC\nElemento', 'NP / EP /\nND', 'VAE (%)', 'VAE (%)\nElemento']
+
+# Geometría de la página (puntos, A4 vertical como el PDF real)
+PAGE_WIDTH = 595.22
+PAGE_HEIGHT = 842
+LEFT = 30
+COLUMN_WIDTHS = [140, 38, 38, 40, 44, 38, 44, 48, 30, 34, 40]
+TABLE_TOP = 122
+HEADER_ROW_HEIGHT = 16
+ROW_HEIGHT = 9
+FONT_SIZE = 5.5
+TOTALS_WIDTHS = [150, 38, 44]
+MAX_ROWS_PER_SECTION = 14
+
+
+def _pct(value):
+    return f'{value * 100:.3f}%'
+
+
+def synthetic_rubro(numero, rows_per_section=4, total=None, seed=0):
+    """
+    Rubro sintético con la estructura de APUConverter.parse_page.
+    
+    Los valores se redondean a la precisión con la que aparecen en el PDF, así
+    que parsear la página generada devuelve los mismos números.
+    """
+    rng = random.Random(seed * 1000003 + numero)
+    
+    mano_obra = []
+    for _ in range(rows_per_section):
+        descripcion, categoria = rng.choice(MANO_OBRA)
+        mano_obra.append({'descripcion': descripcion, 'categoria': categoria,
+                          'cantidad': float(rng.randint(1, 4)), 'tarifa': round(rng.uniform(4.0, 4.9), 2),
+                          'rendimiento': round(rng.uniform(0.05, 1.5), 4), 'cpc': '5412100' + str(rng.randint(10, 99)),
+                          'np_ep_nd': 'EP', 'vae_pct': 1.0, 'unidad': ''})
+    for item in mano_obra:
+        item['costo_hora'] = round(item['cantidad'] * item['tarifa'], 2)
+        item['costo'] = round(item['costo_hora'] * item['rendimiento'], 2)
+    subtotal_n = round(sum(item['costo'] for item in mano_obra), 2)
+    
+    # La herramienta menor va primero y cuesta el 5% de la mano de obra, como en el PDF real
+    equipos = [{'descripcion': 'Herramienta Menor 5% de M.O.', 'categoria': '', 'cantidad': None, 'tarifa': None,
+                'costo_hora': None, 'rendimiento': None, 'costo': round(subtotal_n * 0.05, 2),
+                'cpc': '4299217233', 'np_ep_nd': 'ND', 'vae_pct': 0.4, 'unidad': ''}]
+    for _ in range(rows_per_section - 1):
+        equipos.append({'descripcion': rng.choice(EQUIPOS), 'categoria': '', 'cantidad': float(rng.randint(1, 3)),
+                        'tarifa': round(rng.uniform(1.0, 40.0), 2), 'rendimiento': round(rng.uniform(0.05, 1.5), 4),
+                        'cpc': '43' + str(rng.randint(1000000, 9999999)), 'np_ep_nd': rng.choice(['NP', 'ND']),
+                        'vae_pct': round(rng.uniform(0.2, 0.9), 4), 'unidad': ''})
+    for item in equipos[1:]:
+        item['costo_hora'] = round(item['cantidad'] * item['tarifa'], 2)
+        item['costo'] = round(item['costo_hora'] * item['rendimiento'], 2)
+    
+    materiales = []
+    for _ in range(rows_per_section):
+        descripcion, unidad = rng.choice(MATERIALES)
+        materiales.append({'descripcion': descripcion, 'categoria': '', 'unidad': unidad,
+                           'cantidad': round(rng.uniform(0.01, 30.0), 4), 'tarifa': round(rng.uniform(0.1, 25.0), 2),
+                           'costo_hora': None, 'rendimiento': None, 'cpc': '3' + str(rng.randint(10000000, 99999999)),
+                           'np_ep_nd': rng.choice(['NP', 'EP']), 'vae_pct': round(rng.uniform(0.3, 1.0), 4)})
+    transporte = []
+    for _ in range(rows_per_section):
+        descripcion, unidad = rng.choice(TRANSPORTES)
+        transporte.append({'descripcion': descripcion, 'categoria': '', 'unidad': unidad,
+                           'cantidad': round(rng.uniform(0.01, 30.0), 4), 'tarifa': round(rng.uniform(0.1, 2.0), 2),
+                           'costo_hora': None, 'rendimiento': None, 'cpc': '6511' + str(rng.randint(10000, 99999)),
+                           'np_ep_nd': 'EP', 'vae_pct': 1.0})
+    for item in materiales + transporte:
+        item['costo'] = round(item['cantidad'] * item['tarifa'], 2)
+    
+    sections = {'equipos': equipos, 'mano_obra': mano_obra, 'materiales': materiales, 'transporte': transporte}
+    subtotals = {key: round(sum(item['costo'] for item in items), 2) for key, items in sections.items()}
+    total_costo_directo = round(sum(subtotals.values()), 2)
+    vae_total = 0
+    for items in sections.values():
+        for item in items:
+            item['peso_relativo'] = round(item['costo'] / total_costo_directo, 5) if total_costo_directo else 0
+            item['vae_elemento'] = round(item['peso_relativo'] * item['vae_pct'], 5)
+            vae_total += item['vae_elemento']
+    
+    indirectos_valor = round(total_costo_directo * 0.14, 2)
+    utilidad_valor = round(total_costo_directo * 0.06, 2)
+    costo_total = round(total_costo_directo + indirectos_valor + utilidad_valor, 2)
+    dolares, centavos = divmod(round(costo_total * 100), 100)
+    
+    rubro = {
+        'numero_rubro': numero,
+        'unidad': rng.choice(UNIDADES),
+        'detalle': f'Rubro sintético {numero}: ' + rng.choice(EQUIPOS + [d for d, _ in MATERIALES]).lower(),
+        'cantidad': round(rng.uniform(1.0, 5000.0), 2),
+        'hoja': f'HOJA {numero} DE {total or numero}',
+        **sections,
+        'subtotal_m': subtotals['equipos'],
+        'subtotal_n': subtotals['mano_obra'],
+        'subtotal_o': subtotals['materiales'],
+        'subtotal_p': subtotals['transporte'],
+        'total_costo_directo': total_costo_directo,
+        'vae_total': round(vae_total, 4),
+        'indirectos_pct': 0.14,
+        'indirectos_valor': indirectos_valor,
+        'utilidad_pct': 0.06,
+        'utilidad_valor': utilidad_valor,
+        'costo_total': costo_total,
+        'valor_unitario': costo_total,
+        'texto_valor': f'SON: {dolares} DOLARES, {centavos:02d}/100 CENTAVOS',
+        'fecha': FECHA,
+        'numero_pagina': numero,
+    }
+    return rubro
+
+
+def _number(value, decimals=2):
+    return '' if value is None else f'{value:.{decimals}f}'
+
+
+def _section_row(key, item):
+    """Celdas de una fila de datos como lista de (texto, columnas que ocupa)."""
+    vae = [(_pct(item['peso_relativo']), 1), (item['cpc'], 1), (item['np_ep_nd'], 1),
+           (f"{item['vae_pct'] * 100:.2f}%", 1), (_pct(item['vae_elemento']), 1)]
+    if key == 'equipos' and item['cantidad'] is None:
+        # Herramienta menor: el costo va en la misma celda que la descripción
+        return [(f"{item['descripcion']} {item['costo']:.2f}", 6)] + vae
+    if key in ('equipos', 'mano_obra'):
+        descripcion = f"{item['descripcion']} {item['categoria']}".strip()
+        return [(descripcion, 1), (_number(item['cantidad']), 1), (_number(item['tarifa']), 1),
+                (_number(item['costo_hora']), 1), (_number(item['rendimiento'], 4), 1),
+                (_number(item['costo']), 1)] + vae
+    return [(item['descripcion'], 2), (item['unidad'], 1), (_number(item['cantidad'], 4), 1),
+            (_number(item['tarifa']), 1), (_number(item['costo']), 1)] + vae
+
+
+class _Page:
+    """Acumula los operadores de dibujo de una página (y hacia abajo desde el borde superior)."""
+    
+    def __init__(self):
+        self.ops = []
+    
+    def text(self, x, top, value, size=FONT_SIZE, bold=False):
+        escaped = value.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        y = PAGE_HEIGHT - top - size
+        self.ops.append(f'BT /{"F2" if bold else "F1"} {size} Tf {x:.2f} {y:.2f} Td ({escaped}) Tj ET')
+    
+    def cell(self, x, top, width, height, value='', bold=False):
+        self.ops.append(f'{x:.2f} {PAGE_HEIGHT - top - height:.2f} {width:.2f} {height:.2f} re S')
+        for i, line in enumerate(value.split('\n') if value else []):
+            self.text(x + 1.5, top + 1.5 + i * (FONT_SIZE + 1), line, bold=bold)
+    
+    def row(self, top, height, cells, bold=False):
+        x = LEFT
+        col = 0
+        for value, span in cells:
+            width = sum(COLUMN_WIDTHS[col:col + span])
+            self.cell(x, top, width, height, value, bold)
+            x += width
+            col += span
+    
+    def content(self):
+        return ('0.5 w\n' + '\n'.join(self.ops)).encode('cp1252', errors='replace')
+
+
+def render_page(rubro, header_info=HEADER_INFO):
+    """Devuelve el contenido (operadores PDF) de la página de un rubro."""
+    page = _Page()
+    page.text(LEFT, 30, header_info['profesional'], size=7.8, bold=True)
+    page.text(LEFT, 42, header_info['proyecto'], size=6.2, bold=True)
+    page.text(LEFT, 52, header_info['ubicacion'], size=5.7, bold=True)
+    page.text(LEFT, 66, 'ANALISIS DE PRECIOS UNITARIOS', size=6.8, bold=True)
+    page.text(250, 66, rubro['hoja'], size=6.8, bold=True)
+    page.text(430, 66, 'DETERMINACION DEL VAE DEL RUBRO', size=6.8, bold=True)
+    page.text(LEFT, 80, f"RUBRO : {rubro['numero_rubro']}", size=6.2, bold=True)
+    page.text(300, 80, f"UNIDAD: {rubro['unidad']}", size=6.2, bold=True)
+    page.text(LEFT, 92, f"DETALLE : {rubro['detalle']}", size=6.2, bold=True)
+    page.text(500, 106, f"{rubro['cantidad']:.2f}", size=6.2)
+    
+    top = TABLE_TOP
+    subtotal_x = LEFT + sum(COLUMN_WIDTHS[:5])
+    for key, title, headers, letter in SECTIONS:
+        first = [(f'{title}\nDESCRIPCION', 2 if key in ('materiales', 'transporte') else 1)]
+        page.row(top, HEADER_ROW_HEIGHT, first + [(h, 1) for h in headers + VAE_HEADERS], bold=True)
+        top += HEADER_ROW_HEIGHT
+        for item in rubro[key]:
+            page.row(top, ROW_HEIGHT, _section_row(key, item))
+            top += ROW_HEIGHT
+        # Subtotal: solo la celda del costo tiene borde, la etiqueta queda fuera de la tabla
+        page.text(subtotal_x - 34, top + 1.5, f'SUBTOTAL {letter}', bold=True)
+        page.cell(subtotal_x, top, COLUMN_WIDTHS[5], ROW_HEIGHT, f"{rubro['subtotal_' + letter.lower()]:.2f}", True)
+        top += ROW_HEIGHT
+    
+    top += 4
+    totals_x = subtotal_x - TOTALS_WIDTHS[0]
+    totals = [
+        ('TOTAL COSTO DIRECTO (M+N+O+P)', rubro['total_costo_directo'], '100.00%'),
+        (f"INDIRECTOS (%) {rubro['indirectos_pct'] * 100:.2f}%", rubro['indirectos_valor'], None),
+        (f"UTILIDAD (%) {rubro['utilidad_pct'] * 100:.2f}%", rubro['utilidad_valor'], None),
+        ('COSTO TOTAL DEL RUBRO', rubro['costo_total'], None),
+        ('VALOR UNITARIO', rubro['valor_unitario'], None),
+    ]
+    page.text(LEFT + sum(COLUMN_WIDTHS[:9]) + 1.5, top + 1.5, f"{rubro['vae_total'] * 100:.2f}%", bold=True)
+    for label, value, extra in totals:
+        x = totals_x
+        for width, text in zip(TOTALS_WIDTHS, (label, f'{value:.2f}', extra)):
+            if text is not None:
+                page.cell(x, top, width, ROW_HEIGHT, text, bold=True)
+            x += width
+        top += ROW_HEIGHT
+    
+    page.text(LEFT, top + 10, rubro['texto_valor'], size=6.2, bold=True)
+    page.text(LEFT, top + 20, 'ESTOS PRECIOS NO INCLUYEN IVA', size=5.2)
+    page.text(LEFT, top + 34, rubro['fecha'], size=6.2, bold=True)
+    return page.content()
+
+
+def generate_pdf(output_path, pages=10, rows_per_section=4, seed=0, header_info=HEADER_INFO):
+    """
+    Escribe un PDF sintético de APU con una página por rubro.
+    
+    Args:
+        output_path: Ruta del PDF a generar
+        pages: Número de páginas (rubros)
+        rows_per_section: Filas de cada sección (equipo, mano de obra, materiales, transporte)
+        seed: Semilla de los valores aleatorios (mismo seed, mismo PDF)
+        header_info: Profesional, proyecto y ubicación del encabezado
+    
+    Returns:
+        Ruta del PDF generado
+    """
+    if not 1 <= rows_per_section <= MAX_ROWS_PER_SECTION:
+        raise ValueError(f"rows_per_section debe estar entre 1 y {MAX_ROWS_PER_SECTION} "
+                         f"(una página por rubro)")
+    
+    # Objetos: 1 catálogo, 2 árbol de páginas, 3-4 fuentes, luego página y contenido por rubro
+    offsets = {}
+    with open(output_path, 'wb') as f:
+        def write_object(number, body, stream=None):
+            offsets[number] = f.tell()
+            f.write(f'{number} 0 obj\n'.encode())
+            if stream is None:
+                f.write(body.encode() + b'\nendobj\n')
+            else:
+                f.write(f'<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n'.encode())
+                f.write(stream + b'\nendstream\nendobj\n')
+        
+        f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        write_object(1, '<< /Type /Catalog /Pages 2 0 R >>')
+        write_object(3, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        write_object(4, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+        for numero in range(1, pages + 1):
+            rubro = synthetic_rubro(numero, rows_per_section, total=pages, seed=seed)
+            page_obj = 3 + numero * 2
+            write_object(page_obj, f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+                                   f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {page_obj + 1} 0 R >>')
+            write_object(page_obj + 1, None, zlib.compress(render_page(rubro, header_info)))
+        kids = ' '.join(f'{3 + n * 2} 0 R' for n in range(1, pages + 1))
+        write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {pages} >>')
+        
+        xref = f.tell()
+        size = max(offsets) + 1
+        f.write(f'xref\n0 {size}\n0000000000 65535 f \n'.encode())
+        for number in range(1, size):
+            f.write(f'{offsets.get(number, 0):010d} 00000 n \n'.encode())
+        f.write(f'trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode())
+    return output_path
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Genera un PDF sintético de APU para pruebas de rendimiento.")
+    parser.add_argument('output', help="PDF de salida")
+    parser.add_argument('--paginas', type=int, default=10, help="Número de páginas (rubros)")
+    parser.add_argument('--filas', type=int, default=4, help="Filas por sección")
+    parser.add_argument('--semilla', type=int, default=0, help="Semilla de los valores aleatorios")
+    args = parser.parse_args()
+    
+    generate_pdf(args.output, args.paginas, args.filas, args.semilla)
+    print(f"PDF sintético guardado: {args.output} ({args.paginas} páginas, {args.filas} filas por sección)")
+
+
+if __name__ == "__main__":
+    main()
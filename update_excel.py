@@ -0,0 +1,321 @@
+"""
+Actualización en sitio de un Excel PUNIS ya convertido.
+
+Cuando un PDF revisado cambia solo algunos rubros, en lugar de regenerar todo
+el libro con create_excel + convert_to_shared_strings se ubica el bloque de
+filas de cada rubro por su etiqueta "RUBRO   :" y se reescriben únicamente las
+filas de los rubros que cambiaron. El resto de filas, los shared strings
+existentes y los estilos quedan intactos.
+"""
+
+import os
+import re
+from bisect import bisect_right
+import zipfile
+import xml.etree.ElementTree as ET
+
+from openpyxl import Workbook
+from openpyxl.cell._writer import etree_write_cell
+from openpyxl.styles.numbers import BUILTIN_FORMATS
+from openpyxl.styles.stylesheet import apply_stylesheet
+from openpyxl.worksheet.datavalidation import DataValidation
+
+from pdf_to_excel_apu import inline_to_shared_strings, shared_strings_xml
+
+
+SHEET_PATH = 'xl/worksheets/sheet1.xml'
+SHARED_STRINGS_PATH = 'xl/sharedStrings.xml'
+
+ROW_PATTERN = re.compile(r'<row r="(\d+)"[^>]*?(?:/>|>.*?</row>)', re.DOTALL)
+CELL_PATTERN = re.compile(r'<c r="([A-Z]+)(\d+)"([^>]*?)(?:/>|>(.*?)</c>)', re.DOTALL)
+RUBRO_LABEL_PATTERN = re.compile(r'RUBRO\s*:\s*(\d+)')
+
+# Fila de la etiqueta RUBRO dentro del bloque (ver _write_rubro: FILA 8)
+RUBRO_LABEL_OFFSET = 7
+
+
+def _read_shared_strings(xml):
+    """Lee la tabla de shared strings tal como la escribe shared_strings_xml."""
+    strings = []
+    for si in re.finditer(r'<si>(.*?)</si>', xml, re.DOTALL):
+        text = ''.join(re.findall(r'<t[^>]*>([^<]*)</t>', si.group(1)))
+        strings.append(text.replace('&gt;', '>').replace('&lt;', '<').replace('&amp;', '&'))
+    return strings
+
+
+def _cell_text(attrs, inner, shared_strings):
+    """Devuelve el texto de una celda string (shared o inline), o None."""
+    if inner is None:
+        return None
+    if 't="s"' in attrs:
+        match = re.search(r'<v>(\d+)</v>', inner)
+        if match and int(match.group(1)) < len(shared_strings):
+            return shared_strings[int(match.group(1))]
+    elif 't="inlineStr"' in attrs:
+        return ''.join(re.findall(r'<t[^>]*>([^<]*)</t>', inner))
+    return None
+
+
+def _find_blocks(rows, shared_strings):
+    """
+    Ubica el bloque de filas de cada rubro por su etiqueta "RUBRO   :".
+    
+    Returns:
+        Lista de dicts con numero_rubro, start y end (filas inclusivas)
+    """
+    blocks = []
+    for row_num, row_xml in rows:
+        for col, _, attrs, inner in CELL_PATTERN.findall(row_xml):
+            if col != 'A':
+                continue
+            text = _cell_text(attrs, inner, shared_strings)
+            match = RUBRO_LABEL_PATTERN.match(text or '')
+            if match:
+                blocks.append({
+                    'numero_rubro': int(match.group(1)),
+                    'start': row_num - RUBRO_LABEL_OFFSET,
+                })
+            break
+    
+    last_row = rows[-1][0] if rows else 0
+    for i, block in enumerate(blocks):
+        block['end'] = blocks[i + 1]['start'] - 1 if i + 1 < len(blocks) else last_row
+    return blocks
+
+
+def _style_key(wb, style):
+    """Firma de un estilo de celda independiente de los índices del libro."""
+    if style.numFmtId < 164:
+        number_format = BUILTIN_FORMATS.get(style.numFmtId)
+    else:
+        number_format = wb._number_formats[style.numFmtId - 164]
+    # Los objetos de estilo de openpyxl comparan por valor pero su hash no es
+    # estable entre libros, así que la firma usa su representación
+    return (
+        repr(wb._fonts[style.fontId]), repr(wb._fills[style.fillId]), repr(wb._borders[style.borderId]),
+        number_format, repr(wb._alignments[style.alignmentId]), repr(wb._protections[style.protectionId]),
+        bool(style.quotePrefix), bool(style.pivotButton),
+    )
+
+
+def _style_translator(archive):
+    """
+    Crea una función que traduce el estilo de una celda del libro auxiliar al
+    índice de estilo equivalente del libro previo.
+    """
+    previous_wb = Workbook()
+    apply_stylesheet(archive, previous_wb)
+    previous = {}
+    for idx, style in enumerate(previous_wb._cell_styles):
+        previous.setdefault(_style_key(previous_wb, style), idx)
+    
+    cache = {}
+    
+    def translate(cell):
+        style_id = cell.style_id
+        if style_id not in cache:
+            key = _style_key(cell.parent.parent, cell._style)
+            if key not in previous:
+                raise ValueError(f"Estilo sin equivalente en el libro previo (celda {cell.coordinate})")
+            cache[style_id] = previous[key]
+        return cache[style_id]
+    
+    return translate
+
+
+def _render_rows(ws, first_row, last_row, translate_style):
+    """Serializa las filas de la hoja auxiliar igual que openpyxl, con los estilos traducidos."""
+    cells_by_row = {}
+    for (row, col), cell in sorted(ws._cells.items()):
+        if first_row <= row <= last_row:
+            cells_by_row.setdefault(row, []).append(cell)
+    
+    class _Collector(list):
+        write = list.append
+    
+    rows = []
+    for row_idx in range(first_row, last_row + 1):
+        attrs = {'r': f"{row_idx}"}
+        attrs.update(ws.row_dimensions.get(row_idx, {}))
+        row_el = ET.Element('row', attrs)
+        collector = _Collector()
+        for cell in cells_by_row.get(row_idx, []):
+            if cell._value is None and not cell.has_style:
+                continue
+            etree_write_cell(collector, ws, cell, cell.has_style)
+            if cell.has_style:
+                collector[-1].set('s', str(translate_style(cell)))
+        row_el.extend(collector)
+        rows.append((row_idx, ET.tostring(row_el, encoding='unicode')))
+    return rows
+
+
+def _canonical_row(row_xml):
+    """Forma comparable de una fila, independiente del número de fila y del serializador."""
+    row_el = ET.fromstring(row_xml)
+    row_attrs = tuple(sorted((k, v) for k, v in row_el.attrib.items() if k not in ('r', 'spans')))
+    cells = []
+    for cell in row_el:
+        attrs = dict(cell.attrib)
+        attrs['r'] = re.sub(r'\d+', '', attrs.get('r', ''))
+        cells.append((tuple(sorted(attrs.items())), ''.join(cell.itertext())))
+    return row_attrs, tuple(cells)
+
+
+def _shift_row(row_xml, shift):
+    """Desplaza el número de una fila y las referencias de sus celdas."""
+    if shift == 0:
+        return row_xml
+    row_xml = re.sub(r'<row r="(\d+)"', lambda m: f'<row r="{int(m.group(1)) + shift}"', row_xml, count=1)
+    return re.sub(r'<c r="([A-Z]+)(\d+)"', lambda m: f'<c r="{m.group(1)}{int(m.group(2)) + shift}"', row_xml)
+
+
+def update_excel_in_place(previous_xlsx, converter, output_path=None, changed=None):
+    """
+    Actualiza un Excel PUNIS previo reescribiendo solo los rubros que cambiaron.
+    
+    Args:
+        previous_xlsx: Excel generado previamente por convert_pdf_to_excel
+        converter: APUConverter con el nuevo parseo (rubros en el mismo orden
+                   del libro previo y header_info)
+        output_path: Ruta de salida (por defecto se sobrescribe previous_xlsx)
+        changed: Números de rubro a reescribir; si es None se detectan
+                 comparando cada bloque previo con su versión nueva
+    
+    Returns:
+        Lista de números de rubro reescritos
+    
+    Raises:
+        ValueError: Si la secuencia de rubros no coincide con la del libro previo
+                    o si el libro no tiene la estructura esperada
+    """
+    if output_path is None:
+        output_path = previous_xlsx
+    rubros = converter.rubros
+    
+    with zipfile.ZipFile(previous_xlsx, 'r') as archive:
+        sheet_xml = archive.read(SHEET_PATH).decode('utf-8')
+        try:
+            shared_strings = _read_shared_strings(archive.read(SHARED_STRINGS_PATH).decode('utf-8'))
+        except KeyError:
+            raise ValueError("El libro previo no tiene shared strings (no fue post-procesado)")
+        
+        data_start = sheet_xml.find('<sheetData>')
+        data_end = sheet_xml.find('</sheetData>')
+        if data_start == -1 or data_end == -1:
+            raise ValueError("El libro previo no tiene filas que actualizar")
+        rows = [(int(m.group(1)), m.group(0))
+                for m in ROW_PATTERN.finditer(sheet_xml, data_start, data_end)]
+        blocks = _find_blocks(rows, shared_strings)
+        
+        if [b['numero_rubro'] for b in blocks] != [r['numero_rubro'] for r in rubros]:
+            raise ValueError("Los rubros del nuevo parseo no coinciden con los del libro previo")
+        
+        # Renderizar los candidatos en un libro auxiliar con los mismos estilos
+        scratch_wb = Workbook()
+        translate_style = _style_translator(archive)
+        estilos = converter._estilos_excel()
+        total = len(rubros)
+        string_map = {text: idx for idx, text in enumerate(shared_strings)}
+        rows_by_num = dict(rows)
+        
+        new_rows = []
+        block_ranges = []  # (start, end) nuevos de cada bloque
+        rewritten = []
+        new_validations = {}
+        rewritten_idx = set()
+        shift = 0
+        for idx, (block, rubro) in enumerate(zip(blocks, rubros), 1):
+            start, end = block['start'], block['end']
+            new_start = start + shift
+            old_rows = [rows_by_num[n] for n in range(start, end + 1) if n in rows_by_num]
+            
+            block_xml = None
+            if changed is None or rubro['numero_rubro'] in changed:
+                ws = scratch_wb.create_sheet()
+                dv = DataValidation(type="list")
+                new_end = converter._write_rubro(ws, new_start - 1, rubro, idx, total, estilos, dv)
+                rendered = _render_rows(ws, new_start, new_end, translate_style)
+                scratch_wb.remove(ws)
+                
+                # Los strings nuevos se agregan al final de la tabla existente
+                candidate = [inline_to_shared_strings(xml, shared_strings, string_map) for _, xml in rendered]
+                unchanged = (
+                    changed is None
+                    and len(candidate) == len(old_rows)
+                    and all(_canonical_row(a) == _canonical_row(b) for a, b in zip(candidate, old_rows))
+                )
+                if not unchanged:
+                    block_xml = candidate
+                    new_validations[idx] = [str(r) for r in sorted(dv.sqref.ranges, key=lambda r: r.min_row)]
+                    rewritten_idx.add(idx)
+                    rewritten.append(rubro['numero_rubro'])
+            
+            if block_xml is None:
+                block_xml = [_shift_row(xml, shift) for xml in old_rows]
+                new_end = end + shift
+            new_rows.extend(block_xml)
+            block_ranges.append((new_start, new_end))
+            shift = new_end - end
+        
+        if not rewritten:
+            print("  Ningún rubro cambió; el libro previo ya está actualizado.")
+            if output_path != previous_xlsx:
+                import shutil
+                shutil.copyfile(previous_xlsx, output_path)
+            return rewritten
+        
+        head = sheet_xml[:data_start] + '<sheetData>'
+        tail = sheet_xml[data_end:]
+        
+        starts = [block['start'] for block in blocks]
+        
+        def block_index(row):
+            i = bisect_right(starts, row) - 1
+            return i if i >= 0 and row <= blocks[i]['end'] else None
+        
+        def map_row(row):
+            # Filas del encabezado de cada bloque (merges) conservan su posición relativa
+            i = block_index(row)
+            if i is None:
+                return row
+            return block_ranges[i][0] + row - blocks[i]['start']
+        
+        old_ends = {block['end']: new_end for block, (_, new_end) in zip(blocks, block_ranges)}
+        
+        head = re.sub(r'<dimension ref="([A-Z]+\d+):([A-Z]+)(\d+)"',
+                      lambda m: f'<dimension ref="{m.group(1)}:{m.group(2)}{int(m.group(3)) + shift}"', head)
+        tail = re.sub(r'<mergeCell ref="([A-Z]+)(\d+):([A-Z]+)(\d+)"',
+                      lambda m: f'<mergeCell ref="{m.group(1)}{map_row(int(m.group(2)))}:'
+                                f'{m.group(3)}{map_row(int(m.group(4)))}"', tail)
+        tail = re.sub(r'<brk id="(\d+)"',
+                      lambda m: f'<brk id="{old_ends.get(int(m.group(1)), int(m.group(1)))}"', tail)
+        
+        def replace_sqref(match):
+            sqref = []
+            for token in match.group(1).split():
+                i = block_index(int(re.sub(r'[A-Z]+', '', token.split(':')[0])))
+                if i is not None and i + 1 in new_validations:
+                    # Las celdas del bloque reescrito se reemplazan una sola vez
+                    sqref.extend(new_validations.pop(i + 1))
+                elif i is None or i + 1 not in rewritten_idx:
+                    sqref.append(re.sub(r'\d+', lambda m: str(map_row(int(m.group(0)))), token))
+            return f'<dataValidation sqref="{" ".join(sqref)}"'
+        
+        tail = re.sub(r'<dataValidation sqref="([^"]*)"', replace_sqref, tail, count=1)
+        
+        new_sheet = head + ''.join(new_rows) + tail
+        
+        temp_path = output_path + '.tmp'
+        with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as out:
+            for item in archive.infolist():
+                if item.filename == SHEET_PATH:
+                    out.writestr(item, new_sheet)
+                elif item.filename == SHARED_STRINGS_PATH:
+                    out.writestr(item, shared_strings_xml(shared_strings))
+                else:
+                    out.writestr(item, archive.read(item.filename))
+    
+    os.replace(temp_path, output_path)
+    print(f"  Rubros reescritos: {', '.join(str(n) for n in rewritten)}")
+    return rewritten
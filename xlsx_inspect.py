@@ -0,0 +1,676 @@
+"""
+Inspección de archivos XLSX leyendo los miembros del zip en streaming.
+
+Reemplaza a los scripts de verificación que extraían el libro a una carpeta
+temporal y recorrían sheet1.xml completo con expresiones regulares. Aquí cada
+parte se lee directamente del zip con iterparse, las filas se liberan apenas se
+procesan y los shared strings se resuelven a demanda, así que la memoria no
+crece con el tamaño de la hoja y no quedan carpetas _check/_cmp si algo falla.
+
+Uso:
+    python xlsx_inspect.py vae ARCHIVO.xlsx
+    python xlsx_inspect.py filas ARCHIVO.xlsx [--hasta 39]
+    python xlsx_inspect.py celdas REFERENCIA.xlsx GENERADO.xlsx [--filas 13,17] [--columnas H,I,J,K,L]
+    python xlsx_inspect.py validacion ARCHIVO.xlsx [ARCHIVO2.xlsx ...]
+    python xlsx_inspect.py inline ARCHIVO.xlsx
+    python xlsx_inspect.py analisis ARCHIVO.xlsx
+    python xlsx_inspect.py estilos ARCHIVO.xlsx [--indices 28,29,30,31]
+"""
+
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import namedtuple
+
+
+NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_M = '{%s}' % NS
+
+CELL_REF_PATTERN = re.compile(r'([A-Z]+)(\d+)')
+
+# value es el valor resuelto (texto del shared string, texto inline, float o bool)
+# y raw el contenido literal de <v>
+Cell = namedtuple('Cell', 'ref row column type style value raw formula')
+
+
+def split_ref(ref):
+    """'J13' -> ('J', 13)."""
+    match = CELL_REF_PATTERN.match(ref)
+    return match.group(1), int(match.group(2))
+
+
+def column_index(letters):
+    """'A' -> 1, 'L' -> 12, 'AA' -> 27."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+def _text(elem):
+    """Texto de un <si> o <is>: runs de texto enriquecido incluidos, fonética excluida."""
+    parts = []
+    for child in elem:
+        if child.tag == _M + 't':
+            parts.append(child.text or '')
+        elif child.tag == _M + 'r':
+            t = child.find(_M + 't')
+            if t is not None:
+                parts.append(t.text or '')
+    return ''.join(parts)
+
+
+class SharedStrings:
+    """
+    Tabla de shared strings leída a demanda.
+    
+    Solo se parsea sharedStrings.xml hasta el índice más alto que se pidió, así
+    que revisar unas pocas celdas no obliga a cargar la tabla completa.
+    """
+    
+    def __init__(self, archive, member):
+        self._strings = []
+        self._iterator = self._parse(archive, member) if member else iter(())
+    
+    @staticmethod
+    def _parse(archive, member):
+        with archive.open(member) as f:
+            for _, elem in ET.iterparse(f, events=('end',)):
+                if elem.tag == _M + 'si':
+                    yield _text(elem)
+                    elem.clear()
+    
+    def _load_until(self, index):
+        while len(self._strings) <= index:
+            try:
+                self._strings.append(next(self._iterator))
+            except StopIteration:
+                return False
+        return True
+    
+    def get(self, index, default=None):
+        """String en index, o default si la tabla es más corta."""
+        if index < 0 or not self._load_until(index):
+            return default
+        return self._strings[index]
+    
+    def __getitem__(self, index):
+        if index < 0 or not self._load_until(index):
+            raise IndexError(index)
+        return self._strings[index]
+    
+    def __len__(self):
+        self._load_until(float('inf'))
+        return len(self._strings)
+    
+    def __iter__(self):
+        index = 0
+        while self._load_until(index):
+            yield self._strings[index]
+            index += 1
+
+
+class XlsxWorkbook:
+    """
+    Lector en streaming de la primera hoja de un XLSX.
+    
+    Uso:
+        with XlsxWorkbook('salida.xlsx') as book:
+            for cell in book.iter_cells(columns={'J'}):
+                ...
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.archive = zipfile.ZipFile(path)
+        names = set(self.archive.namelist())
+        self.sheet_member = self._first_sheet_member(names)
+        self.shared_strings = SharedStrings(
+            self.archive, 'xl/sharedStrings.xml' if 'xl/sharedStrings.xml' in names else None)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        self.archive.close()
+    
+    def _first_sheet_member(self, names):
+        """Ruta de la primera hoja según workbook.xml y sus relaciones."""
+        default = 'xl/worksheets/sheet1.xml'
+        if 'xl/workbook.xml' not in names or 'xl/_rels/workbook.xml.rels' not in names:
+            return default
+        sheet = ET.fromstring(self.archive.read('xl/workbook.xml')).find(f'{_M}sheets/{_M}sheet')
+        if sheet is None:
+            return default
+        rel_id = sheet.get(f'{{{REL_NS}}}id')
+        for rel in ET.fromstring(self.archive.read('xl/_rels/workbook.xml.rels')):
+            if rel.get('Id') == rel_id:
+                target = rel.get('Target')
+                member = target.lstrip('/') if target.startswith('/') else 'xl/' + target
+                return member if member in names else default
+        return default
+    
+    def members(self):
+        """Partes del zip como (nombre, tamaño, tamaño comprimido)."""
+        return [(info.filename, info.file_size, info.compress_size) for info in self.archive.infolist()]
+    
+    def defined_names(self):
+        """Nombres definidos del libro como (nombre, referencia)."""
+        if 'xl/workbook.xml' not in self.archive.namelist():
+            return []
+        root = ET.fromstring(self.archive.read('xl/workbook.xml'))
+        return [(dn.get('name'), dn.text or '') for dn in root.iter(_M + 'definedName')]
+    
+    def _decode_cell(self, c):
+        ref = c.get('r')
+        column, row = split_ref(ref)
+        cell_type = c.get('t', 'n')
+        v = c.find(_M + 'v')
+        f = c.find(_M + 'f')
+        raw = v.text if v is not None else None
+        value = raw
+        if cell_type == 's' and raw is not None:
+            value = self.shared_strings.get(int(raw))
+        elif cell_type == 'inlineStr':
+            inline = c.find(_M + 'is')
+            value = _text(inline) if inline is not None else None
+        elif cell_type == 'n' and raw is not None:
+            value = float(raw)
+        elif cell_type == 'b' and raw is not None:
+            value = raw == '1'
+        return Cell(ref, row, column, cell_type, int(c.get('s', 0)), value,
+                    raw, f.text if f is not None else None)
+    
+    def _iter_row_elements(self, min_row=1, max_row=None):
+        """Elementos <row> de la hoja; cada uno se retira del árbol al volver del yield."""
+        with self.archive.open(self.sheet_member) as f:
+            sheet_data = None
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == _M + 'sheetData':
+                        sheet_data = elem
+                    continue
+                if elem.tag == _M + 'row':
+                    row = int(elem.get('r'))
+                    if max_row is not None and row > max_row:
+                        return
+                    if row >= min_row:
+                        yield row, elem
+                    sheet_data.remove(elem)
+                elif elem.tag == _M + 'sheetData':
+                    return
+    
+    def iter_rows(self, min_row=1, max_row=None):
+        """
+        Recorre las filas de la hoja como (número de fila, [Cell, ...]).
+        
+        Cada fila se libera después de entregarla; con max_row la lectura se
+        corta apenas se pasa esa fila.
+        """
+        for row, elem in self._iter_row_elements(min_row, max_row):
+            yield row, [self._decode_cell(c) for c in elem.iter(_M + 'c')]
+    
+    def iter_row_values(self, min_row=1, max_row=None):
+        """
+        Recorre las filas como (número de fila, {columna: valor}) solo con las
+        celdas que tienen valor.
+        
+        Más liviano que iter_rows: las celdas vacías (solo estilo) se saltan sin
+        decodificarlas, lo que en las hojas PUNIS es la mayoría.
+        """
+        v_tag, is_tag = _M + 'v', _M + 'is'
+        shared_strings = self.shared_strings
+        for row, elem in self._iter_row_elements(min_row, max_row):
+            values = {}
+            for c in elem:
+                child = c.find(v_tag)
+                cell_type = c.get('t', 'n')
+                if child is not None:
+                    raw = child.text
+                    if raw is None:
+                        continue
+                    if cell_type == 's':
+                        value = shared_strings.get(int(raw))
+                    elif cell_type == 'n':
+                        value = float(raw)
+                    elif cell_type == 'b':
+                        value = raw == '1'
+                    else:
+                        value = raw
+                elif cell_type == 'inlineStr':
+                    inline = c.find(is_tag)
+                    if inline is None:
+                        continue
+                    value = _text(inline)
+                else:
+                    continue
+                if value is not None and value != '':
+                    values[CELL_REF_PATTERN.match(c.get('r')).group(1)] = value
+            yield row, values
+    
+    def iter_cells(self, columns=None, min_row=1, max_row=None):
+        """Recorre las celdas de la hoja, opcionalmente solo de algunas columnas ('J', ...)."""
+        for _, cells in self.iter_rows(min_row, max_row):
+            for cell in cells:
+                if columns is None or cell.column in columns:
+                    yield cell
+    
+    def _iter_after_sheet_data(self, tag):
+        """Elementos tag que siguen a sheetData (mergeCells, dataValidations, ...)."""
+        with self.archive.open(self.sheet_member) as f:
+            sheet_data = None
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == _M + 'sheetData':
+                        sheet_data = elem
+                elif elem.tag == _M + 'row':
+                    sheet_data.remove(elem)
+                elif elem.tag == tag:
+                    yield elem
+    
+    def iter_merges(self):
+        """Rangos combinados ('A4:G4', ...) en el orden del archivo."""
+        for elem in self._iter_after_sheet_data(_M + 'mergeCell'):
+            yield elem.get('ref')
+    
+    def iter_validations(self):
+        """Reglas de validación como dict con atributos, formula1, formula2 y sqref (lista)."""
+        for elem in self._iter_after_sheet_data(_M + 'dataValidation'):
+            formula1 = elem.find(_M + 'formula1')
+            formula2 = elem.find(_M + 'formula2')
+            yield {
+                'attrs': dict(elem.attrib),
+                'type': elem.get('type'),
+                'formula1': formula1.text if formula1 is not None else None,
+                'formula2': formula2.text if formula2 is not None else None,
+                'sqref': (elem.get('sqref') or '').split(),
+            }
+    
+    def _styles_root(self):
+        if 'xl/styles.xml' not in self.archive.namelist():
+            return None
+        return ET.fromstring(self.archive.read('xl/styles.xml'))
+    
+    def iter_styles(self):
+        """Formatos de celda (cellXfs) como (índice, atributos del xf)."""
+        root = self._styles_root()
+        cell_xfs = root.find(_M + 'cellXfs') if root is not None else None
+        for index, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+            attrs = dict(xf.attrib)
+            alignment = xf.find(_M + 'alignment')
+            if alignment is not None:
+                attrs['alignment'] = dict(alignment.attrib)
+            yield index, attrs
+    
+    def number_formats(self):
+        """Formatos de número personalizados {numFmtId: código}."""
+        root = self._styles_root()
+        if root is None:
+            return {}
+        return {int(nf.get('numFmtId')): nf.get('formatCode') for nf in root.iter(_M + 'numFmt')}
+    
+    def borders(self):
+        """Bordes de styles.xml como XML (sin el namespace)."""
+        root = self._styles_root()
+        borders = root.find(_M + 'borders') if root is not None else None
+        return [ET.tostring(b, encoding='unicode').replace('ns0:', '').replace(f' xmlns:ns0="{NS}"', '')
+                for b in (borders if borders is not None else [])]
+    
+    def style_signatures(self):
+        """
+        Firma comparable de cada formato de celda (índice de cellXfs -> tupla).
+        
+        Los índices de estilo dependen de cada libro; la firma resuelve formato
+        de número, fuente, relleno, bordes y alineación para poder comparar
+        estilos entre libros distintos.
+        """
+        root = self._styles_root()
+        if root is None:
+            return []
+        
+        def flag(elem, name):
+            child = elem.find(_M + name)
+            return child is not None and child.get('val', '1') not in ('0', 'false')
+        
+        def val(elem, name):
+            child = elem.find(_M + name)
+            return child.get('val') if child is not None else None
+        
+        formats = self.number_formats()
+        fonts = [(val(font, 'name'), val(font, 'sz'), flag(font, 'b'), flag(font, 'i'), val(font, 'u'))
+                 for font in root.iter(_M + 'font')]
+        fills = [tuple(p.get('patternType') or 'none' for p in fill.iter(_M + 'patternFill'))
+                 for fill in root.iter(_M + 'fill')]
+        borders = [tuple((side, (border.find(_M + side).get('style') if border.find(_M + side) is not None else None))
+                         for side in ('left', 'right', 'top', 'bottom'))
+                   for border in root.iter(_M + 'border')]
+        
+        signatures = []
+        for _, attrs in self.iter_styles():
+            num_fmt = int(attrs.get('numFmtId', 0))
+            alignment = attrs.get('alignment', {})
+            signatures.append((
+                formats.get(num_fmt, f'builtin:{num_fmt}'),
+                fonts[int(attrs.get('fontId', 0))] if fonts else None,
+                fills[int(attrs.get('fillId', 0))] if fills else None,
+                borders[int(attrs.get('borderId', 0))] if borders else None,
+                tuple(alignment.get(key) for key in ('horizontal', 'vertical', 'wrapText', 'shrinkToFit')),
+            ))
+        return signatures
+
+
+def describe_cell(cell):
+    """Descripción corta de una celda para los reportes."""
+    if cell is None:
+        return "NO EXISTE"
+    if cell.type == 's':
+        return f"s={cell.style} t=s v={cell.raw} → '{cell.value}'"
+    if cell.type == 'inlineStr':
+        return f"s={cell.style} t=inlineStr → '{cell.value}'"
+    if cell.raw is None:
+        return f"s={cell.style} (sin valor)"
+    formula = f" f={cell.formula}" if cell.formula else ''
+    return f"s={cell.style} t={cell.type} v={cell.raw}{formula}"
+
+
+# === Subcomandos (reemplazan a los scripts de verificación con carpeta temporal) ===
+
+def report_vae(xlsx_path, limit=10):
+    """Celdas de la columna J (NP/EP/ND), validación de datos y nombres definidos."""
+    print(f"Analizando: {xlsx_path}\n")
+    with XlsxWorkbook(xlsx_path) as book:
+        print("Analizando columna J (NP/EP/ND):")
+        print("=" * 60)
+        cells = [cell for cell in book.iter_cells(columns={'J'}) if cell.raw is not None or cell.value]
+        if not cells:
+            print("❌ NO se encontraron celdas en columna J con datos")
+        for cell in cells[:limit]:
+            if cell.type == 's' and cell.value is None:
+                print(f"  {cell.ref}: índice={cell.raw} → ❌ FUERA DE RANGO")
+            elif cell.type == 's':
+                print(f"  {cell.ref}: índice={cell.raw} → '{cell.value}'")
+            elif cell.type == 'inlineStr':
+                print(f"  {cell.ref}: INLINE STRING '{cell.value}'")
+            else:
+                print(f"  {cell.ref}: valor={cell.raw} (tipo={cell.type})")
+        
+        print("\n\nVerificando Data Validation:")
+        print("=" * 60)
+        validations = list(book.iter_validations())
+        if validations:
+            print(f"✓ Se encontraron {len(validations)} reglas de validación:")
+            for validation in validations[:5]:
+                print(f"  - {validation['type']} {validation['formula1']}: "
+                      f"{len(validation['sqref'])} rangos ({' '.join(validation['sqref'][:5])} ...)")
+        else:
+            print("❌ No existe sección <dataValidations>")
+        
+        print("\n\nVerificando Defined Names:")
+        print("=" * 60)
+        names = book.defined_names()
+        if names:
+            print(f"✓ Se encontraron {len(names)} nombres definidos:")
+            for name, ref in names[:5]:
+                print(f"  - {name}: {ref}")
+        else:
+            print("❌ No se encontraron nombres definidos")
+
+
+def report_rows(xlsx_path, label=None, max_row=39):
+    """Texto de la columna A y valores de H, I, J de las primeras filas."""
+    print(f"\n{'='*100}")
+    print(f"ESTRUCTURA DE FILAS EN: {label or xlsx_path}")
+    print(f"{'='*100}")
+    with XlsxWorkbook(xlsx_path) as book:
+        rows = dict(book.iter_rows(max_row=max_row))
+    for row in range(1, max_row + 1):
+        cells = {cell.column: cell for cell in rows.get(row, [])}
+        if not cells:
+            print(f"Fila {row:2d}: (vacía o no existe)")
+            continue
+        a_cell = cells.get('A')
+        a_text = str(a_cell.value or '')[:35] if a_cell else ''
+        vae_info = ''
+        for col in ['H', 'I', 'J']:
+            cell = cells.get(col)
+            if cell is None or (cell.raw is None and cell.value is None):
+                continue
+            if cell.type in ('s', 'inlineStr'):
+                vae_info += f" {col}='{str(cell.value)[:15]}'"
+            else:
+                vae_info += f" {col}={cell.raw}"
+        print(f"Fila {row:2d}: A='{a_text}'{vae_info}")
+
+
+def report_cells(ref_path, gen_path, rows=(13, 17, 18, 21, 22, 23, 24, 25), columns=('H', 'I', 'J', 'K', 'L')):
+    """Compara celdas puntuales entre la referencia y el generado."""
+    wanted = set(rows)
+    max_row = max(wanted)
+    
+    def collect(path):
+        with XlsxWorkbook(path) as book:
+            return {cell.ref: cell for cell in book.iter_cells(columns=set(columns), max_row=max_row)
+                    if cell.row in wanted}
+    
+    ref_cells = collect(ref_path)
+    gen_cells = collect(gen_path)
+    print("=" * 80)
+    print("COMPARACIÓN CELDA POR CELDA")
+    print("=" * 80)
+    for row in rows:
+        print(f"\n{'='*60}")
+        print(f"FILA {row}")
+        print(f"{'='*60}")
+        for col in columns:
+            ref = f'{col}{row}'
+            print(f"\n{ref}:")
+            print(f"  REF: {describe_cell(ref_cells.get(ref))}")
+            print(f"  GEN: {describe_cell(gen_cells.get(ref))}")
+
+
+def report_validation(xlsx_path, label=None, cells=('J12', 'J13', 'J16', 'J17'), strings=30):
+    """Reglas de validación, celdas J puntuales y primeros shared strings."""
+    print(f"\n{'='*60}")
+    print(f"Analizando: {label or xlsx_path}")
+    print(f"Archivo: {xlsx_path}")
+    print('=' * 60)
+    with XlsxWorkbook(xlsx_path) as book:
+        print("\n1. ESTRUCTURA DE DATA VALIDATION:")
+        print("-" * 60)
+        validations = list(book.iter_validations())
+        if validations:
+            print(f"✓ {len(validations)} reglas de validación encontradas")
+            for i, validation in enumerate(validations[:3], 1):
+                print(f"\nRegla {i}:")
+                print(f"  - atributos: {validation['attrs']}")
+                print(f"  - type: {validation['type']}")
+                print(f"  - formula1: {validation['formula1']}")
+                print(f"  - sqref: {len(validation['sqref'])} rangos")
+                print(f"    Primeros rangos: {' '.join(validation['sqref'][:5])}")
+        else:
+            print("❌ NO se encontró sección <dataValidations>")
+        
+        print("\n\n2. ANÁLISIS DE CELDAS INDIVIDUALES:")
+        print("-" * 60)
+        wanted = set(cells)
+        max_row = max(split_ref(ref)[1] for ref in wanted)
+        found = {cell.ref: cell for cell in book.iter_cells(max_row=max_row) if cell.ref in wanted}
+        for ref in cells:
+            print(f"  {ref}: {describe_cell(found.get(ref))}")
+        
+        print(f"\n\n3. SHARED STRINGS (primeros {strings}):")
+        print("-" * 60)
+        for index in range(strings):
+            text = book.shared_strings.get(index)
+            if text is None:
+                break
+            marker = " ⭐" if text in ('NP', 'EP', 'ND') else ''
+            print(f"  [{index}] → '{text}'{marker}")
+
+
+def report_inline_vae(xlsx_path, limit=20):
+    """Cuenta cómo están guardados los NP/EP/ND de la columna J (inline o shared)."""
+    print(f"Analizando: {xlsx_path}\n")
+    with XlsxWorkbook(xlsx_path) as book:
+        inline = []
+        shared = []
+        for cell in book.iter_cells(columns={'J'}):
+            if cell.type == 'inlineStr' and cell.value:
+                inline.append(cell)
+            elif cell.type == 's':
+                shared.append(cell)
+        
+        print("Verificando celdas de columna J (NP/EP/ND):")
+        print("=" * 60)
+        print(f"\n✓ {len(inline)} celdas J con inline strings")
+        for cell in inline[:limit]:
+            marker = " ⭐" if cell.value in ('NP', 'EP', 'ND') else ''
+            print(f"  {cell.ref}: '{cell.value}'{marker}")
+        
+        print(f"\n\n✓ {len(shared)} celdas J con shared strings")
+        for cell in shared[:limit]:
+            print(f"  {cell.ref} → índice {cell.raw} → '{str(cell.value)[:30]}'")
+        
+        print("\n\nVerificando Data Validation:")
+        print("=" * 60)
+        for validation in book.iter_validations():
+            attrs = validation['attrs']
+            print(f"✓ Validación {validation['type']} {validation['formula1']} "
+                  f"aplicada a {len(validation['sqref'])} rangos")
+            print(f"  Primeros rangos: {' '.join(validation['sqref'][:10])}")
+            print(f"  showDropDown={attrs.get('showDropDown', '0')} allowBlank={attrs.get('allowBlank', '0')}")
+    
+    print("\n\n" + "=" * 60)
+    print("RESUMEN:")
+    print("=" * 60)
+    values = [cell.value for cell in inline + shared if cell.value in ('NP', 'EP', 'ND')]
+    print(f"✓ {len(values)} celdas con NP/EP/ND "
+          f"({sum(1 for cell in inline if cell.value in ('NP', 'EP', 'ND'))} inline)")
+    for code in ('NP', 'EP', 'ND'):
+        print(f"  - {code}: {values.count(code)}")
+
+
+def report_structure(xlsx_path, rows=(13, 17), columns=('H', 'I', 'J', 'K', 'L'),
+                     string_indices=(17, 18, 19, 20, 21, 22, 27, 28, 29)):
+    """Partes del zip, nombres definidos, formatos de celda, filas puntuales y shared strings."""
+    print("=" * 80)
+    print(f"ANÁLISIS PROFUNDO DE: {xlsx_path}")
+    print("=" * 80)
+    with XlsxWorkbook(xlsx_path) as book:
+        print("\n1. ESTRUCTURA DE ARCHIVOS:")
+        print("-" * 60)
+        for name, size, compressed in book.members():
+            print(f"  {name} ({size} bytes, {compressed} comprimido)")
+        
+        print("\n\n2. WORKBOOK.XML - DEFINED NAMES:")
+        print("-" * 60)
+        names = book.defined_names()
+        for name, ref in names:
+            print(f"  {name}: {ref}")
+        if not names:
+            print("NO hay definedNames")
+        
+        print("\n\n3. STYLES.XML - FORMATOS DE CELDA:")
+        print("-" * 60)
+        styles = list(book.iter_styles())
+        print(f"Total de formatos de celda (xf): {len(styles)}")
+        for index, attrs in styles[:35]:
+            print(f"  [{index}] {attrs}")
+        
+        print("\n\n4. FILAS EN DETALLE:")
+        print("-" * 60)
+        wanted = set(rows)
+        found = {cell.ref: cell for cell in book.iter_cells(columns=set(columns), max_row=max(wanted))
+                 if cell.row in wanted}
+        for row in rows:
+            print(f"FILA {row}:")
+            for col in columns:
+                print(f"  {col}{row}: {describe_cell(found.get(f'{col}{row}'))}")
+        
+        print("\n\n5. SHARED STRINGS - ÍNDICES RELEVANTES:")
+        print("-" * 60)
+        for index in string_indices:
+            text = book.shared_strings.get(index)
+            if text is not None:
+                print(f"  [{index}] = '{text}'")
+
+
+def report_styles(xlsx_path, indices=(28, 29, 30, 31), border_limit=10):
+    """Formatos de celda elegidos, formatos de número y bordes."""
+    with XlsxWorkbook(xlsx_path) as book:
+        print(f"ESTILOS ({', '.join(str(i) for i in indices)}):\n")
+        wanted = set(indices)
+        for index, attrs in book.iter_styles():
+            if index in wanted:
+                print(f"Estilo [{index}]: {attrs}")
+        
+        print("\n\nFORMATOS DE NÚMERO (numFmts):")
+        for num_fmt_id, code in book.number_formats().items():
+            print(f"  {num_fmt_id}: {code}")
+        
+        print("\n\nBORDES:")
+        for i, border in enumerate(book.borders()[:border_limit]):
+            print(f"Borde [{i}]: {border}")
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',')]
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Inspección en streaming de archivos XLSX generados y de referencia.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    sub = subparsers.add_parser('vae', help="Columna J, validación de datos y nombres definidos")
+    sub.add_argument('xlsx')
+    sub.add_argument('--limite', type=int, default=10, help="Celdas J a mostrar")
+    
+    sub = subparsers.add_parser('filas', help="Columna A y VAE (H, I, J) de las primeras filas")
+    sub.add_argument('xlsx')
+    sub.add_argument('--hasta', type=int, default=39, help="Última fila a mostrar")
+    
+    sub = subparsers.add_parser('celdas', help="Compara celdas puntuales entre dos libros")
+    sub.add_argument('referencia')
+    sub.add_argument('generado')
+    sub.add_argument('--filas', type=_int_list, default=[13, 17, 18, 21, 22, 23, 24, 25])
+    sub.add_argument('--columnas', type=lambda v: v.upper().split(','), default=['H', 'I', 'J', 'K', 'L'])
+    
+    sub = subparsers.add_parser('validacion', help="Reglas de validación, celdas J y shared strings")
+    sub.add_argument('xlsx', nargs='+')
+    
+    sub = subparsers.add_parser('inline', help="Cómo se guardan los NP/EP/ND de la columna J")
+    sub.add_argument('xlsx')
+    
+    sub = subparsers.add_parser('analisis', help="Partes del zip, nombres, estilos, filas 13 y 17, shared strings")
+    sub.add_argument('xlsx')
+    
+    sub = subparsers.add_parser('estilos', help="Formatos de celda, de número y bordes")
+    sub.add_argument('xlsx')
+    sub.add_argument('--indices', type=_int_list, default=[28, 29, 30, 31])
+    
+    args = parser.parse_args()
+    if args.command == 'vae':
+        report_vae(args.xlsx, args.limite)
+    elif args.command == 'filas':
+        report_rows(args.xlsx, max_row=args.hasta)
+    elif args.command == 'celdas':
+        report_cells(args.referencia, args.generado, args.filas, args.columnas)
+    elif args.command == 'validacion':
+        for path in args.xlsx:
+            report_validation(path)
+    elif args.command == 'inline':
+        report_inline_vae(args.xlsx)
+    elif args.command == 'analisis':
+        report_structure(args.xlsx)
+    elif args.command == 'estilos':
+        report_styles(args.xlsx, args.indices)
+
+
+if __name__ == "__main__":
+    main()